@@ -6,23 +6,30 @@ Key concepts:
 - Creating a basic agent with a system prompt
 - Running synchronous queries
 - Accessing response data, message history, and costs
+- Building the agent once and reusing it across runs
+- Keeping multi-turn message history under a token budget
 """
 
-from setup import get_model
+from agents import get_agent
 from pydantic_ai import Agent
 
-def run_simple_agent():
-    model = get_model()
-    
+from utils.history import HistoryManager
+from utils.metrics import registry
+
+def build_simple_agent(model) -> Agent:
     # Create a basic agent with a system prompt
-    agent1 = Agent(
+    return Agent(
         model=model,
         system_prompt="You are a helpful customer support agent. Be concise and friendly.",
     )
 
+def run_simple_agent():
+    agent1 = get_agent("simple")
+
     # Example usage of basic agent
     print("Running first query...")
-    response = agent1.run_sync("How can I track my order #12345?")
+    with registry.observe("simple", agent1.model) as run:
+        response = run.result = agent1.run_sync("How can I track my order #12345?")
     print("\nResponse data:")
     print(response.data)
     print("\nAll messages:")
@@ -30,14 +37,26 @@ def run_simple_agent():
     print("\nCost:")
     print(response.cost())
 
-    # Continuing the conversation with message history
+    # Continuing the conversation with message history, compacted to a token budget
+    history = HistoryManager(max_tokens=1000, keep_turns=2)
     print("\nRunning follow-up query with message history...")
-    response2 = agent1.run_sync(
-        user_prompt="What was my previous question?",
-        message_history=response.new_messages(),
-    )
+    with registry.observe("simple", agent1.model) as run:
+        response2 = run.result = agent1.run_sync(
+            user_prompt="What was my previous question?",
+            message_history=history.compact(response.new_messages()),
+        )
     print("\nResponse data:")
     print(response2.data)
 
+    # Longer conversations: older turns are trimmed once the budget is reached
+    messages = response2.all_messages()
+    for question in ["Can I change the delivery address?", "And how long does a refund take?"]:
+        compacted = history.compact(messages)
+        print(f"\n{question}\n  {history.last_report}")
+        with registry.observe("simple", agent1.model) as run:
+            response3 = run.result = agent1.run_sync(question, message_history=compacted)
+        print(f"  {response3.data}")
+        messages = response3.all_messages()
+
 if __name__ == "__main__":
     run_simple_agent()
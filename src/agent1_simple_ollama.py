@@ -6,27 +6,25 @@ Key concepts:
 - Creating a basic agent with a system prompt
 - Running synchronous queries
 - Accessing response data, message history, and costs
+- Running example 1's agent (`agent1_simple.build_simple_agent`) on a local Ollama model
 """
 
+from agents import get_agent
 from setup import OllamaModel
-from pydantic_ai import Agent
 from colorama import init, Fore
 
+from utils.metrics import registry
+
 init()
 
 def run_simple_agent():
-    model = OllamaModel(OllamaModel.QWEN2_5_14b).get_model()
-    
-    # Create a basic agent with a system prompt
-    agent1 = Agent(
-        model=model,
-        # system_prompt="You are a helpful customer support agent. Be concise and friendly.",
-        system_prompt="The response must be in one sentence, max 10 words.",
-    )
+    # The shared example 1 agent, built once for the Ollama model
+    agent1 = get_agent("simple", OllamaModel.QWEN2_5_14b)
 
     # Example usage of basic agent
     print("Running first query...")
-    response = agent1.run_sync("How can I track my order #12345?")
+    with registry.observe("simple", agent1.model) as run:
+        response = run.result = agent1.run_sync("How can I track my order #12345? Answer in one sentence.")
     print("\nResponse data:")
     print(response.data)
     # print("\nAll messages:")
@@ -39,10 +37,11 @@ def run_simple_agent():
         
     # Continuing the conversation with message history
     print("\nRunning follow-up query with message history...")
-    response2 = agent1.run_sync(
-        user_prompt="What was my previous question?",
-        message_history=response.new_messages(),
-    )
+    with registry.observe("simple", agent1.model) as run:
+        response2 = run.result = agent1.run_sync(
+            user_prompt="What was my previous question?",
+            message_history=response.new_messages(),
+        )
     print("\nResponse data:")
     print(Fore.LIGHTGREEN_EX + response2.data)
 
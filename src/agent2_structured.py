@@ -6,11 +6,17 @@ Key concepts:
 - Using Pydantic models to define response structure
 - Type validation and safety
 - Field descriptions for better model understanding
+- Streaming partially validated responses (--stream)
 """
 
-from setup import get_model
+import sys
+import time
+from agents import get_agent
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
+from setup import run_async
+from utils.metrics import registry
+from utils.streaming import print_snapshot, stream_structured_response
 
 class ResponseModel(BaseModel):
     """Structured response with metadata."""
@@ -19,11 +25,9 @@ class ResponseModel(BaseModel):
     follow_up_required: bool
     sentiment: str = Field(description="Customer sentiment analysis")
 
-def run_structured_agent():
-    model = get_model()
-    
+def build_structured_agent(model) -> Agent:
     # Create an agent that returns structured data
-    agent2 = Agent(
+    return Agent(
         model=model,
         result_type=ResponseModel,
         system_prompt=(
@@ -32,10 +36,26 @@ def run_structured_agent():
         ),
     )
 
-    print("Running query with structured response...")
-    response = agent2.run_sync("How can I track my order #12345?")
+def run_structured_agent(stream: bool = False):
+    agent2 = get_agent("structured")
+
+    if stream:
+        print("Streaming query with structured response...")
+        with registry.observe("structured", agent2.model) as run:
+            data, timings = run_async(stream_structured_response(
+                agent2, "How can I track my order #12345?", on_partial=print_snapshot
+            ))
+            run.result = timings.result
+        print(f"\n{timings}")
+    else:
+        print("Running query with structured response...")
+        start = time.perf_counter()
+        with registry.observe("structured", agent2.model) as run:
+            response = run.result = agent2.run_sync("How can I track my order #12345?")
+        data = response.data
+        print(f"\nTime to complete: {time.perf_counter() - start:.2f}s")
     print("\nStructured response data:")
-    print(response.data.model_dump_json(indent=2))
+    print(data.model_dump_json(indent=2))
 
 if __name__ == "__main__":
-    run_structured_agent()
+    run_structured_agent(stream="--stream" in sys.argv)
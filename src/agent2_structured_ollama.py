@@ -6,38 +6,23 @@ Key concepts:
 - Using Pydantic models to define response structure
 - Type validation and safety
 - Field descriptions for better model understanding
+- Running example 2's agent (`agent2_structured.build_structured_agent`) on a local Ollama model
 """
 
+from agents import get_agent
 from setup import OllamaModel
-from pydantic import BaseModel, Field
-from pydantic_ai import Agent
+from utils.metrics import registry
 
-class ResponseModel(BaseModel):
-    """Structured response with metadata."""
-    response: str
-    needs_escalation: bool
-    follow_up_required: bool
-    sentiment: str = Field(description="Customer sentiment analysis")
-    
 def run_structured_agent():
-    model = OllamaModel(OllamaModel.QWEN2_5_14b).get_model()
-    
-    # Create an agent that returns structured data
-    agent2 = Agent(
-        model=model,
-        result_type=ResponseModel,
-        system_prompt=(
-            "use max 5 words to answer the question. "
-            # "You are an intelligent customer support agent. "
-            # "Analyze queries carefully and provide structured responses."
-        ),
-    )
+    # The shared example 2 agent (and its ResponseModel), built once for the Ollama model
+    agent2 = get_agent("structured", OllamaModel.QWEN2_5_14b)
 
     # print("--------------------> Running query with structured response...")
-    response = agent2.run_sync("How can I track my order #12345?")
+    with registry.observe("structured", agent2.model) as run:
+        response = run.result = agent2.run_sync("How can I track my order #12345? Use at most 5 words.")
     model_names = [message.model_name for message in response.all_messages() if hasattr(message, 'model_name')]
     if model_names:
-        print(f'model: model_names[0]')
+        print(f'model: {model_names[0]}')
 
     print("\n--------------------> Structured response data:")
     print(response.data.model_dump_json(indent=3))
@@ -5,29 +5,39 @@ This example demonstrates how to use dependencies and context in agents.
 Key concepts:
 - Defining complex data models with Pydantic
 - Injecting runtime dependencies
-- Using dynamic system prompts
+- Using dynamic system prompts (cached per customer, see utils/prompt_cache.py)
+- Streaming partially validated responses (--stream)
 """
 
-from typing import List, Optional
-from setup import get_model
-from pydantic import BaseModel, Field
+import sys
+import time
+from typing import Optional, Tuple
+from agents import get_agent
+from pydantic import BaseModel, ConfigDict, Field
 from pydantic_ai import Agent, RunContext
+from setup import run_async
 from utils.markdown import to_markdown
+from utils.metrics import registry
+from utils.prompt_cache import cached_system_prompt
+from utils.streaming import print_snapshot, stream_structured_response
+from utils.tracing import traced_run_sync
 
 # Define order schema
 class Order(BaseModel):
     """Structure for order details."""
+    model_config = ConfigDict(frozen=True)
     order_id: str
     status: str
-    items: List[str]
+    items: Tuple[str, ...]
 
 # Define customer schema
 class CustomerDetails(BaseModel):
     """Structure for incoming customer queries."""
+    model_config = ConfigDict(frozen=True)
     customer_id: str
     name: str
     email: str
-    orders: Optional[List[Order]] = None
+    orders: Optional[Tuple[Order, ...]] = None
 
 class ResponseModel(BaseModel):
     """Structured response with metadata."""
@@ -36,26 +46,38 @@ class ResponseModel(BaseModel):
     follow_up_required: bool
     sentiment: str = Field(description="Customer sentiment analysis")
 
-def run_dependencies_agent():
-    model = get_model()
-    
+SYSTEM_PROMPT = (
+    "You are an intelligent customer support agent. "
+    "Analyze queries carefully and provide structured responses. "
+    "Always great the customer and provide a helpful response."
+)
+
+def customer_prompt(customer: CustomerDetails) -> str:
+    """The dynamic part of the system prompt; also used for offline batch requests (batch.py)."""
+    return f"Customer details: {to_markdown(customer)}"
+
+# Dynamic system prompt based on dependencies, rendered once per customer content
+@cached_system_prompt
+async def add_customer_name(ctx: RunContext[CustomerDetails]) -> str:
+    return customer_prompt(ctx.deps)
+
+def build_dependencies_agent(model) -> Agent:
     # Agent with structured output and dependencies
     agent = Agent(
         model=model,
         result_type=ResponseModel,
         deps_type=CustomerDetails,
         retries=3,
-        system_prompt=(
-            "You are an intelligent customer support agent. "
-            "Analyze queries carefully and provide structured responses. "
-            "Always great the customer and provide a helpful response."
-        ),
+        system_prompt=SYSTEM_PROMPT,
     )
 
-    # Add dynamic system prompt based on dependencies
-    @agent.system_prompt
-    async def add_customer_name(ctx: RunContext[CustomerDetails]) -> str:
-        return f"Customer details: {to_markdown(ctx.deps)}"
+    # Add dynamic system prompt based on dependencies (re-rendered when history is replayed)
+    agent.system_prompt(dynamic=True)(add_customer_name)
+
+    return agent
+
+def run_dependencies_agent(stream: bool = False):
+    agent = get_agent("dependencies")
 
     # Create a customer with order details
     customer = CustomerDetails(
@@ -67,24 +89,37 @@ def run_dependencies_agent():
         ],
     )
 
-    print("Running query with dependencies...")
-    response = agent.run_sync(user_prompt="What did I order?", deps=customer)
+    if stream:
+        print("Streaming query with dependencies...")
+        with registry.observe("dependencies", agent.model) as run:
+            data, timings = run_async(stream_structured_response(
+                agent, "What did I order?", deps=customer, on_partial=print_snapshot
+            ))
+            run.result = timings.result
+        print(f"\n{timings}")
+    else:
+        print("Running query with dependencies...")
+        start = time.perf_counter()
+        with registry.observe("dependencies", agent.model) as run:
+            response = run.result = traced_run_sync(agent, "What did I order?", deps=customer)
+        data = response.data
+        print(f"\nTime to complete: {time.perf_counter() - start:.2f}s")
 
-    print("\nAll messages:")
-    print(response.all_messages())
+        print("\nAll messages:")
+        print(response.all_messages())
     print("\nStructured response data:")
-    print(response.data.model_dump_json(indent=2))
+    print(data.model_dump_json(indent=2))
 
     print(
         "\nCustomer Details:\n"
         f"Name: {customer.name}\n"
         f"Email: {customer.email}\n\n"
         "Response Details:\n"
-        f"{response.data.response}\n\n"
+        f"{data.response}\n\n"
         "Status:\n"
-        f"Follow-up Required: {response.data.follow_up_required}\n"
-        f"Needs Escalation: {response.data.needs_escalation}"
+        f"Follow-up Required: {data.follow_up_required}\n"
+        f"Needs Escalation: {data.needs_escalation}"
     )
 
 if __name__ == "__main__":
-    run_dependencies_agent()
+    run_dependencies_agent(stream="--stream" in sys.argv)
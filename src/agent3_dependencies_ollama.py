@@ -1,53 +1,19 @@
-from typing import List, Optional
-from setup import OllamaModel, get_model
-from pydantic import BaseModel, Field
-from pydantic_ai import Agent, RunContext
-from utils.markdown import to_markdown
+"""
+Example 3 on a local Ollama model: Agent with Structured Response & Dependencies
 
-# Define order schema
-class Order(BaseModel):
-    """Structure for order details."""
-    order_id: str
-    status: str
-    items: List[str]
+Runs example 3's agent (`agent3_dependencies.build_dependencies_agent`) -
+the same frozen `CustomerDetails`/`Order` deps, structured `ResponseModel`
+and cached dynamic customer prompt - on a local Ollama model.
+"""
 
-# Define customer schema
-class CustomerDetails(BaseModel):
-    """Structure for incoming customer queries."""
-    customer_id: str
-    name: str
-    email: str
-    orders: Optional[List[Order]] = None
-
-class ResponseModel(BaseModel):
-    """Structured response with metadata."""
-    response: str
-    needs_escalation: bool
-    follow_up_required: bool
-    sentiment: str = Field(description="Customer sentiment analysis")
+from agent3_dependencies import CustomerDetails, Order
+from agents import get_agent
+from setup import OllamaModel
+from utils.metrics import registry
 
 def run_dependencies_agent():
-    model = OllamaModel(OllamaModel.QWEN2_5_14b).get_model()
-    
-    # Agent with structured output and dependencies
-    agent = Agent(
-        model=model,
-        result_type=ResponseModel,
-        deps_type=CustomerDetails,
-        retries=3,
-        # system_prompt=(
-        #     "You are an intelligent customer support agent. "
-        #     "Analyze queries carefully and provide structured responses. "
-        #     "Always great the customer and provide a helpful response."
-        # ),
-    )
-
-    # Add dynamic system prompt based on dependencies
-    @agent.system_prompt
-    async def add_customer_name(ctx: RunContext[CustomerDetails]) -> str:
-        lixo = f"Customer details: {to_markdown(ctx.deps)}"
-        # print(f'=================== {lixo}')        
-        return lixo
+    # The shared example 3 agent, built once for the Ollama model
+    agent = get_agent("dependencies", OllamaModel.QWEN2_5_14b)
 
     # Create a customer with order details
     customer = CustomerDetails(
@@ -73,13 +39,14 @@ def run_dependencies_agent():
 
     # response = agent.run_sync(user_prompt="did I buy anything that I could use with my new hat?", deps=customer)
 
-    response = agent.run_sync(user_prompt="list all products that I ordered and show only their names, " \
-    "not the order information. " \
-    "show the names in uppercase" \
-    "remove duplication from the list" \
-    "show only the product names" \
-    # "it they have compound names, show them as a single word separate by #" \
-    , deps=customer)
+    with registry.observe("dependencies", agent.model) as run:
+        response = run.result = agent.run_sync(user_prompt="list all products that I ordered and show only their names, " \
+        "not the order information. " \
+        "show the names in uppercase" \
+        "remove duplication from the list" \
+        "show only the product names" \
+        # "it they have compound names, show them as a single word separate by #" \
+        , deps=customer)
 
     # print("\nAll messages:")
     # print(response.all_messages())
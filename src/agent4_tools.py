@@ -5,28 +5,44 @@ This example shows how to enhance agents with custom tools.
 Key concepts:
 - Creating and registering tools
 - Accessing context in tools
+- Passing data to tools through dependencies instead of closures
+- Bulk async tools: one call resolves many orders concurrently
+- Streaming partially validated responses (--stream)
 """
 
-from typing import Dict, List, Optional
-from setup import get_model
-from pydantic import BaseModel, Field
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from agents import get_agent
+from pydantic import BaseModel, ConfigDict, Field
 from pydantic_ai import Agent, RunContext, Tool
+from pydantic_ai.settings import ModelSettings
+from setup import run_async
 from utils.markdown import to_markdown
+from utils.metrics import registry
+from utils.prompt_cache import cached_system_prompt
+from utils.shipping import InMemoryShippingStore, ShippingStore
+from utils.streaming import print_snapshot, stream_structured_response
+from utils.tool_cache import cached_tool, summary_table as tool_cache_table
+from utils.tracing import traced_run_sync
 
 # Define order schema
 class Order(BaseModel):
     """Structure for order details."""
+    model_config = ConfigDict(frozen=True)
     order_id: str
     status: str
-    items: List[str]
+    items: Tuple[str, ...]
 
 # Define customer schema
 class CustomerDetails(BaseModel):
     """Structure for incoming customer queries."""
+    model_config = ConfigDict(frozen=True)
     customer_id: str
     name: str
     email: str
-    orders: Optional[List[Order]] = None
+    orders: Optional[Tuple[Order, ...]] = None
 
 class ResponseModel(BaseModel):
     """Structured response with metadata."""
@@ -35,24 +51,54 @@ class ResponseModel(BaseModel):
     follow_up_required: bool
     sentiment: str = Field(description="Customer sentiment analysis")
 
-def run_tools_agent():
-    model = get_model()
-    
-    # Simulated database of shipping information
-    shipping_info_db: Dict[str, str] = {
-        "12345": "Shipped on 2024-12-01",
-        "67890": "Out for delivery",
-    }
+# Runtime dependencies: the customer plus the data the tools read
+@dataclass
+class SupportDeps:
+    customer: CustomerDetails
+    shipping_store: ShippingStore
 
-    def get_shipping_info(ctx: RunContext[CustomerDetails]) -> str:
-        """Get the customer's shipping information."""
-        return shipping_info_db[ctx.deps.orders[0].order_id]
+# Simulated database of shipping information
+SHIPPING_INFO_DB: Dict[str, str] = {
+    "12345": "Shipped on 2024-12-01",
+    "67890": "Out for delivery",
+}
 
+# Statuses change slowly; reuse a lookup for 30s across runs with the same orders and store
+@cached_tool(ttl=30, key=lambda deps: (deps.customer.orders, deps.shipping_store))
+async def get_shipping_info(ctx: RunContext[SupportDeps]) -> str:
+    """Get the customer's shipping information."""
+    if not ctx.deps.customer.orders:
+        return "The customer has no orders on file."
+    order_id = ctx.deps.customer.orders[0].order_id
+    status = await ctx.deps.shipping_store.aget(order_id)
+    if status is None:
+        return f"No shipping information found for order ID {order_id}."
+    return status
+
+async def get_order_statuses(ctx: RunContext[SupportDeps], order_ids: Optional[List[str]] = None) -> str:
+    """Get the shipping status of several orders in one call.
+
+    Args:
+        order_ids: Orders to look up; defaults to all of the customer's orders.
+    """
+    if not order_ids:
+        order_ids = [order.order_id for order in ctx.deps.customer.orders or []]
+    if not order_ids:
+        return "The customer has no orders on file."
+    statuses = await ctx.deps.shipping_store.aget_many(order_ids)
+    return "\n".join(f"{order_id}: {statuses.get(order_id, 'no shipping information found')}" for order_id in order_ids)
+
+# Dynamic system prompt, rendered once per customer content (the store is not part of the key)
+@cached_system_prompt(key=lambda deps: deps.customer)
+async def add_customer_name(ctx: RunContext[SupportDeps]) -> str:
+    return f"Customer details: {to_markdown(ctx.deps.customer)}"
+
+def build_tools_agent(model) -> Agent:
     # Agent with structured output, dependencies, and tools
     agent = Agent(
         model=model,
         result_type=ResponseModel,
-        deps_type=CustomerDetails,
+        deps_type=SupportDeps,
         retries=3,
         system_prompt=(
             "You are an intelligent customer support agent. "
@@ -60,12 +106,18 @@ def run_tools_agent():
             "Use tools to look up relevant information."
             "Always great the customer and provide a helpful response."
         ),
-        tools=[Tool(get_shipping_info, takes_ctx=True)],  # Add tool via kwarg
+        tools=[Tool(get_shipping_info, takes_ctx=True), Tool(get_order_statuses, takes_ctx=True)],  # Add tools via kwarg
+        # Several tool calls in one response run concurrently, saving a model round-trip each
+        model_settings=ModelSettings(parallel_tool_calls=True),
     )
 
-    @agent.system_prompt
-    async def add_customer_name(ctx: RunContext[CustomerDetails]) -> str:
-        return f"Customer details: {to_markdown(ctx.deps)}"
+    # Dynamic: re-rendered for each run's customer when a session's history is replayed
+    agent.system_prompt(dynamic=True)(add_customer_name)
+
+    return agent
+
+def run_tools_agent(stream: bool = False):
+    agent = get_agent("tools")
 
     # Create a customer with order details
     customer = CustomerDetails(
@@ -77,26 +129,41 @@ def run_tools_agent():
         ],
     )
 
-    print("Running query with tools...")
-    response = agent.run_sync(
-        user_prompt="What's the status of my last order?", deps=customer
-    )
+    deps = SupportDeps(customer=customer, shipping_store=InMemoryShippingStore(SHIPPING_INFO_DB))
+
+    if stream:
+        print("Streaming query with tools...")
+        with registry.observe("tools", agent.model) as run:
+            data, timings = run_async(stream_structured_response(
+                agent, "What's the status of my last order?", deps=deps, on_partial=print_snapshot
+            ))
+            run.result = timings.result
+        print(f"\n{timings}")
+    else:
+        print("Running query with tools...")
+        start = time.perf_counter()
+        with registry.observe("tools", agent.model) as run:
+            response = run.result = traced_run_sync(agent, "What's the status of my last order?", deps=deps)
+        data = response.data
+        print(f"\nTime to complete: {time.perf_counter() - start:.2f}s")
 
-    print("\nAll messages:")
-    print(response.all_messages())
+        print("\nAll messages:")
+        print(response.all_messages())
+        print("\nTool cache:")
+        print(tool_cache_table())
     print("\nStructured response data:")
-    print(response.data.model_dump_json(indent=2))
+    print(data.model_dump_json(indent=2))
 
     print(
         "\nCustomer Details:\n"
         f"Name: {customer.name}\n"
         f"Email: {customer.email}\n\n"
         "Response Details:\n"
-        f"{response.data.response}\n\n"
+        f"{data.response}\n\n"
         "Status:\n"
-        f"Follow-up Required: {response.data.follow_up_required}\n"
-        f"Needs Escalation: {response.data.needs_escalation}"
+        f"Follow-up Required: {data.follow_up_required}\n"
+        f"Needs Escalation: {data.needs_escalation}"
     )
 
 if __name__ == "__main__":
-    run_tools_agent()
+    run_tools_agent(stream="--stream" in sys.argv)
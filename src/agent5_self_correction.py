@@ -7,21 +7,20 @@ Key concepts:
 - Handling errors gracefully with retries
 - Using ModelRetry for automatic retries
 - Decorator-based tool registration
+- Measuring how often retries fire and what they cost
 """
 
-from typing import Dict, List, Optional
-from setup import get_model
+# Same customer schema, runtime deps and shipping data as example 4
+from agent4_tools import SHIPPING_INFO_DB, CustomerDetails, SupportDeps
+from agents import get_agent
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent, ModelRetry, RunContext
+from setup import run_async
 from utils.markdown import to_markdown
-
-# Define customer schema
-class CustomerDetails(BaseModel):
-    """Structure for incoming customer queries."""
-    customer_id: str
-    name: str
-    email: str
-    orders: Optional[List[dict]] = None
+from utils.metrics import registry
+from utils.retry_telemetry import RetryTelemetry, run_with_retry_telemetry
+from utils.shipping import InMemoryShippingStore
+from utils.tool_cache import cached_tool, summary_table as tool_cache_table
 
 class ResponseModel(BaseModel):
     """Structured response with metadata."""
@@ -30,27 +29,27 @@ class ResponseModel(BaseModel):
     follow_up_required: bool
     sentiment: str = Field(description="Customer sentiment analysis")
 
-def run_self_correction_agent():
-    model = get_model()
-    
-    # Simulated database of shipping information
-    shipping_info_db: Dict[str, str] = {
-        "#12345": "Shipped on 2024-12-01",
-        "#67890": "Out for delivery",
-    }
-
-    # Create a customer
-    customer = CustomerDetails(
-        customer_id="1",
-        name="John Doe",
-        email="john.doe@example.com",
-    )
+# Module level, so every agent built (one per model, or per concurrent run) shares one cache
+@cached_tool(ttl=30, key=lambda deps: deps.shipping_store)  # ModelRetry results are not cached
+async def get_shipping_status(ctx: RunContext[SupportDeps], order_id: str) -> str:
+    """Get the shipping status for a given order ID."""
+    # The store resolves "12345" and "#12345" alike, so format slips
+    # no longer need a retry; unknown orders still ask the model to fix it.
+    shipping_status = await ctx.deps.shipping_store.aget(order_id)
+    if shipping_status is None:
+        raise ModelRetry(
+            f"No shipping information found for order ID {order_id}. "
+            "Check the order ID against the customer's message (a leading # is optional), "
+            "self-correct it if needed and try again."
+        )
+    return shipping_status
 
+def build_self_correction_agent(model) -> Agent:
     # Agent with reflection and self-correction
     agent = Agent(
         model=model,
         result_type=ResponseModel,
-        deps_type=CustomerDetails,
+        deps_type=SupportDeps,
         retries=3,
         system_prompt=(
             "You are an intelligent customer support agent. "
@@ -60,27 +59,43 @@ def run_self_correction_agent():
         ),
     )
 
-    @agent.tool_plain()  # Add plain tool via decorator
-    def get_shipping_status(order_id: str) -> str:
-        """Get the shipping status for a given order ID."""
-        shipping_status = shipping_info_db.get(order_id)
-        if shipping_status is None:
-            raise ModelRetry(
-                f"No shipping information found for order ID {order_id}. "
-                "Make sure the order ID starts with a #: e.g, #624743 "
-                "Self-correct this if needed and try again."
-            )
-        return shipping_info_db[order_id]
+    agent.tool(get_shipping_status)  # Add tool via the decorator; data comes from the run's deps
 
-    print("Running query with self-correction...")
-    response = agent.run_sync(
-        user_prompt="What's the status of my last order 12345?", deps=customer
+    return agent
+
+def run_self_correction_agent():
+    agent = get_agent("self-correction")
+
+    # Create a customer
+    customer = CustomerDetails(
+        customer_id="1",
+        name="John Doe",
+        email="john.doe@example.com",
     )
 
+    shipping_store = InMemoryShippingStore(SHIPPING_INFO_DB)
+    telemetry = RetryTelemetry()
+
+    print("Running query with self-correction...")
+    with registry.observe("self-correction", agent.model) as run:
+        response, _ = run_async(run_with_retry_telemetry(
+            agent,
+            "What's the status of my last order 12345?",
+            deps=SupportDeps(customer=customer, shipping_store=shipping_store),
+            telemetry=telemetry,
+        ))
+        run.result = response
+
     print("\nAll messages:")
     print(response.all_messages())
     print("\nStructured response data:")
     print(response.data.model_dump_json(indent=2))
+    print("\nShipping lookups:")
+    print(shipping_store.stats)
+    print("\nRetries:")
+    print(telemetry.summary_table())
+    print("\nTool cache:")
+    print(tool_cache_table())
 
 if __name__ == "__main__":
     run_self_correction_agent()
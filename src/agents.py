@@ -0,0 +1,148 @@
+"""
+Agent registry: build each example agent once per process per model.
+
+Constructing an `Agent` generates the JSON schemas for `result_type` and
+introspects every tool signature, so doing it per request puts that work on
+the hot path. `get_agent` builds each variant lazily from its example
+module's `build_*_agent` function and hands out the shared instance on
+subsequent calls. Per-run data such as the customer and the shipping
+database travels in `deps`.
+
+One thing is not per run: pydantic-ai keeps each tool's retry count on the
+`Tool`, shared by every run of the agent and reset when a run starts, so
+concurrent runs of an agent with tools corrupt each other's retry budget.
+Code that runs agents concurrently (batch mode, the service, benchmarks)
+checks one out of an `AgentPool` per run instead; agents without tools are
+shared by the pool as well.
+
+Usage:
+    agent = get_agent("tools")
+    result = agent.run_sync("Where is my order?", deps=deps)
+
+    pool = get_agent_pool("tools", model)
+    with pool.checkout() as agent:
+        result = await agent.run("Where is my order?", deps=deps)
+"""
+
+import importlib
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+# Agent kind -> (example module, builder function)
+AGENT_BUILDERS: Dict[str, Tuple[str, str]] = {
+    "simple": ("agent1_simple", "build_simple_agent"),
+    "structured": ("agent2_structured", "build_structured_agent"),
+    "dependencies": ("agent3_dependencies", "build_dependencies_agent"),
+    "tools": ("agent4_tools", "build_tools_agent"),
+    "self-correction": ("agent5_self_correction", "build_self_correction_agent"),
+}
+
+_lock = threading.Lock()
+_agents: Dict[Tuple[str, int], Tuple[object, "Agent"]] = {}
+_pools: Dict[Tuple[str, int], "AgentPool"] = {}
+_models: Dict[object, object] = {}
+
+
+def resolve_model(model=None):
+    """Return a shared model instance.
+
+    `None` means the default OpenAI model from `setup.get_model()` and a string
+    is treated as an Ollama model name; both are created once and reused.
+    Model instances are returned unchanged.
+    """
+    if model is not None and not isinstance(model, str):
+        return model
+    with _lock:
+        if model not in _models:
+            from setup import OllamaModel, get_model
+            _models[model] = get_model() if model is None else OllamaModel(model).get_model()
+        return _models[model]
+
+
+def build_agent(kind: str, model) -> "Agent":
+    """Build a new agent of the given kind (use `get_agent` or `get_agent_pool` to reuse one)."""
+    if kind not in AGENT_BUILDERS:
+        raise KeyError(f"Unknown agent kind {kind!r}; expected one of {', '.join(AGENT_BUILDERS)}")
+    module_name, builder_name = AGENT_BUILDERS[kind]
+    return getattr(importlib.import_module(module_name), builder_name)(model)
+
+
+def get_agent(kind: str, model=None) -> "Agent":
+    """Return the shared agent of the given kind for `model`, building it on first use.
+
+    For one run at a time; concurrent runs of an agent with tools need `get_agent_pool`.
+    """
+    if kind not in AGENT_BUILDERS:
+        raise KeyError(f"Unknown agent kind {kind!r}; expected one of {', '.join(AGENT_BUILDERS)}")
+    model = resolve_model(model)
+    key = (kind, id(model))
+    with _lock:
+        entry = _agents.get(key)
+        if entry is None:
+            # Keep a reference to the model so its id() cannot be reused.
+            entry = _agents[key] = (model, build_agent(kind, model))
+        return entry[1]
+
+
+class AgentPool:
+    """Agents of one kind and model for concurrent runs, one checked out per run.
+
+    An agent is only built when every pooled one is busy, so the pool grows to
+    the peak number of concurrent runs and its agents are reused after that.
+    Agents without function tools hold no per-run state and are shared.
+    """
+
+    def __init__(self, kind: str, model):
+        self.kind = kind
+        self.model = model
+        first = get_agent(kind, model)
+        self.result_type = first.result_type
+        # pydantic-ai keeps no public accessor for an agent's function tools
+        self._shared: Optional["Agent"] = None if first._function_tools else first
+        self._free: List["Agent"] = [first]
+        self._lock = threading.Lock()
+        self.built = 1
+
+    @contextmanager
+    def checkout(self) -> Iterator["Agent"]:
+        """An agent no other run is using until the block exits."""
+        if self._shared is not None:
+            yield self._shared
+            return
+        with self._lock:
+            agent = self._free.pop() if self._free else None
+        if agent is None:
+            agent = build_agent(self.kind, self.model)
+            with self._lock:
+                self.built += 1
+        try:
+            yield agent
+        finally:
+            with self._lock:
+                self._free.append(agent)
+
+
+def get_agent_pool(kind: str, model=None) -> AgentPool:
+    """Return the shared `AgentPool` of the given kind for `model`."""
+    model = resolve_model(model)
+    key = (kind, id(model))
+    with _lock:
+        pool = _pools.get(key)
+    if pool is None:
+        # get_agent takes the lock itself
+        pool = AgentPool(kind, model)
+        with _lock:
+            pool = _pools.setdefault(key, pool)
+    return pool
+
+
+def clear_agents() -> None:
+    """Drop every cached agent and model (mainly for tests and benchmarks)."""
+    with _lock:
+        _agents.clear()
+        _pools.clear()
+        _models.clear()
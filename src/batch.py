@@ -0,0 +1,408 @@
+"""
+Batch mode: answer a backlog of support tickets concurrently.
+
+Tickets are streamed from a directory of JSON files (like data/) or a JSONL
+file, converted into `CustomerDetails` and fanned out over `agent.run` with a
+bounded number of requests in flight. Only a small window of tickets is held
+in memory at a time, so arbitrarily large feeds can be processed. Results are
+written as JSON lines as soon as each ticket completes, followed by a
+throughput/latency report.
+
+With `--shipping-db PATH`, order statuses come from that SQLite shipping
+store (see `utils.shipping.SQLiteShippingStore`) and are passed to the agent
+with the customer's orders. With `--fast-path`, plain order-status tickets
+are answered from the same store without an agent run (see
+`utils.fast_path`). With
+`--semantic-cache DIR`, a ticket whose description closely matches an
+earlier one from the same customer, query type and order is answered from
+that earlier response without running the agent (see `utils.semantic_cache`).
+
+With `--offline TYPE`, tickets of that query type (e.g. product questions,
+which need no interactive latency) are held back and sent as one OpenAI-style
+Batch API job once the interactive tickets are done: the agent's system
+prompt, the customer details and the ticket become one request line with
+`ResponseModel` as a strict JSON schema response format. Validated answers are
+written like any other result (with `"offline": true`); failed or invalid
+ones are re-queued through the agent (see `utils.openai_batch`).
+
+Usage:
+    python run_examples.py batch ../data --concurrency 8 --output results.jsonl
+    python run_examples.py batch tickets.jsonl --ollama qwen2.5:14b
+    python run_examples.py batch tickets.jsonl --shipping-db shipping.sqlite --fast-path
+    python run_examples.py batch tickets.jsonl --semantic-cache semantic_cache/ --similarity 0.8
+    python run_examples.py batch ../data --offline product --poll-interval 300
+"""
+
+import argparse
+import array
+import asyncio
+import sys
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+import httpx
+from pydantic import BaseModel
+
+from agent3_dependencies import SYSTEM_PROMPT, CustomerDetails, Order, ResponseModel, customer_prompt
+from agents import AgentPool, get_agent_pool
+from setup import OLLAMA_BASE_URL, OllamaModel, get_balanced_model, get_http_client, get_model, run_async
+from utils.cache import ResponseCache
+from utils.metrics import registry
+from utils.retry_telemetry import RetryTelemetry, run_with_retry_telemetry
+from utils.stats import format_summary, latency_summary
+from utils.tickets import IngestStats, Ticket, iter_tickets
+from utils.tracing import traced_run, tracer
+
+if TYPE_CHECKING:
+    from utils.fast_path import FastPath
+    from utils.openai_batch import BatchClient
+    from utils.semantic_cache import SemanticCache
+    from utils.shipping import ShippingStore
+
+
+class TicketResult(BaseModel):
+    """Outcome of a single ticket in a batch run."""
+    ticket_id: str
+    query_type: str
+    latency_s: float
+    response: Optional[ResponseModel] = None
+    error: Optional[str] = None
+    cached: bool = False
+    fast_path: bool = False
+    offline: bool = False
+
+
+def ticket_to_customer(ticket: Ticket, status: Optional[str] = None) -> CustomerDetails:
+    """Map a ticket onto the customer details the agent expects as deps."""
+    orders = None
+    if ticket.order_id:
+        orders = [Order(order_id=ticket.order_id, status=status or "unknown", items=[])]
+    return CustomerDetails(
+        customer_id=ticket.email,
+        name=ticket.customer_name,
+        email=ticket.email,
+        orders=orders,
+    )
+
+
+def ticket_prompt(ticket: Ticket) -> str:
+    """User prompt sent to the agent for a ticket."""
+    return f"[{ticket.query_type} ticket {ticket.ticket_id}] {ticket.description}"
+
+
+def offline_messages(ticket: Ticket) -> List[Dict[str, str]]:
+    """The agent's system prompts and the ticket prompt as chat messages for a batch request."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": customer_prompt(ticket_to_customer(ticket))},
+        {"role": "user", "content": ticket_prompt(ticket)},
+    ]
+
+
+async def run_ticket(
+    agents: AgentPool,
+    ticket: Ticket,
+    semaphore: asyncio.Semaphore,
+    telemetry: Optional[RetryTelemetry] = None,
+    semantic_cache: Optional["SemanticCache"] = None,
+    fast_path: Optional["FastPath"] = None,
+    store: Optional["ShippingStore"] = None,
+) -> TicketResult:
+    """Run one ticket through an agent from `agents`, holding a concurrency slot.
+
+    Fast-path answers and `semantic_cache` hits are returned straight away,
+    without taking a slot. With a shipping `store`, the ticket's order status
+    is looked up there and passed to the agent.
+    """
+    if fast_path is not None:
+        start = time.perf_counter()
+        response = await fast_path.answer(ticket)
+        if response is not None:
+            return TicketResult(
+                ticket_id=ticket.ticket_id,
+                query_type=ticket.query_type,
+                latency_s=time.perf_counter() - start,
+                response=response,
+                fast_path=True,
+            )
+    if semantic_cache is not None:
+        start = time.perf_counter()
+        hit = semantic_cache.lookup(ticket.description, customer=ticket.email, query_type=ticket.query_type,
+                                    order_id=ticket.order_id)
+        if hit is not None:
+            return TicketResult(
+                ticket_id=ticket.ticket_id,
+                query_type=ticket.query_type,
+                latency_s=time.perf_counter() - start,
+                response=hit.response,
+                cached=True,
+            )
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            status = await store.aget(ticket.order_id) if store is not None and ticket.order_id else None
+            customer = ticket_to_customer(ticket, status)
+            with agents.checkout() as agent, registry.observe("batch", agents.model, ticket.query_type) as run:
+                if telemetry is not None:
+                    result, _ = await run_with_retry_telemetry(
+                        agent, ticket_prompt(ticket), deps=customer,
+                        telemetry=telemetry, label=ticket.ticket_id,
+                    )
+                else:
+                    result = await traced_run(
+                        agent, ticket_prompt(ticket), deps=customer,
+                        attributes={"ticket_id": ticket.ticket_id, "query_type": ticket.query_type},
+                    )
+                run.result = result
+            if semantic_cache is not None:
+                semantic_cache.add(ticket.description, result.data, customer=ticket.email,
+                                   query_type=ticket.query_type, order_id=ticket.order_id)
+            return TicketResult(
+                ticket_id=ticket.ticket_id,
+                query_type=ticket.query_type,
+                latency_s=time.perf_counter() - start,
+                response=result.data,
+            )
+        except Exception as exc:
+            return TicketResult(
+                ticket_id=ticket.ticket_id,
+                query_type=ticket.query_type,
+                latency_s=time.perf_counter() - start,
+                error=f"{type(exc).__name__}: {exc}",
+            )
+
+
+async def run_batch(
+    tickets: Iterable[Ticket],
+    agents: AgentPool,
+    concurrency: int = 4,
+    output=None,
+    telemetry: Optional[RetryTelemetry] = None,
+    semantic_cache: Optional["SemanticCache"] = None,
+    fast_path: Optional["FastPath"] = None,
+    store: Optional["ShippingStore"] = None,
+) -> Dict[str, float]:
+    """Process `tickets` with at most `concurrency` agent runs in flight.
+
+    `tickets` may be a lazy iterator (e.g. `iter_tickets`); it is consumed
+    only as fast as slots free up. Each result is written to `output` (a text
+    file object) as one JSON line as soon as it completes. Returns the latency
+    summary, which is also printed, plus a retry summary when `telemetry` is
+    given. `fast_path` should read the same `store` the agent is given.
+    """
+    output = output or sys.stdout
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+
+    latencies = array.array("d")
+    failed = cached = fast = 0
+
+    def record(result: TicketResult) -> None:
+        nonlocal failed, cached, fast
+        cached += result.cached
+        fast += result.fast_path
+        if result.error is None:
+            latencies.append(result.latency_s)
+        else:
+            failed += 1
+        output.write(result.model_dump_json() + "\n")
+        output.flush()
+
+    # Keep a small window of scheduled tickets instead of one task per ticket up front
+    pending = set()
+    for ticket in tickets:
+        if len(pending) >= 2 * concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                record(task.result())
+        pending.add(asyncio.create_task(
+            run_ticket(agents, ticket, semaphore, telemetry, semantic_cache, fast_path, store)
+        ))
+    for next_done in asyncio.as_completed(pending):
+        record(await next_done)
+
+    summary = latency_summary(latencies, time.perf_counter() - start)
+    summary["failed"] = failed
+    summary["cached"] = cached
+    summary["fast_path"] = fast
+    print(f"\nBatch complete (concurrency={concurrency}, failed={failed}, cached={cached})", file=sys.stderr)
+    print(format_summary(summary), file=sys.stderr)
+    if fast_path is not None:
+        print(fast_path.stats, file=sys.stderr)
+    if telemetry is not None:
+        print(telemetry.summary_table(), file=sys.stderr)
+    return summary
+
+
+async def run_offline(
+    tickets: List[Ticket],
+    client: "BatchClient",
+    model_name: str,
+    output=None,
+    poll_interval: float = 60.0,
+    timeout: Optional[float] = None,
+) -> List[Ticket]:
+    """Answer `tickets` through one Batch API job; returns the tickets to re-queue.
+
+    Validated responses are written to `output` as results with `offline`
+    set and the job's turnaround as latency. A ticket whose request failed or
+    whose output does not validate is returned, as is every ticket when the
+    job as a whole fails.
+    """
+    from utils.openai_batch import BatchError, batch_line
+
+    output = output or sys.stdout
+    lines = [batch_line(t.ticket_id, offline_messages(t), model_name, ResponseModel) for t in tickets]
+    try:
+        result = await client.run(lines, ResponseModel, poll_interval, timeout, metadata={"source": "batch"})
+    except (BatchError, httpx.HTTPError) as exc:
+        print(f"Offline batch failed, re-queuing {len(tickets)} tickets: {exc}", file=sys.stderr)
+        return tickets
+    print(f"\nOffline {result}", file=sys.stderr)
+    for reason in sorted(set(result.errors.values()))[:5]:
+        print(f"  re-queued: {reason}", file=sys.stderr)
+
+    requeue = []
+    for ticket in tickets:
+        response = result.responses.get(ticket.ticket_id)
+        if response is None:
+            requeue.append(ticket)
+            continue
+        output.write(TicketResult(
+            ticket_id=ticket.ticket_id,
+            query_type=ticket.query_type,
+            latency_s=result.wait_s,
+            response=response,
+            offline=True,
+        ).model_dump_json() + "\n")
+    output.flush()
+    return requeue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="run_examples.py batch", description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="Directory of ticket JSON files or a JSONL file")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Maximum agent runs in flight")
+    parser.add_argument("-o", "--output", help="Write JSONL results here instead of stdout")
+    parser.add_argument("--ollama", metavar="MODEL", help="Use a local Ollama model instead of OpenAI")
+    parser.add_argument("--ollama-url", metavar="URL", action="append",
+                        help="Ollama endpoint to use (repeat to balance across several)")
+    parser.add_argument("--cache", metavar="PATH", help="Cache model responses in this SQLite file")
+    parser.add_argument("--cache-ttl", type=float, help="Seconds before a cached response expires")
+    parser.add_argument("--shipping-db", metavar="PATH",
+                        help="Look order statuses up in this SQLite shipping store and pass them to the agent")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="Answer plain order-status tickets from --shipping-db without the agent")
+    parser.add_argument("--semantic-cache", metavar="DIR",
+                        help="Answer near-duplicate tickets from earlier responses, indexed in this directory")
+    parser.add_argument("--similarity", type=float, default=0.8,
+                        help="Minimum cosine similarity for a semantic cache hit (default 0.8)")
+    parser.add_argument("--offline", metavar="TYPE", action="append",
+                        help="Send tickets of this query type through the Batch API (repeatable)")
+    parser.add_argument("--batch-url", metavar="URL",
+                        help="OpenAI-compatible API for --offline batches (default: OpenAI)")
+    parser.add_argument("--batch-model", metavar="NAME", help="Model for --offline batches (default: the agent's)")
+    parser.add_argument("--poll-interval", type=float, default=60.0,
+                        help="Seconds between batch status checks (default 60)")
+    parser.add_argument("--retry-log", metavar="PATH", help="Record retry telemetry and append it to this JSONL file")
+    parser.add_argument("--metrics", metavar="PATH", help="Write Prometheus text metrics here at the end")
+    parser.add_argument("--metrics-log", metavar="PATH", help="Append per-ticket usage to this rotating JSONL file")
+    parser.add_argument("--trace", metavar="PATH", help="Trace each phase of every run and write the spans as JSON")
+    parser.add_argument("--warm-up", action="store_true", help="Preload the Ollama model before the first ticket")
+    parser.add_argument("--skip-invalid", action="store_true", help="Skip tickets that fail validation instead of stopping")
+    args = parser.parse_args(argv)
+    if args.fast_path and not args.shipping_db:
+        parser.error("--fast-path answers from the shipping store; give it with --shipping-db")
+
+    cache = ResponseCache(path=args.cache, ttl=args.cache_ttl) if args.cache else None
+    ollama = OllamaModel(args.ollama, args.ollama_url or OLLAMA_BASE_URL) if args.ollama else None
+    model = ollama.get_model(cache) if ollama else get_model(cache)
+    agents = get_agent_pool("dependencies", model)
+    balanced = get_balanced_model(ollama.model_name, ollama.base_urls) if ollama and len(ollama.base_urls) > 1 else None
+    store = fast_path = None
+    if args.shipping_db:
+        from utils.shipping import SQLiteShippingStore
+        store = SQLiteShippingStore(args.shipping_db)
+    if args.fast_path:
+        from utils.fast_path import FastPath
+        fast_path = FastPath(store, response_type=ResponseModel)
+    semantic_cache = None
+    if args.semantic_cache:
+        from utils.semantic_cache import SemanticCache
+        semantic_cache = SemanticCache(args.semantic_cache, response_type=ResponseModel, threshold=args.similarity)
+        if semantic_cache.index.rebuilt:
+            print(f"{args.semantic_cache} was built with another embedder; starting it empty", file=sys.stderr)
+    ingest = IngestStats()
+    tickets = iter_tickets(args.path, errors="skip" if args.skip_invalid else "raise", stats=ingest)
+    held: List[Ticket] = []
+
+    def hold_offline(tickets: Iterable[Ticket]):
+        for ticket in tickets:
+            if ticket.query_type in args.offline:
+                held.append(ticket)
+            else:
+                yield ticket
+
+    if args.offline:
+        tickets = hold_offline(tickets)
+
+    telemetry = RetryTelemetry() if args.retry_log else None
+    if args.metrics_log:
+        registry.log_to(args.metrics_log)
+    if args.trace:
+        tracer.enable()
+
+    async def process(output=None):
+        # Warm up in the same event loop so the pooled connection is reused
+        if args.warm_up and ollama:
+            print(*await ollama.warm_up(), sep="\n", file=sys.stderr)
+        await run_batch(tickets, agents, args.concurrency, output, telemetry, semantic_cache, fast_path, store)
+        print(f"Read {ingest} from {args.path}", file=sys.stderr)
+        if held:
+            from utils.openai_batch import BatchClient
+            client = BatchClient(args.batch_url, http=get_http_client(args.batch_url))
+            model_name = args.batch_model or getattr(model, "model_name", "gpt-4o")
+            requeue = await run_offline(held, client, model_name, output, args.poll_interval)
+            if requeue:
+                print(f"Re-queuing {len(requeue)} offline tickets through the agent", file=sys.stderr)
+                await run_batch(requeue, agents, args.concurrency, output, telemetry, semantic_cache, fast_path, store)
+
+    async def run(output=None):
+        if balanced is None:
+            return await process(output)
+        # Re-admit recovered endpoints (and eject dead ones) while the batch runs
+        async with balanced.health_checks():
+            await process(output)
+        print(balanced.format_stats(), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            run_async(run(output))
+    else:
+        run_async(run())
+
+    if telemetry is not None:
+        telemetry.write_jsonl(args.retry_log)
+
+    print(registry.summary_table(), file=sys.stderr)
+    if registry.log is not None:
+        registry.log.close()
+    if args.metrics:
+        registry.write_prometheus(args.metrics)
+    if args.trace:
+        print(tracer.summary_table(), file=sys.stderr)
+        tracer.write_json(args.trace)
+
+    if cache is not None:
+        print(cache.stats, file=sys.stderr)
+        cache.close()
+    if semantic_cache is not None:
+        print(semantic_cache.stats, file=sys.stderr)
+        semantic_cache.close()
+    if store is not None:
+        print(f"shipping store: {store.stats}", file=sys.stderr)
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
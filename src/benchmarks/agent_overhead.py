@@ -0,0 +1,60 @@
+"""
+Microbenchmark: per-request framework overhead with and without the agent registry.
+
+"before" rebuilds the model and agent for every request, the way the examples
+used to inside `run_*_agent()`. "after" fetches the shared agent from
+`agents.get_agent`. Both run against pydantic-ai's `TestModel`, so the numbers
+are pure framework cost with no network or model latency.
+
+Usage (from src/):
+    python -m benchmarks.agent_overhead --requests 200
+"""
+
+import argparse
+import asyncio
+import importlib
+import time
+
+from pydantic_ai.models.test import TestModel
+
+from agents import AGENT_BUILDERS, clear_agents, get_agent
+from benchmarks.common import PROMPT, make_deps
+
+
+def make_model(kind: str) -> TestModel:
+    # TestModel would feed made-up order IDs to the self-correction tool and
+    # exhaust its retries, so only the tools agent actually calls its tools.
+    return TestModel(call_tools="all" if kind == "tools" else [])
+
+
+async def per_request(kind: str, requests: int, reuse: bool) -> float:
+    """Mean seconds per request for one agent kind."""
+    module_name, builder_name = AGENT_BUILDERS[kind]
+    builder = getattr(importlib.import_module(module_name), builder_name)
+    deps = make_deps(kind)
+    shared_model = make_model(kind)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        if reuse:
+            agent = get_agent(kind, shared_model)
+        else:
+            agent = builder(make_model(kind))
+        await agent.run(PROMPT, deps=deps)
+    return (time.perf_counter() - start) / requests
+
+
+async def main(requests: int):
+    print(f"{'agent':<16} {'before (us)':>12} {'after (us)':>12} {'speedup':>8}")
+    for kind in AGENT_BUILDERS:
+        clear_agents()
+        before = await per_request(kind, requests, reuse=False)
+        after = await per_request(kind, requests, reuse=True)
+        print(f"{kind:<16} {before * 1e6:>12.0f} {after * 1e6:>12.0f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request agent overhead before/after the registry")
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,97 @@
+"""
+Benchmark: bulk and parallel shipping lookups for customers with many orders.
+
+For customers with 1, 10 and 100 orders, a scripted model (fixed latency per
+request) asks for every order's status three ways, against a simulated
+carrier API (`RemoteShippingStore`, one request per order):
+- one per turn: a `get_shipping_status` call per model response (example 5),
+  so every order costs a model round-trip;
+- parallel calls: all `get_shipping_status` calls in one response, which
+  pydantic-ai runs concurrently;
+- bulk: one `get_order_statuses` call (example 4) for all of the customer's
+  orders, resolved concurrently by the async store.
+Reports model round-trips, carrier requests and wall time per run.
+
+Usage (from src/):
+    python -m benchmarks.bulk_tools --latency 0.3 --store-latency 0.02
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Tuple
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.usage import UsageLimits
+
+import agent4_tools
+import agent5_self_correction
+from agents import get_agent
+from utils.shipping import RemoteShippingStore
+from utils.simulated_model import SimulatedModel, args_from_schema
+from utils.tool_cache import TOOL_CACHES
+
+
+class ScriptedModel(SimulatedModel):
+    """`SimulatedModel` whose function tool calls follow `turns`, one list of calls per response."""
+
+    def __init__(self, turns: List[List[Tuple[str, Dict]]], **kwargs):
+        super().__init__(**kwargs)
+        self.turns = turns
+
+    def _respond(self, messages, params) -> ModelResponse:
+        turn = sum(isinstance(message, ModelResponse) for message in messages)
+        if turn < len(self.turns):
+            return ModelResponse(parts=[ToolCallPart(name, args) for name, args in self.turns[turn]])
+        tool = params.result_tools[0]
+        return ModelResponse(parts=[ToolCallPart(tool.name, args_from_schema(tool.parameters_json_schema))])
+
+
+async def one_per_turn(order_ids, store, latency) -> ScriptedModel:
+    model = ScriptedModel([[("get_shipping_status", {"order_id": o})] for o in order_ids], latency=latency)
+    customer = agent5_self_correction.CustomerDetails(customer_id="1", name="Jo", email="jo@example.com")
+    deps = agent5_self_correction.SupportDeps(customer=customer, shipping_store=store)
+    # 100 orders would exceed the default limit of 50 requests per run
+    limits = UsageLimits(request_limit=len(order_ids) + 1)
+    await get_agent("self-correction", model).run("Where are my orders?", deps=deps, usage_limits=limits)
+    return model
+
+
+async def parallel_calls(order_ids, store, latency) -> ScriptedModel:
+    model = ScriptedModel([[("get_shipping_status", {"order_id": o}) for o in order_ids]], latency=latency)
+    customer = agent5_self_correction.CustomerDetails(customer_id="1", name="Jo", email="jo@example.com")
+    deps = agent5_self_correction.SupportDeps(customer=customer, shipping_store=store)
+    await get_agent("self-correction", model).run("Where are my orders?", deps=deps)
+    return model
+
+
+async def bulk(order_ids, store, latency) -> ScriptedModel:
+    model = ScriptedModel([[("get_order_statuses", {})]], latency=latency)
+    orders = [agent4_tools.Order(order_id=o, status="unknown", items=[]) for o in order_ids]
+    customer = agent4_tools.CustomerDetails(customer_id="1", name="Jo", email="jo@example.com", orders=orders)
+    deps = agent4_tools.SupportDeps(customer=customer, shipping_store=store)
+    await get_agent("tools", model).run("Where are my orders?", deps=deps)
+    return model
+
+
+async def main(args):
+    statuses = {str(100000 + i): f"Shipped on 2024-12-{1 + i % 28:02d}" for i in range(max(args.orders))}
+    print(f"{'orders':>6} {'strategy':<15} {'round-trips':>11} {'carrier reqs':>12} {'wall s':>8}")
+    for count in args.orders:
+        order_ids = list(statuses)[:count]
+        for name, strategy in (("one per turn", one_per_turn), ("parallel calls", parallel_calls), ("bulk", bulk)):
+            for _, cache in TOOL_CACHES:
+                cache.clear()  # measure the lookups, not the tool cache
+            store = RemoteShippingStore(statuses, latency=args.store_latency)
+            start = time.perf_counter()
+            model = await strategy(order_ids, store, args.latency)
+            elapsed = time.perf_counter() - start
+            print(f"{count:>6} {name:<15} {model.requests:>11} {store.requests:>12} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk and parallel shipping lookup benchmark")
+    parser.add_argument("--orders", type=int, nargs="+", default=[1, 10, 100], help="Orders per customer")
+    parser.add_argument("--latency", type=float, default=0.3, help="Model latency per request in seconds")
+    parser.add_argument("--store-latency", type=float, default=0.02, help="Carrier API latency per order")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,91 @@
+"""
+Behaviour checks: end-to-end properties the examples and benchmarks rely on.
+
+Each check drives the real agents with a `FunctionModel` (no network) and
+raises `CheckFailed` with what went wrong; the benchmarks only time things.
+Checks use explicit raises rather than `assert`, so they still run under
+`python -O`.
+
+- replayed_prompt: a customer's second ticket continues their session
+  about a different order; the run must be prompted with the new order,
+  while the stored session keeps the first one.
+
+Usage (from src/):
+    python -m benchmarks.checks
+    python run_examples.py check replayed_prompt
+"""
+
+import sys
+from typing import Callable, Dict, List
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, SystemPromptPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agent4_tools import CustomerDetails, Order, SupportDeps, build_tools_agent
+from utils.sessions import SessionStore
+from utils.shipping import InMemoryShippingStore
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def _system_prompt(request: ModelMessage) -> str:
+    return "".join(p.content for p in request.parts if isinstance(p, SystemPromptPart))
+
+
+def check_replayed_prompt() -> None:
+    """Two tickets from one customer about different orders, the second continuing the session."""
+    requests: List[List[ModelMessage]] = []
+
+    def respond(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        requests.append(messages)
+        result = {"response": "Hi!", "needs_escalation": False, "follow_up_required": False, "sentiment": "neutral"}
+        return ModelResponse(parts=[ToolCallPart(info.result_tools[0].name, result)])
+
+    agent = build_tools_agent(FunctionModel(respond))
+    sessions = SessionStore()
+    try:
+        for order_id in ("12345", "67890"):
+            order = Order(order_id=order_id, status="unknown", items=[])
+            customer = CustomerDetails(customer_id="jo@example.com", name="Jo", email="jo@example.com", orders=[order])
+            deps = SupportDeps(customer=customer, shipping_store=InMemoryShippingStore({}))
+            history = sessions.load(customer.customer_id) or None
+            result = agent.run_sync("Where is my order?", deps=deps, message_history=history)
+            sessions.append(customer.customer_id, result.new_messages())
+        prompt = _system_prompt(requests[-1][0])
+        if "67890" not in prompt or "12345" in prompt:
+            raise CheckFailed(f"continued session replayed the first ticket's customer prompt: {prompt!r}")
+        stored = _system_prompt(sessions.load("jo@example.com")[0])
+        if "12345" not in stored:
+            raise CheckFailed(f"re-rendering the prompt changed the stored session: {stored!r}")
+    finally:
+        sessions.close()
+
+
+CHECKS: Dict[str, Callable[[], None]] = {
+    "replayed_prompt": check_replayed_prompt,
+}
+
+
+def main(argv=None) -> None:
+    """Run the named checks (all by default); exit with status 1 if any fails."""
+    names = list(argv or CHECKS)
+    unknown = [name for name in names if name not in CHECKS]
+    if unknown:
+        raise SystemExit(f"Unknown checks: {', '.join(unknown)} (available: {', '.join(CHECKS)})")
+    failed = 0
+    for name in names:
+        try:
+            CHECKS[name]()
+        except CheckFailed as exc:
+            failed += 1
+            print(f"FAIL {name}: {exc}")
+        else:
+            print(f"ok   {name}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
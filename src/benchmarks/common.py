@@ -0,0 +1,31 @@
+"""
+Shared fixtures for the benchmarks: deps and prompts for each agent kind.
+"""
+
+from agent3_dependencies import CustomerDetails as DepsCustomer, Order as DepsOrder
+from agent4_tools import CustomerDetails as ToolsCustomer, Order as ToolsOrder, SHIPPING_INFO_DB, SupportDeps
+from utils.shipping import InMemoryShippingStore
+
+PROMPT = "What's the status of my last order?"
+
+# Valid arguments for tools whose schema defaults would not resolve
+TOOL_ARGS = {"get_shipping_status": {"order_id": "#12345"}}
+
+
+def make_deps(kind: str):
+    """Deps matching each agent variant (None for agents without deps)."""
+    if kind == "dependencies":
+        return DepsCustomer(
+            customer_id="1", name="John Doe", email="john.doe@example.com",
+            orders=[DepsOrder(order_id="12345", status="shipped", items=["Blue Jeans", "T-Shirt"])],
+        )
+    if kind == "tools":
+        customer = ToolsCustomer(
+            customer_id="1", name="John Doe", email="john.doe@example.com",
+            orders=[ToolsOrder(order_id="12345", status="shipped", items=["Blue Jeans", "T-Shirt"])],
+        )
+        return SupportDeps(customer=customer, shipping_store=InMemoryShippingStore(SHIPPING_INFO_DB))
+    if kind == "self-correction":
+        customer = ToolsCustomer(customer_id="1", name="John Doe", email="john.doe@example.com")
+        return SupportDeps(customer=customer, shipping_store=InMemoryShippingStore(SHIPPING_INFO_DB))
+    return None
@@ -0,0 +1,101 @@
+"""
+Benchmark: the deterministic order-status fast path (utils/fast_path.py).
+
+Builds a labelled mix of tickets - plain status questions in several
+phrasings, plus complaints, refunds, policy questions, invoice questions,
+tickets naming two orders and orders the store does not know - and:
+- checks the classifier: how many plain status tickets it answers, and that
+  nothing labelled for the agent is answered locally;
+- runs the mix through batch mode against a local fake model server with
+  and without the fast path, reporting the fraction of traffic served
+  locally, fast-path latency and end-to-end throughput.
+
+Usage (from src/):
+    python -m benchmarks.fast_path --tickets 2000 --latency 0.2 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import io
+import random
+
+from agent3_dependencies import ResponseModel
+from agents import get_agent_pool
+from batch import run_batch
+from setup import OllamaModel, aclose_http_clients
+from utils.fake_openai_server import FakeOpenAIServer
+from utils.fast_path import FastPath
+from utils.shipping import InMemoryShippingStore
+from utils.tickets import Ticket
+
+ORDERS = 10_000
+# (description template, query type, whether the fast path should answer)
+TEMPLATES = [
+    ("Where is my order?", "shipping", True),
+    ("Where is my order #{order}?", "shipping", True),
+    ("What's the status of order {order}", "shipping", True),
+    ("Has order {order} shipped yet?", "shipping", True),
+    ("When will order #{order} arrive?", "shipping", True),
+    ("Can I get a tracking update for order {order}?", "shipping", True),
+    ("Where is order #{order}? I ordered it on 2024-11-28.", "shipping", True),
+    ("Has my order of 2 lamps shipped? I ordered them in 2024.", "shipping", True),
+    ("My order {order} still hasn't arrived, this is unacceptable!", "shipping", False),
+    ("Order {order} arrived damaged, I want a refund.", "shipping", False),
+    ("Can I change the delivery address for order {order}?", "shipping", False),
+    ("What is your shipping policy for international orders?", "shipping", False),
+    ("Where are orders {order} and {other}?", "shipping", False),
+    ("Where is my order #{unknown}?", "shipping", False),
+    ("I was charged twice for order {order}", "invoice", False),
+    ("Does the blue jacket come in medium?", "product", False),
+]
+
+
+def make_tickets(count: int, seed: int = 0):
+    """(ticket, expected fast-path answer) pairs; every other ticket carries its order_id."""
+    rng = random.Random(seed)
+    for i in range(count):
+        template, query_type, expected = TEMPLATES[i % len(TEMPLATES)]
+        order, other = rng.randrange(ORDERS), rng.randrange(ORDERS)
+        fields = {"order": 100000 + order, "other": 100000 + other, "unknown": 900000 + order}
+        with_order_id = "{order}" not in template or i % 2
+        yield Ticket(
+            ticket_id=f"T-{i:06d}",
+            customer_name=f"Customer {i % 500}",
+            email=f"customer{i % 500}@example.com",
+            query_type=query_type,
+            description=template.format(**fields),
+            order_id=str(fields["order"]) if with_order_id and "unknown" not in template else None,
+        ), expected
+
+
+async def main(args):
+    store = InMemoryShippingStore({str(100000 + i): f"Shipped on 2024-12-{1 + i % 28:02d}" for i in range(ORDERS)})
+    labelled = list(make_tickets(args.tickets))
+    tickets = [ticket for ticket, _ in labelled]
+
+    check = FastPath(store, response_type=ResponseModel)
+    answered = [await check.answer(ticket) is not None for ticket in tickets]
+    expected = sum(e for _, e in labelled)
+    correct = sum(a and e for a, (_, e) in zip(answered, labelled))
+    wrong = sum(a and not e for a, (_, e) in zip(answered, labelled))
+    print(f"classify answered {correct}/{expected} plain status tickets, {wrong} that should reach the agent")
+    print(f"         {check.stats}")
+
+    async with FakeOpenAIServer(latency=args.latency) as fake:
+        agents = get_agent_pool("dependencies", OllamaModel("fake-model", fake.base_url).get_model())
+        for name, fast_path in (("agent", None), ("fast", FastPath(store, response_type=ResponseModel))):
+            summary = await run_batch(
+                tickets, agents, args.concurrency, io.StringIO(), fast_path=fast_path, store=store
+            )
+            print(f"{name:<8} {summary['count']} tickets in {summary['elapsed_s']:.2f}s "
+                  f"({summary['throughput_rps']:.0f}/s), p50 {summary['p50_s'] * 1000:.1f}ms, "
+                  f"{summary['fast_path']} answered locally, {fake.stats.requests} model requests so far")
+    await aclose_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Order-status fast path benchmark")
+    parser.add_argument("-n", "--tickets", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake model latency in seconds")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,72 @@
+"""
+Load test: connection reuse with the pooled HTTP clients from setup.py.
+
+Starts a local fake OpenAI-compatible server and sends the same agent
+requests two ways:
+- fresh: a new provider and HTTP client per request (closed afterwards)
+- pooled: the shared keep-alive client from `setup.get_provider()`
+and reports TCP connections opened on the server and request latency.
+
+Usage (from src/):
+    python -m benchmarks.http_pool --requests 500 --concurrency 16 --latency 0.01
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from pydantic_ai.models.openai import OpenAIModel
+from pydantic_ai.providers.openai import OpenAIProvider
+
+from agent2_structured import build_structured_agent
+from setup import aclose_http_clients, configure_http_pool, get_provider
+from utils.fake_openai_server import FakeOpenAIServer
+from utils.stats import format_summary, latency_summary
+
+
+async def fresh_request(agent, base_url: str):
+    async with httpx.AsyncClient() as client:
+        model = OpenAIModel("fake-model", provider=OpenAIProvider(base_url=base_url, http_client=client))
+        return await agent.run("Where is my order?", model=model)
+
+
+async def pooled_request(agent, base_url: str):
+    model = OpenAIModel("fake-model", provider=get_provider(base_url))
+    return await agent.run("Where is my order?", model=model)
+
+
+async def load(server, agent, request, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    opened_before = server.stats.connections_opened
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await request(agent, server.base_url)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    summary = latency_summary(latencies, time.perf_counter() - start)
+    return summary, server.stats.connections_opened - opened_before
+
+
+async def main(args):
+    configure_http_pool(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with FakeOpenAIServer(latency=args.latency) as server:
+        agent = build_structured_agent(OpenAIModel("fake-model", provider=get_provider(server.base_url)))
+        for name, request in (("fresh", fresh_request), ("pooled", pooled_request)):
+            summary, connections = await load(server, agent, request, args.requests, args.concurrency)
+            print(f"{name:<7} connections opened: {connections:>5} | {format_summary(summary)}")
+        await aclose_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP connection pooling load test")
+    parser.add_argument("-n", "--requests", type=int, default=500)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.01, help="Simulated server latency in seconds")
+    parser.add_argument("--max-connections", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
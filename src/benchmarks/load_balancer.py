@@ -0,0 +1,105 @@
+"""
+Load test: least-outstanding-requests balancing across several endpoints.
+
+Starts `--servers` local fake OpenAI-compatible servers, each serving
+`--capacity` completions at a time (the last one slower than the rest), and
+runs the same agent requests against:
+- single: the first endpoint only
+- balanced: `setup.get_balanced_model()` across all of them
+then stops one server halfway through a second balanced run to show
+ejection, failover and re-admission by the health checks once it is back.
+
+Usage (from src/):
+    python -m benchmarks.load_balancer --servers 3 --capacity 4 --requests 600 --concurrency 24
+"""
+
+import argparse
+import asyncio
+import time
+
+from agent2_structured import build_structured_agent
+from setup import OllamaModel, aclose_http_clients
+from utils.fake_openai_server import FakeOpenAIServer
+from utils.stats import format_summary, latency_summary
+
+MODEL = "fake-model"
+
+
+async def load(agent, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await agent.run("Where is my order?")
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latency_summary(latencies, time.perf_counter() - start), errors
+
+
+async def outage(server: FakeOpenAIServer, after: float, duration: float):
+    await asyncio.sleep(after)
+    port = server.http.port
+    await server.close()
+    print(f"  stopped {server.base_url}")
+    await asyncio.sleep(duration)
+    server.http.port = port
+    await server.start()
+    print(f"  restarted {server.base_url}")
+
+
+async def main(args):
+    servers = [
+        FakeOpenAIServer(
+            latency=args.latency * (args.slow_factor if i == args.servers - 1 else 1), capacity=args.capacity
+        )
+        for i in range(args.servers)
+    ]
+    for server in servers:
+        await server.start()
+    urls = [server.base_url for server in servers]
+
+    single = build_structured_agent(OllamaModel(MODEL, urls[0]).get_model())
+    summary, errors = await load(single, args.requests, args.concurrency)
+    print(f"single   errors: {errors:>4} | {format_summary(summary)}")
+
+    balanced_model = OllamaModel(MODEL, urls).get_model(max_failures=2, eject_for=args.eject_for)
+    balanced = build_structured_agent(balanced_model)
+    summary, errors = await load(balanced, args.requests, args.concurrency)
+    print(f"balanced errors: {errors:>4} | {format_summary(summary)}")
+    print(balanced_model.format_stats())
+
+    print(f"\nbalanced run with an outage of {urls[0]}:")
+    health = balanced_model.start_health_checks(interval=args.eject_for / 2, timeout=1.0)
+    expected = summary["elapsed_s"] * 2
+    outage_task = asyncio.create_task(outage(servers[0], expected / 4, expected / 3))
+    summary, errors = await load(balanced, args.requests * 2, args.concurrency)
+    await outage_task
+    await balanced_model.check_health()
+    health.cancel()
+    print(f"balanced errors: {errors:>4} | {format_summary(summary)}")
+    print(balanced_model.format_stats())
+
+    await aclose_http_clients()
+    for server in servers:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load balancing across fake endpoints")
+    parser.add_argument("--servers", type=int, default=3)
+    parser.add_argument("-n", "--requests", type=int, default=600)
+    parser.add_argument("-c", "--concurrency", type=int, default=24)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated server latency in seconds")
+    parser.add_argument("--capacity", type=int, default=4, help="Concurrent completions per server")
+    parser.add_argument("--slow-factor", type=float, default=4.0, help="Latency multiplier of the last server")
+    parser.add_argument("--eject-for", type=float, default=1.0, help="Seconds a failing endpoint is ejected")
+    asyncio.run(main(parser.parse_args()))
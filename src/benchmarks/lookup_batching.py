@@ -0,0 +1,123 @@
+"""
+Benchmark: DataLoader-style batching of shipping lookups (BatchingShippingStore).
+
+The backend is a SQLite store with `--query-latency` added to every query,
+standing in for a database across the network; without batching each
+lookup is its own query, run from a worker thread as an async driver would.
+
+- store only: `--lookups` concurrent `aget` calls (with repeats), direct and
+  batched, reporting backend queries and wall time;
+- agent runs: `--runs` concurrent self-correction runs (example 5), each
+  asking a model with jittered latency about one order, so tool calls are
+  spread over time; batched with a same-tick window (0) and with short
+  windows.
+
+Usage (from src/):
+    python -m benchmarks.lookup_batching --runs 500 --query-latency 0.005
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+
+import agent5_self_correction
+from agents import get_agent_pool
+from utils.shipping import BatchingShippingStore, SQLiteShippingStore
+from utils.simulated_model import SimulatedModel, args_from_schema
+from utils.tool_cache import TOOL_CACHES
+
+ORDERS = 100_000
+
+
+class SlowSQLiteShippingStore(SQLiteShippingStore):
+    """SQLite store where every query also waits `latency` seconds, as over a network."""
+
+    def __init__(self, path: str, latency: float):
+        super().__init__(path)
+        self.latency = latency
+        self.queries = 0
+
+    def _lookup(self, keys):
+        keys = list(keys)
+        time.sleep(self.latency)
+        self.queries += -(-len(keys) // self.MAX_PARAMS)
+        return super()._lookup(keys)
+
+    async def aget_many(self, order_ids):
+        # An async driver: the query leaves the event loop
+        return await asyncio.to_thread(self.get_many, list(order_ids))
+
+
+class OrderLookupModel(SimulatedModel):
+    """Looks up the order named at the end of the prompt, after a jittered latency."""
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        return await super().request(messages, model_settings, model_request_parameters)
+
+    def _respond(self, messages, params) -> ModelResponse:
+        if len(messages) == 1:
+            order_id = messages[0].parts[-1].content.rsplit(" ", 1)[-1]
+            return ModelResponse(parts=[ToolCallPart("get_shipping_status", {"order_id": order_id})])
+        tool = params.result_tools[0]
+        return ModelResponse(parts=[ToolCallPart(tool.name, args_from_schema(tool.parameters_json_schema))])
+
+
+async def store_only(backend, args) -> None:
+    order_ids = [str(100000 + random.randrange(ORDERS)) for _ in range(args.lookups)]
+    order_ids += order_ids[:args.lookups // 4]  # some orders asked about twice
+    for name, store in (("direct", backend), ("batched", BatchingShippingStore(backend, window=0))):
+        queries = backend.queries
+        start = time.perf_counter()
+        await asyncio.gather(*(store.aget(order_id) for order_id in order_ids))
+        print(f"store    {name:<14} {len(order_ids)} lookups: {backend.queries - queries:>6} queries "
+              f"in {time.perf_counter() - start:.2f}s")
+
+
+async def agent_runs(backend, args) -> None:
+    agents = get_agent_pool("self-correction", OrderLookupModel(latency=args.model_latency))
+    customer = agent5_self_correction.CustomerDetails(customer_id="1", name="Jo", email="jo@example.com")
+    order_ids = [str(100000 + random.randrange(ORDERS)) for _ in range(args.runs)]
+    stores = [("direct", backend)] + [
+        (f"batched {window * 1000:g}ms", BatchingShippingStore(backend, window=window)) for window in args.windows
+    ]
+    for name, store in stores:
+        for _, cache in TOOL_CACHES:
+            cache.clear()  # measure the lookups, not the tool cache
+        deps = agent5_self_correction.SupportDeps(customer=customer, shipping_store=store)
+
+        async def one(order_id: str):
+            with agents.checkout() as agent:
+                await agent.run(f"Where is order {order_id}", deps=deps)
+
+        queries = backend.queries
+        start = time.perf_counter()
+        await asyncio.gather(*(one(order_id) for order_id in order_ids))
+        elapsed = time.perf_counter() - start
+        batches = f", {store.batch_stats}" if isinstance(store, BatchingShippingStore) else ""
+        print(f"runs     {name:<14} {args.runs} runs: {backend.queries - queries:>6} queries in {elapsed:.2f}s{batches}")
+
+
+async def main(args, directory: str):
+    backend = SlowSQLiteShippingStore(os.path.join(directory, "shipping.db"), args.query_latency)
+    backend.load((str(100000 + i), f"Shipped on 2024-12-{1 + i % 28:02d}") for i in range(ORDERS))
+    await store_only(backend, args)
+    await agent_runs(backend, args)
+    backend.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shipping lookup batching benchmark")
+    parser.add_argument("--lookups", type=int, default=5000, help="Concurrent lookups in the store-only test")
+    parser.add_argument("-n", "--runs", type=int, default=500, help="Concurrent agent runs")
+    parser.add_argument("--query-latency", type=float, default=0.005, help="Added latency per backend query")
+    parser.add_argument("--model-latency", type=float, default=0.1, help="Mean model latency per request")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.0, 0.002, 0.01], help="Batch windows (s)")
+    random.seed(0)
+    with tempfile.TemporaryDirectory(prefix="lookup_batching_") as directory:
+        asyncio.run(main(parser.parse_args(), directory))
@@ -0,0 +1,90 @@
+"""
+Benchmark: to_markdown over synthetic customers with growing order histories.
+
+Compares the original recursive renderer (string concatenation plus a
+`model_dump()` per nested call) with the current one (one `model_dump()`
+walked into a single buffer) on a fresh copy of the customer, which includes
+the memo check, and with the memoized path taken when the same immutable
+customer is rendered again. The two renderers are also checked to produce
+identical output.
+
+Usage (from src/):
+    python -m benchmarks.markdown_render --sizes 10 1000 100000
+"""
+
+import argparse
+import time
+
+from pydantic import BaseModel
+
+from agent4_tools import CustomerDetails, Order
+from utils.markdown import to_markdown
+
+ITEMS_PER_ORDER = 10
+
+
+def legacy_to_markdown(data, indent=0):
+    """The renderer as it was before the single-buffer rewrite."""
+    markdown = ""
+    if isinstance(data, BaseModel):
+        data = data.model_dump(mode="json")  # tuples as lists
+    if isinstance(data, dict):
+        for key, value in data.items():
+            markdown += f"{'#' * (indent + 2)} {key.upper()}\n"
+            if isinstance(value, (dict, list, BaseModel)):
+                markdown += legacy_to_markdown(value, indent + 1)
+            else:
+                markdown += f"{value}\n\n"
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, (dict, list, BaseModel)):
+                markdown += legacy_to_markdown(item, indent)
+            else:
+                markdown += f"- {item}\n"
+        markdown += "\n"
+    else:
+        markdown += f"{data}\n\n"
+    return markdown
+
+
+def make_customer(order_items: int) -> CustomerDetails:
+    """A customer whose orders contain `order_items` items in total."""
+    orders = []
+    for start in range(0, order_items, ITEMS_PER_ORDER):
+        count = min(ITEMS_PER_ORDER, order_items - start)
+        orders.append(Order(
+            order_id=f"{start // ITEMS_PER_ORDER:06d}",
+            status="shipped",
+            items=[f"Item {start + i}" for i in range(count)],
+        ))
+    return CustomerDetails(customer_id="1", name="John Doe", email="john.doe@example.com", orders=orders)
+
+
+def timed(func, *args, repeat: int = 3) -> float:
+    """Best-of-`repeat` wall time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes):
+    print(f"{'items':>8} {'legacy (ms)':>12} {'fresh (ms)':>12} {'memoized (us)':>14} {'chars':>10}")
+    for size in sizes:
+        customer = make_customer(size)
+        legacy = timed(legacy_to_markdown, customer)
+        fresh = timed(lambda c: to_markdown(c.model_copy()), customer)
+
+        rendered = to_markdown(customer)
+        assert rendered == legacy_to_markdown(customer), "renderers disagree"
+        memoized = timed(to_markdown, customer, repeat=100)
+
+        print(f"{size:>8} {legacy * 1e3:>12.2f} {fresh * 1e3:>12.2f} {memoized * 1e6:>14.2f} {len(rendered):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="to_markdown scaling benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 100_000])
+    main(parser.parse_args().sizes)
@@ -0,0 +1,91 @@
+"""
+Benchmark: offline Batch API submission of non-urgent tickets (batch.py --offline).
+
+Answers `--tickets` product questions against a local fake model server with
+a fixed `--capacity` (completions generated at once, like a GPU or a rate
+limit) two ways:
+- interactive: every ticket is an agent run through batch mode;
+- offline: all tickets become one batch JSONL file that the fake answers in
+  the background after `--batch-delay`, failing every `--fail-every`-th
+  request; validated answers are kept and the failures re-queued through
+  the agent.
+Reports wall time, interactive model requests and the size of the file.
+
+Usage (from src/):
+    python -m benchmarks.offline_batch --tickets 2000 --latency 0.2 --capacity 8
+"""
+
+import argparse
+import asyncio
+import io
+import time
+
+from agent3_dependencies import ResponseModel
+from agents import get_agent_pool
+from batch import offline_messages, run_batch, run_offline
+from setup import OllamaModel, aclose_http_clients
+from utils.fake_openai_server import FakeOpenAIServer
+from utils.openai_batch import BatchClient, batch_line, encode_jsonl
+from utils.tickets import Ticket
+
+QUESTIONS = [
+    "Does the Pro Model X-1000 come with a warranty?",
+    "What are the technical specifications of the X-1000?",
+    "Is the blue jacket available in medium?",
+    "Do you ship the standing desk to Canada?",
+]
+
+
+def make_tickets(count: int):
+    return [
+        Ticket(
+            ticket_id=f"PRD-{i:06d}",
+            customer_name=f"Customer {i % 500}",
+            email=f"customer{i % 500}@example.com",
+            query_type="product",
+            description=QUESTIONS[i % len(QUESTIONS)],
+        )
+        for i in range(count)
+    ]
+
+
+async def main(args):
+    tickets = make_tickets(args.tickets)
+    start = time.perf_counter()
+    data = encode_jsonl(batch_line(t.ticket_id, offline_messages(t), "fake-model", ResponseModel) for t in tickets)
+    print(f"batch file: {len(tickets)} requests, {len(data) / 1e6:.2f} MB built in {time.perf_counter() - start:.2f}s")
+
+    fake = FakeOpenAIServer(latency=args.latency, capacity=args.capacity,
+                            batch_delay=args.batch_delay, batch_fail_every=args.fail_every)
+    async with fake:
+        agents = get_agent_pool("dependencies", OllamaModel("fake-model", fake.base_url).get_model())
+
+        start = time.perf_counter()
+        summary = await run_batch(tickets, agents, args.concurrency, io.StringIO())
+        interactive_requests = fake.stats.requests
+        print(f"interactive {summary['count'] - summary['failed']} answered in {time.perf_counter() - start:.2f}s, "
+              f"{interactive_requests} model requests")
+
+        client = BatchClient(fake.base_url, api_key="fake")
+        start = time.perf_counter()
+        requeue = await run_offline(tickets, client, "fake-model", io.StringIO(), poll_interval=args.poll_interval)
+        requests_before = fake.stats.requests
+        if requeue:
+            await run_batch(requeue, agents, args.concurrency, io.StringIO())
+        print(f"offline     {len(tickets) - len(requeue)} from the batch + {len(requeue)} re-queued "
+              f"in {time.perf_counter() - start:.2f}s, {fake.stats.requests - requests_before} model requests, "
+              f"{client.stats.polls} polls")
+        await client.aclose()
+    await aclose_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline batch submission benchmark")
+    parser.add_argument("-n", "--tickets", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake model latency per completion")
+    parser.add_argument("--capacity", type=int, default=8, help="Completions the fake generates at once")
+    parser.add_argument("--batch-delay", type=float, default=2.0, help="Seconds before the fake answers a batch")
+    parser.add_argument("--fail-every", type=int, default=50, help="Fail every n-th batch request")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,71 @@
+"""
+Benchmark: the cached `add_customer_name` system prompt versus rendering per run.
+
+Simulates `--requests` runs spread over `--customers` customers whose deps are
+rebuilt for every run (as batch mode does per ticket), so the identity memo
+in `to_markdown` never hits and only the content-hash cache can help. Runs are
+issued concurrently in waves of `--concurrency`. Every customer has
+`--items` order items; a second pass changes one order per customer to show
+the invalidation.
+
+Usage (from src/):
+    python -m benchmarks.prompt_cache --requests 5000 --customers 50 --items 200
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from agent3_dependencies import Order, add_customer_name
+from benchmarks.markdown_render import make_customer
+from utils.markdown import to_markdown
+
+
+async def uncached(ctx) -> str:
+    return f"Customer details: {to_markdown(ctx.deps)}"
+
+
+async def run(prompt, customers, requests: int, concurrency: int) -> float:
+    """Seconds to build the prompt for `requests` runs with freshly built deps."""
+    start = time.perf_counter()
+    for wave in range(0, requests, concurrency):
+        contexts = [
+            SimpleNamespace(deps=customers[i % len(customers)].model_copy(deep=True))
+            for i in range(wave, min(requests, wave + concurrency))
+        ]
+        await asyncio.gather(*(prompt(ctx) for ctx in contexts))
+    return time.perf_counter() - start
+
+
+async def main(requests: int, customers: int, items: int, concurrency: int):
+    base = make_customer(items)
+    population = [base.model_copy(update={"customer_id": str(i)}) for i in range(customers)]
+
+    before = await run(uncached, population, requests, concurrency)
+    after = await run(add_customer_name, population, requests, concurrency)
+    stats = add_customer_name.cache.stats
+    print(f"{'prompt':<12} {'total ms':>9} {'per run us':>11}")
+    print(f"{'uncached':<12} {before * 1e3:>9.1f} {before / requests * 1e6:>11.1f}")
+    print(f"{'cached':<12} {after * 1e3:>9.1f} {after / requests * 1e6:>11.1f}")
+    print(f"cache: {stats}")
+
+    # Every customer's first order changes: each is rendered once more, then hits again
+    changed = [
+        c.model_copy(update={"orders": (Order(order_id=c.orders[0].order_id, status="delivered",
+                                              items=c.orders[0].items), *c.orders[1:])})
+        for c in population
+    ]
+    misses = stats.misses
+    await run(add_customer_name, changed, requests, concurrency)
+    print(f"after order changes: {stats.misses - misses} new renders for {customers} customers")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cached dynamic system prompt benchmark")
+    parser.add_argument("-n", "--requests", type=int, default=5_000)
+    parser.add_argument("--customers", type=int, default=50)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.customers, args.items, args.concurrency))
@@ -0,0 +1,159 @@
+"""
+Benchmark: the local semantic cache (utils/semantic_cache.py).
+
+Fills a memory-mapped index with `--entries` synthetic tickets (a few
+phrasings of shipping, return and invoice questions over many customers
+and orders) and reports:
+- indexing throughput and size on disk;
+- reopen time: the columns are memory-mapped, not loaded;
+- single and batched lookup latency, for rephrased repeats of indexed
+  tickets (which should hit) and the same phrasings about orders that were
+  never indexed (which must miss, whatever the similarity);
+- a brute-force search over one scope of `--scope-rows` rows, the worst case
+  for a shared scope such as FAQ answers;
+- the same wording from one customer about two orders given only as the
+  ticket's `order_id` (which must miss);
+- example similarities against the `--similarity` threshold.
+
+Usage (from src/):
+    python -m benchmarks.semantic_cache --entries 300000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from agent3_dependencies import ResponseModel
+from utils.semantic_cache import HashingEmbedder, SemanticCache, content_words, normalize
+from utils.stats import format_summary, latency_summary
+
+# (indexed phrasing, rephrased repeat) per query type
+PHRASINGS = {
+    "shipping": [
+        ("Where is my order {order}?", "where is my order #{order} please"),
+        ("Has order {order} shipped yet?", "Has my order {order} shipped yet"),
+        ("Tracking for order {order} has not updated in a week", "tracking for my order {order} has not updated for a week"),
+    ],
+    "returns": [
+        ("I want to return order {order}", "I would like to return my order #{order}"),
+        ("How do I get a refund for order {order}?", "how can I get a refund for order {order}"),
+    ],
+    "invoice": [
+        ("I was charged twice for order {order}", "I was charged twice on order #{order}!"),
+        ("Please send a copy of the invoice for order {order}", "Can you send a copy of the invoice for order {order}?"),
+    ],
+}
+EXAMPLES = [
+    ("Where is my order #12345?", "where is my order 12345"),
+    ("Where is my order 12345?", "Where is my order 12345? It has been a week."),
+    ("Where is my order 12345?", "track order 12345"),
+    ("Where is my order 12345?", "I want to return order 12345"),
+    ("What is your shipping policy for international orders?", "what's the shipping policy for orders abroad"),
+    ("I was charged twice on my invoice", "why was I billed twice on the invoice"),
+]
+
+
+def entry(i: int, customers: int):
+    query_type = list(PHRASINGS)[i % len(PHRASINGS)]
+    indexed, rephrased = PHRASINGS[query_type][(i // len(PHRASINGS)) % len(PHRASINGS[query_type])]
+    customer = f"customer{i % customers}@example.com"
+    order = 100000 + i
+    response = ResponseModel(
+        response=f"Update on order {order}.", needs_escalation=False, follow_up_required=False, sentiment="neutral"
+    )
+    return indexed.format(order=order), rephrased.format(order=order), response, customer, query_type, order
+
+
+def time_lookups(cache: SemanticCache, queries, batch_size: int):
+    """(per-query latency summary of single lookups, batched queries/s, hits)."""
+    latencies = []
+    for query in queries[:1000]:
+        start = time.perf_counter()
+        cache.lookup_many([query])
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    hits = 0
+    for i in range(0, len(queries), batch_size):
+        hits += sum(hit is not None for hit in cache.lookup_many(queries[i:i + batch_size]))
+    return latency_summary(latencies, sum(latencies)), len(queries) / (time.perf_counter() - start), hits
+
+
+def main(args):
+    directory = tempfile.mkdtemp(prefix="semantic_cache_")
+    rng = random.Random(0)
+    try:
+        cache = SemanticCache(directory, response_type=ResponseModel, threshold=args.similarity)
+        start = time.perf_counter()
+        for first in range(0, args.entries, 10_000):
+            chunk = [entry(i, args.customers) for i in range(first, min(first + 10_000, args.entries))]
+            cache.add_many([(query, response, customer, query_type) for query, _, response, customer, query_type, _ in chunk])
+        elapsed = time.perf_counter() - start
+        cache.close()
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"index    {args.entries} entries in {elapsed:.1f}s ({args.entries / elapsed:,.0f}/s), "
+              f"{size / 1e6:.0f} MB on disk")
+
+        start = time.perf_counter()
+        cache = SemanticCache(directory, response_type=ResponseModel, threshold=args.similarity)
+        print(f"reopen   {(time.perf_counter() - start) * 1000:.1f}ms for {cache.stats.entries} entries")
+
+        sample = [entry(i, args.customers) for i in rng.sample(range(args.entries), args.queries)]
+        repeats = [(rephrased, customer, query_type) for _, rephrased, _, customer, query_type, _ in sample]
+        # Same customer, type and wording, but an order that was never indexed
+        unseen = [(query.replace(str(order), str(order + args.entries)), customer, query_type)
+                  for query, _, _, customer, query_type, order in sample]
+        for name, queries in (("repeats", repeats), ("unseen", unseen)):
+            single, per_s, hits = time_lookups(cache, queries, args.batch_size)
+            print(f"{name:<8} hits {hits}/{len(queries)} ({hits / len(queries):.1%}) | "
+                  f"batched {per_s:,.0f} queries/s (batches of {args.batch_size})")
+            print(f"         single lookup {format_summary(single)}")
+
+        embedder = HashingEmbedder()
+        rows = np.stack([embedder.embed(f"question {i} about shipping to region {i % 97}") for i in range(1000)])
+        shared = SemanticCache(response_type=ResponseModel, threshold=args.similarity)
+        response = ResponseModel(
+            response="See our shipping policy.", needs_escalation=False, follow_up_required=False, sentiment="neutral"
+        )
+        shared.add_many([(f"faq {i}", response, None, "faq") for i in range(args.scope_rows)])
+        # Overwrite with varied vectors: the benchmark is about search cost, not about these texts
+        shared.index.vectors[:args.scope_rows] = rows[np.arange(args.scope_rows) % len(rows)]
+        queries = [("What is your shipping policy for international orders?", None, "faq")] * args.batch_size
+        start = time.perf_counter()
+        shared.lookup_many(queries)
+        elapsed = time.perf_counter() - start
+        print(f"scope    {args.batch_size} queries against one scope of {args.scope_rows} rows in "
+              f"{elapsed * 1000:.0f}ms ({args.scope_rows * args.batch_size / elapsed / 1e9:.2f}G similarities/s)")
+
+        scoped = SemanticCache(response_type=ResponseModel, threshold=args.similarity)
+        scoped.add("Where is my order?", response, customer="jo@example.com", query_type="shipping", order_id="12345")
+        same = scoped.lookup("where's my order", customer="jo@example.com", query_type="shipping", order_id="12345")
+        other = scoped.lookup("where's my order", customer="jo@example.com", query_type="shipping", order_id="67890")
+        assert same is not None and other is None, "order_id must scope lookups"
+        print("order_id same order hit, other order miss")
+
+        print(f"\nsimilarity (threshold {args.similarity}, order numbers are matched by scope)")
+        for a, b in EXAMPLES:
+            va, vb = (embedder.embed_words(content_words(normalize(text))) for text in (a, b))
+            similarity = float(va @ vb)
+            verdict = "hit" if similarity >= args.similarity else "miss"
+            print(f"  {similarity:5.2f} {verdict:<4} {a!r} ~ {b!r}")
+        print(f"\n{cache.stats}")
+        cache.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Semantic cache benchmark")
+    parser.add_argument("--entries", type=int, default=300_000)
+    parser.add_argument("--customers", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=2000, help="Lookups per scenario")
+    parser.add_argument("--batch-size", type=int, default=256, help="Queries per batched lookup")
+    parser.add_argument("--scope-rows", type=int, default=200_000, help="Rows in the shared-scope search")
+    parser.add_argument("--similarity", type=float, default=0.8)
+    main(parser.parse_args())
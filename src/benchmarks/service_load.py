@@ -0,0 +1,113 @@
+"""
+Load test: the support service (server.py) against a local fake model server.
+
+Starts a `FakeOpenAIServer` and the service in process, with the service's
+single agent and pooled client pointed at the fake. Keep-alive clients then:
+- send `--requests` tickets at `--concurrency` and report latency/throughput,
+  connections opened on both servers, and 200/429 counts;
+- stream tickets over SSE and report time to the first partial event;
+- burst `--burst` tickets at once to show queueing and 429 backpressure.
+
+Usage (from src/):
+    python -m benchmarks.service_load --requests 500 --concurrency 32 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import httpx
+
+from agents import get_agent_pool
+from agent4_tools import SHIPPING_INFO_DB
+from server import SupportService
+from setup import OllamaModel, aclose_http_clients, configure_http_pool
+from utils.fake_openai_server import FakeOpenAIServer
+from utils.shipping import InMemoryShippingStore
+from utils.stats import format_summary, latency_summary
+
+TICKET = {
+    "ticket_id": "T-1",
+    "customer_name": "John Doe",
+    "email": "john.doe@example.com",
+    "query_type": "shipping",
+    "description": "Where is my order?",
+    "order_id": "12345",
+}
+
+
+async def send(client: httpx.AsyncClient, url: str, statuses: Counter, latencies: list) -> None:
+    start = time.perf_counter()
+    response = await client.post(f"{url}/v1/tickets", json=TICKET)
+    statuses[response.status_code] += 1
+    if response.status_code == 200:
+        latencies.append(time.perf_counter() - start)
+
+
+async def stream(client: httpx.AsyncClient, url: str) -> tuple:
+    """(seconds to the first partial event, seconds to the result, events received, last event data)."""
+    start, first, events = time.perf_counter(), None, 0
+    async with client.stream("POST", f"{url}/v1/tickets/stream", json=TICKET) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("event: partial") and first is None:
+                first = time.perf_counter() - start
+            if line.startswith("data: "):
+                events += 1
+                data = json.loads(line[len("data: "):])
+    return first, time.perf_counter() - start, events, data
+
+
+async def main(args):
+    # Keep a pooled connection to the model per run slot
+    configure_http_pool(max_keepalive_connections=max(20, args.concurrency))
+    fake = FakeOpenAIServer(latency=args.latency, chunk_delay=args.chunk_delay, capacity=args.model_capacity)
+    async with fake:
+        agents = get_agent_pool("tools", OllamaModel("fake-model", fake.base_url).get_model())
+        service = SupportService(
+            agents, InMemoryShippingStore(SHIPPING_INFO_DB), concurrency=args.concurrency, queue=args.queue, port=0
+        )
+        async with service, httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=1000)) as client:
+            statuses, latencies = Counter(), []
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one():
+                async with semaphore:
+                    await send(client, service.url, statuses, latencies)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.requests)))
+            print(f"steady   {format_summary(latency_summary(latencies, time.perf_counter() - start))}")
+            print(f"         statuses {dict(statuses)} | connections: client->service "
+                  f"{service.http.stats.connections_opened}, service->model {fake.stats.connections_opened}")
+
+            first, total, events, result = await stream(client, service.url)
+            print(f"stream   first partial {first * 1000:.0f}ms, result {total * 1000:.0f}ms, {events} events")
+            print(f"         result {result}")
+
+            statuses, latencies = Counter(), []
+            start = time.perf_counter()
+            await asyncio.gather(*(send(client, service.url, statuses, latencies) for _ in range(args.burst)))
+            print(f"burst    {args.burst} at once with {args.concurrency} slots + {args.queue} queued: "
+                  f"statuses {dict(statuses)} in {time.perf_counter() - start:.2f}s")
+
+            health = (await client.get(f"{service.url}/healthz")).json()
+            print(f"health   {health}")
+            metrics = (await client.get(f"{service.url}/metrics")).text
+            print("metrics  " + "\n         ".join(
+                line for line in metrics.splitlines() if line.startswith(("agent_service", "agent_runs_total"))
+            ))
+        await aclose_http_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Support service load test")
+    parser.add_argument("-n", "--requests", type=int, default=500)
+    parser.add_argument("-c", "--concurrency", type=int, default=32, help="Service run slots (and client concurrency)")
+    parser.add_argument("-q", "--queue", type=int, default=32, help="Service queue size")
+    parser.add_argument("--burst", type=int, default=200, help="Tickets sent at once in the backpressure test")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake model latency in seconds")
+    parser.add_argument("--chunk-delay", type=float, default=0.005, help="Delay between streamed chunks")
+    parser.add_argument("--model-capacity", type=int, help="Completions the fake model serves at once")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,150 @@
+"""
+Benchmark: the persistent per-customer session store (utils/sessions.py).
+
+Plays `--turns` rounds over `--sessions` live conversations: each round
+visits every session in random order, loads its history and appends a new
+turn shaped like a tools-agent run (system prompts on the first turn, a
+user prompt, a shipping tool call and its return, the final result). The
+stores compared:
+- rewrite: one compressed blob per customer, re-read and rewritten every
+  turn, as when persisting `result.all_messages()`;
+- append: `SessionStore` with an LRU smaller than the number of sessions;
+- append, all hot: `SessionStore` whose LRU holds every session.
+Reports load and save latency, bytes written per turn, the file size and
+the compression against plain JSON (and plain zlib without the preset
+dictionary). That a continued session re-renders the customer prompt is
+checked separately, by `python -m benchmarks.checks`.
+
+Usage (from src/):
+    python -m benchmarks.session_store --sessions 10000 --turns 5
+"""
+
+import argparse
+import array
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import zlib
+from typing import List
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+from agent3_dependencies import SYSTEM_PROMPT
+from utils.sessions import SessionStore, compress_turn, decode_turn
+from utils.stats import percentile
+
+QUESTIONS = [
+    "Where is my order?", "When will it arrive?", "Can I change the delivery address?",
+    "Has it shipped yet?", "Thanks, and how do returns work?",
+]
+
+
+def make_turn(customer: int, turn: int) -> List[ModelMessage]:
+    """The new messages of one tools-agent run."""
+    order_id = str(100000 + customer)
+    parts = [UserPromptPart(QUESTIONS[turn % len(QUESTIONS)])]
+    if turn == 0:
+        details = f"Customer details: ## CUSTOMER_ID\ncustomer{customer}@example.com\n\n## ORDERS\n- {order_id}\n"
+        parts = [SystemPromptPart(SYSTEM_PROMPT), SystemPromptPart(details)] + parts
+    call_id, result_id = f"call_{customer}_{turn}a", f"call_{customer}_{turn}b"
+    result = {"response": f"Hi! Order {order_id} shipped on 2024-12-{1 + customer % 28:02d} and is on its way.",
+              "needs_escalation": False, "follow_up_required": False, "sentiment": "neutral"}
+    return [
+        ModelRequest(parts=parts),
+        ModelResponse(parts=[ToolCallPart("get_shipping_info", {}, call_id)], model_name="gpt-4o"),
+        ModelRequest(parts=[ToolReturnPart("get_shipping_info", f"Shipped on 2024-12-{1 + customer % 28:02d}", call_id)]),
+        ModelResponse(parts=[ToolCallPart("final_result", result, result_id)], model_name="gpt-4o"),
+        ModelRequest(parts=[ToolReturnPart("final_result", "Final result processed.", result_id)]),
+    ]
+
+
+class RewriteSessionStore:
+    """Baseline: the whole history as one compressed blob, rewritten on every turn."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE sessions (customer_id TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        self.bytes_written = 0
+
+    def load(self, customer_id: str) -> List[ModelMessage]:
+        row = self._db.execute("SELECT data FROM sessions WHERE customer_id = ?", (customer_id,)).fetchone()
+        return decode_turn(row[0]) if row else []
+
+    def append(self, customer_id: str, messages: List[ModelMessage]) -> None:
+        data = compress_turn(ModelMessagesTypeAdapter.dump_json(self.load(customer_id) + messages))
+        self._db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?)", (customer_id, data))
+        self._db.commit()
+        self.bytes_written += len(data)
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def play(store, args) -> None:
+    loads, saves = array.array("d"), array.array("d")
+    customers = list(range(args.sessions))
+    start = time.perf_counter()
+    for turn in range(args.turns):
+        random.shuffle(customers)
+        for customer in customers:
+            customer_id = f"customer{customer}@example.com"
+            t0 = time.perf_counter()
+            history = store.load(customer_id)
+            t1 = time.perf_counter()
+            store.append(customer_id, make_turn(customer, turn))
+            saves.append(time.perf_counter() - t1)
+            loads.append(t1 - t0)
+            assert len(history) == 5 * turn
+    elapsed = time.perf_counter() - start
+    print(f"  {len(loads)} turns in {elapsed:.1f}s | load p50 {percentile(loads, 50) * 1000:.3f}ms "
+          f"p99 {percentile(loads, 99) * 1000:.3f}ms | save p50 {percentile(saves, 50) * 1000:.3f}ms "
+          f"p99 {percentile(saves, 99) * 1000:.3f}ms")
+
+
+def main(args, directory: str):
+    turns = [make_turn(0, turn) for turn in range(args.turns)]
+    raw = [len(ModelMessagesTypeAdapter.dump_json(t)) for t in turns]
+    plain = [len(zlib.compress(ModelMessagesTypeAdapter.dump_json(t), 6)) for t in turns]
+    preset = [len(compress_turn(ModelMessagesTypeAdapter.dump_json(t))) for t in turns]
+    print(f"bytes per turn (first / later): JSON {raw[0]} / {raw[-1]}, zlib {plain[0]} / {plain[-1]}, "
+          f"zlib + preset dictionary {preset[0]} / {preset[-1]}")
+
+    total = args.sessions * args.turns
+    path = os.path.join(directory, "rewrite.sqlite")
+    print(f"rewrite ({args.sessions} sessions)")
+    store = RewriteSessionStore(path)
+    play(store, args)
+    print(f"  {store.bytes_written / total:.0f} bytes written per turn, file {os.path.getsize(path) / 1e6:.1f} MB")
+    store.close()
+
+    for name, memory in (("append", args.memory_sessions), ("append, all hot", args.sessions)):
+        path = os.path.join(directory, f"{name}.sqlite".replace(", ", "_").replace(" ", "_"))
+        print(f"{name} ({args.sessions} sessions, LRU of {memory})")
+        store = SessionStore(path, max_memory_sessions=memory)
+        play(store, args)
+        print(f"  {store.stats}")
+        print(f"  file {os.path.getsize(path) / 1e6:.1f} MB")
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session store benchmark")
+    parser.add_argument("-n", "--sessions", type=int, default=10_000, help="Live conversations")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per conversation")
+    parser.add_argument("--memory-sessions", type=int, default=1024, help="LRU size of the smaller store")
+    random.seed(0)
+    with tempfile.TemporaryDirectory(prefix="session_store_") as directory:
+        main(parser.parse_args(), directory)
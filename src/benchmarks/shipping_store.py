@@ -0,0 +1,56 @@
+"""
+Benchmark: shipping-status lookups against the SQLite store at scale.
+
+Loads N synthetic orders (stored as "#<id>") into an on-disk SQLite store,
+then performs point lookups using both the stored form and the bare form
+the model usually sends. Reports load time, lookup latency, peak RSS and how
+many lookups the canonical index rescued from a `ModelRetry`.
+
+Usage (from src/):
+    python -m benchmarks.shipping_store --rows 1000000 --lookups 100000
+"""
+
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+
+from utils.shipping import SQLiteShippingStore
+from utils.stats import percentile
+
+
+def main(rows: int, lookups: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteShippingStore(os.path.join(tmp, "shipping.sqlite"))
+
+        start = time.perf_counter()
+        store.load((f"#{i:08d}", "Shipped on 2024-12-01") for i in range(rows))
+        print(f"Loaded {rows:,} rows in {time.perf_counter() - start:.2f}s")
+
+        rng = random.Random(0)
+        latencies = []
+        for n in range(lookups):
+            order_id = f"{rng.randrange(rows):08d}"
+            if n % 2:
+                order_id = "#" + order_id
+            start = time.perf_counter()
+            assert store.get(order_id) is not None
+            latencies.append(time.perf_counter() - start)
+
+        print(
+            f"{lookups:,} lookups: p50 {percentile(latencies, 50) * 1e6:.1f}us "
+            f"p99 {percentile(latencies, 99) * 1e6:.1f}us"
+        )
+        print(f"Lookup stats: {store.stats}")
+        print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite shipping store benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.rows, args.lookups)
@@ -0,0 +1,165 @@
+"""
+Offline benchmark suite for the five example agents.
+
+Every agent configuration from the registry is driven by `SimulatedModel`, a
+deterministic stand-in with configurable latency and token counts, so the
+numbers isolate framework cost from real model latency:
+
+- overhead: mean wall time per request with a zero-latency model
+- throughput: requests/s and p50/p95/p99 at several concurrency levels with
+  the configured simulated latency (overhead = wall - model time)
+- memory: tracemalloc peak and retained bytes per request
+
+Results are written as JSON so runs can be diffed across commits.
+
+Usage (from src/):
+    python run_examples.py bench --latency 0.05 --concurrency 1 8 64 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import metadata
+
+from agents import AGENT_BUILDERS, get_agent, get_agent_pool
+from benchmarks.common import PROMPT, TOOL_ARGS, make_deps
+from utils.simulated_model import SimulatedModel
+from utils.stats import latency_summary
+
+
+def make_model(latency: float, request_tokens: int, response_tokens: int) -> SimulatedModel:
+    return SimulatedModel(
+        latency=latency, request_tokens=request_tokens, response_tokens=response_tokens, tool_args=TOOL_ARGS
+    )
+
+
+async def measure_overhead(kind: str, requests: int) -> dict:
+    """Per-request framework time against a zero-latency model."""
+    model = make_model(0.0, 0, 0)
+    agent, deps = get_agent(kind, model), make_deps(kind)
+    await agent.run(PROMPT, deps=deps)  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await agent.run(PROMPT, deps=deps)
+    elapsed = time.perf_counter() - start
+    return {
+        "overhead_us_per_request": elapsed / requests * 1e6,
+        "model_requests_per_run": (model.requests - 1) / requests,
+    }
+
+
+async def measure_throughput(kind: str, requests: int, concurrency: int, model: SimulatedModel) -> dict:
+    """Throughput and latency percentiles with `concurrency` runs in flight."""
+    agents, deps = get_agent_pool(kind, model), make_deps(kind)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            with agents.checkout() as agent:
+                result = await agent.run(PROMPT, deps=deps)
+            latencies.append(time.perf_counter() - start)
+            return result.usage()
+
+    start = time.perf_counter()
+    usages = await asyncio.gather(*(one() for _ in range(requests)))
+    summary = latency_summary(latencies, time.perf_counter() - start)
+
+    model_time = sum(u.requests for u in usages) * model.latency
+    summary["overhead_ms_per_request"] = (sum(latencies) - model_time) / requests * 1e3
+    summary["tokens_per_request"] = sum(u.total_tokens or 0 for u in usages) / requests
+    summary["concurrency"] = concurrency
+    return summary
+
+
+async def measure_memory(kind: str, requests: int) -> dict:
+    """tracemalloc peak and retained memory across `requests` runs."""
+    agent, deps = get_agent(kind, make_model(0.0, 0, 0)), make_deps(kind)
+    await agent.run(PROMPT, deps=deps)  # warm-up so lazy imports/schemas don't count
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(requests):
+            await agent.run(PROMPT, deps=deps)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_kib": (peak - baseline) / 1024,
+        "retained_bytes_per_request": (current - baseline) / requests,
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        pydantic_ai_version = metadata.version("pydantic-ai-slim")
+    except metadata.PackageNotFoundError:
+        pydantic_ai_version = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pydantic_ai": pydantic_ai_version,
+    }
+
+
+async def run_suite(args) -> dict:
+    results = {"environment": environment(), "parameters": vars(args), "agents": {}}
+    for kind in args.agents:
+        print(f"Benchmarking {kind}...", file=sys.stderr)
+        model = make_model(args.latency, args.request_tokens, args.response_tokens)
+        entry = await measure_overhead(kind, args.requests)
+        entry["throughput"] = [
+            await measure_throughput(kind, args.requests, concurrency, model) for concurrency in args.concurrency
+        ]
+        entry["memory"] = await measure_memory(kind, args.requests)
+        results["agents"][kind] = entry
+    return results
+
+
+def print_report(results: dict) -> None:
+    print(f"{'agent':<16} {'overhead':>10} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'peak KiB':>9}")
+    for kind, entry in results["agents"].items():
+        for row in entry["throughput"]:
+            print(
+                f"{kind:<16} {entry['overhead_us_per_request']:>8.0f}us {row['concurrency']:>5} "
+                f"{row['throughput_rps']:>9.1f} {row['p50_s'] * 1e3:>8.1f} {row['p99_s'] * 1e3:>8.1f} "
+                f"{entry['memory']['peak_kib']:>9.0f}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="run_examples.py bench", description="Offline benchmark of the example agents")
+    parser.add_argument("--agents", nargs="+", default=list(AGENT_BUILDERS), choices=list(AGENT_BUILDERS))
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Requests per measurement")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per model request")
+    parser.add_argument("--request-tokens", type=int, default=200)
+    parser.add_argument("--response-tokens", type=int, default=50)
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("-o", "--output", default="bench_results.json", help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_suite(args))
+    print_report(results)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
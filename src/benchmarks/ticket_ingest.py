@@ -0,0 +1,112 @@
+"""
+Benchmark: streaming JSONL ticket ingestion.
+
+Writes a synthetic JSONL feed of `--lines` tickets (reused if it exists) and
+reads it three ways:
+- per line: `Ticket.model_validate_json` on each line, the straightforward loop
+- batched: `iter_tickets`, validating `--batch-size` lines per TypeAdapter call
+- batched, gzip: the same feed compressed
+reporting tickets/s and MB/s. A second pass under tracemalloc reads the
+first 10% and then the whole feed; with streaming ingestion the peak memory
+is the same for both, independent of the file size.
+
+Usage (from src/):
+    python -m benchmarks.ticket_ingest --lines 1000000 --batch-size 100
+"""
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+
+from utils.tickets import IngestStats, Ticket, iter_tickets
+
+QUERY_TYPES = ("shipping", "invoice", "product", "returns")
+
+
+def write_feed(path: str, lines: int) -> None:
+    with open(path, "w") as f:
+        for i in range(lines):
+            f.write(json.dumps({
+                "ticket_id": f"T-{i:07d}",
+                "customer_name": f"Customer {i % 5000}",
+                "email": f"customer{i % 5000}@example.com",
+                "query_type": QUERY_TYPES[i % len(QUERY_TYPES)],
+                "description": "Where is my order? It was supposed to arrive last week and tracking has not updated.",
+                "order_id": f"{i % 100000:05d}" if i % 3 else None,
+            }) + "\n")
+
+
+def per_line(path: str) -> int:
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                Ticket.model_validate_json(line)
+                count += 1
+    return count
+
+
+def batched(path: str, batch_size: int) -> int:
+    return sum(1 for _ in iter_tickets(path, batch_size=batch_size))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    count = func(*args)
+    return count, time.perf_counter() - start
+
+
+def peak_memory(path: str, batch_size: int, limit: int) -> int:
+    """Peak traced bytes while consuming the first `limit` tickets."""
+    tracemalloc.start()
+    for _ in islice(iter_tickets(path, batch_size=batch_size), limit):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main(args):
+    directory = args.dir or tempfile.gettempdir()
+    path = os.path.join(directory, f"tickets-{args.lines}.jsonl")
+    if not os.path.exists(path):
+        print(f"Writing {args.lines} tickets to {path}...")
+        write_feed(path, args.lines)
+    gz_path = path + ".gz"
+    if not os.path.exists(gz_path):
+        with open(path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=1) as dst:
+            shutil.copyfileobj(src, dst)
+    megabytes = os.path.getsize(path) / 1e6
+
+    print(f"{'method':<16} {'tickets':>9} {'seconds':>8} {'tickets/s':>10} {'MB/s':>7}")
+    for name, func, func_args in (
+        ("per line", per_line, (path,)),
+        ("batched", batched, (path, args.batch_size)),
+        ("batched, gzip", batched, (gz_path, args.batch_size)),
+    ):
+        count, seconds = timed(func, *func_args)
+        print(f"{name:<16} {count:>9} {seconds:>8.2f} {count / seconds:>10.0f} {megabytes / seconds:>7.1f}")
+
+    stats = IngestStats()
+    for _ in iter_tickets(path, batch_size=args.batch_size, stats=stats):
+        pass
+    print(f"\n{stats}")
+
+    tenth = peak_memory(path, args.batch_size, args.lines // 10)
+    full = peak_memory(path, args.batch_size, args.lines)
+    print(f"peak memory: {tenth / 1e6:.1f} MB for {args.lines // 10} tickets, "
+          f"{full / 1e6:.1f} MB for {args.lines} ({megabytes:.0f} MB file)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming JSONL ingestion benchmark")
+    parser.add_argument("-n", "--lines", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dir", help="Where to write the synthetic feed (default: the temp directory)")
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+"""
+Benchmark: the tool result cache (utils/tool_cache.py).
+
+Runs the tools agent (example 4) and the self-correction agent (example 5)
+against a local fake model server for `--runs` tickets spread over
+`--orders` distinct orders, backed by a SQLite shipping store, first with
+the tool caches disabled (TTL 0) and then enabled. Reports shipping store
+lookups, the per-tool hit rates and call/hit latency, and - for the
+self-correction agent asked about an unknown order - that `ModelRetry`
+results are not cached. The self-correction runs are concurrent, each with
+its own agent from the pool, and every one of them must succeed after its
+retry.
+
+Usage (from src/):
+    python -m benchmarks.tool_cache --runs 500 --orders 50 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+
+import agent4_tools
+import agent5_self_correction
+from agents import get_agent_pool
+from setup import OllamaModel, aclose_http_clients
+from utils.fake_openai_server import FakeOpenAIServer
+from utils.shipping import SQLiteShippingStore
+from utils.tool_cache import TOOL_CACHES, ToolCacheStats, summary_table
+
+
+def reset(ttl) -> None:
+    for _, cache in TOOL_CACHES:
+        cache.clear()
+        cache.ttl = ttl
+        cache.stats = ToolCacheStats()
+
+
+async def run_tools_agent(agents, store, args) -> None:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        order = agent4_tools.Order(order_id=str(100000 + i % args.orders), status="unknown", items=[])
+        customer = agent4_tools.CustomerDetails(customer_id=str(i), name="Jo", email="jo@example.com", orders=[order])
+        deps = agent4_tools.SupportDeps(customer=customer, shipping_store=store)
+        async with semaphore:
+            with agents.checkout() as agent:
+                await agent.run("Where is my order?", deps=deps)
+
+    await asyncio.gather(*(one(i) for i in range(args.runs)))
+
+
+async def run_self_correction_agent(agents, store, args) -> None:
+    customer = agent5_self_correction.CustomerDetails(customer_id="1", name="Jo", email="jo@example.com")
+    deps = agent5_self_correction.SupportDeps(customer=customer, shipping_store=store)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        # Every run retries get_shipping_status once; a shared agent would mix up their retry counts
+        async with semaphore:
+            with agents.checkout() as agent:
+                await agent.run("What's the status of order #999999?", deps=deps)
+
+    results = await asyncio.gather(*(one() for _ in range(args.runs // 10)), return_exceptions=True)
+    failed = [r for r in results if isinstance(r, Exception)]
+    print(f"\nself-correction: {len(results) - len(failed)}/{len(results)} concurrent runs succeeded "
+          f"on {agents.built} agents")
+    if failed:
+        raise failed[0]
+
+
+async def main(args, directory: str):
+    store = SQLiteShippingStore(os.path.join(directory, "shipping.db"))
+    store.load((str(100000 + i), f"Shipped on 2024-12-{1 + i % 28:02d}") for i in range(args.orders))
+    # The fake model calls get_shipping_status with an order the store does not know
+    fake = FakeOpenAIServer(latency=args.latency, tool_args={"get_shipping_status": {"order_id": "#999999"}})
+    async with fake:
+        model = OllamaModel("fake-model", fake.base_url).get_model()
+        tools_agents, self_correction_agents = get_agent_pool("tools", model), get_agent_pool("self-correction", model)
+        for name, ttl in (("uncached", 0.0), ("cached", 60.0)):
+            reset(ttl)
+            lookups = store.stats.lookups
+            await run_tools_agent(tools_agents, store, args)
+            await run_self_correction_agent(self_correction_agents, store, args)
+            print(f"\n{name}: {store.stats.lookups - lookups} shipping store lookups")
+            print(summary_table())
+    await aclose_http_clients()
+    store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tool result cache benchmark")
+    parser.add_argument("-n", "--runs", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=50, help="Distinct orders asked about")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.01, help="Fake model latency in seconds")
+    with tempfile.TemporaryDirectory(prefix="tool_cache_") as directory:
+        asyncio.run(main(parser.parse_args(), directory))
@@ -1,47 +1,149 @@
 """
 Main script to run all PydanticAI examples.
+
+Only the standard library is imported up front. An example's module - and
+with it pydantic-ai, the OpenAI client and the model setup - is imported when
+that example runs, so `--list`, the help text and unknown names return
+without paying for them.
+
+Usage:
+    python run_examples.py --list
+    python run_examples.py 3 --stream --metrics metrics.prom
+    python run_examples.py serve --port 8000
+    python run_examples.py check               # behaviour checks, no network needed
+    python run_examples.py --import-time 4     # where example 4 spends its import time
 """
 
 import sys
+from collections import namedtuple
 
-def print_header(title):
-    print("\n" + "=" * 80)
-    print(f" {title} ".center(80, "="))
-    print("=" * 80 + "\n")
+Example = namedtuple("Example", "number title target args")
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        example = sys.argv[1]
-        
-        if example == "1" or example == "simple":
-            print_header("Example 1: Simple Agent")
-            from agent1_simple import run_simple_agent
-            run_simple_agent()
-            
-        elif example == "2" or example == "structured":
-            print_header("Example 2: Structured Response")
-            from agent2_structured import run_structured_agent
-            run_structured_agent()
-            
-        elif example == "3" or example == "dependencies":
-            print_header("Example 3: Agent with Dependencies")
-            from agent3_dependencies import run_dependencies_agent
-            run_dependencies_agent()
-            
-        elif example == "4" or example == "tools":
-            print_header("Example 4: Agent with Tools")
-            from agent4_tools import run_tools_agent
-            run_tools_agent()
-            
-        elif example == "5" or example == "self-correction":
-            print_header("Example 5: Agent with Self-Correction")
-            from agent5_self_correction import run_self_correction_agent
-            run_self_correction_agent()
-            
-        else:
-            print(f"Unknown example: {example}")
-            print("Available examples: 1/simple, 2/structured, 3/dependencies, 4/tools, 5/self-correction")
+# Example name -> (number, header, "module:function", how it is called)
+# args: None = no arguments, "stream" = stream=bool, "argv" = remaining command line
+EXAMPLES = {
+    "simple": Example("1", "Example 1: Simple Agent", "agent1_simple:run_simple_agent", None),
+    "structured": Example("2", "Example 2: Structured Response", "agent2_structured:run_structured_agent", "stream"),
+    "dependencies": Example("3", "Example 3: Agent with Dependencies", "agent3_dependencies:run_dependencies_agent", "stream"),
+    "tools": Example("4", "Example 4: Agent with Tools", "agent4_tools:run_tools_agent", "stream"),
+    "self-correction": Example("5", "Example 5: Agent with Self-Correction", "agent5_self_correction:run_self_correction_agent", None),
+    "batch": Example(None, "Batch Mode: Concurrent Ticket Processing", "batch:main", "argv"),
+    "serve": Example(None, "Support Service: HTTP API with SSE Streaming", "server:main", "argv"),
+    "warmup": Example(None, "Warm Up Local Ollama Models", "setup:warm_up_main", "argv"),
+    "bench": Example(None, "Offline Benchmark Suite", "benchmarks.suite:main", "argv"),
+    "check": Example(None, "Behaviour Checks", "benchmarks.checks:main", "argv"),
+}
+AVAILABLE = ", ".join(f"{e.number}/{name}" if e.number else name for name, e in EXAMPLES.items())
+
+
+def print_header(title, file=None):
+    print("\n" + "=" * 80, file=file)
+    print(f" {title} ".center(80, "="), file=file)
+    print("=" * 80 + "\n", file=file)
+
+
+def find_example(name):
+    for key, example in EXAMPLES.items():
+        if name in (key, example.number):
+            return key, example
+    return None, None
+
+
+def list_examples():
+    for name, example in EXAMPLES.items():
+        print(f"{example.number or '-':>2}  {name:<16} {example.title}")
+
+
+def import_time_report(argv, top=15):
+    """Re-run the command under `python -X importtime` and rank the slowest top-level imports."""
+    import subprocess
+
+    process = subprocess.run([sys.executable, "-X", "importtime", sys.argv[0], *argv], stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            print(line, file=sys.stderr)
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            # Nested imports are indented by two spaces per level
+            imports.append((name.strip(), int(self_us), int(cumulative_us), len(name) - len(name.lstrip()) == 1))
+
+    print_header("Import Time")
+    total_ms = sum(self_us for _, self_us, _, _ in imports) / 1000
+    print(f"{len(imports)} modules imported in {total_ms:.1f}ms\n")
+    print(f"{'module':<40} {'cumulative ms':>14} {'self ms':>8}")
+    top_level = sorted((i for i in imports if i[3]), key=lambda i: i[2], reverse=True)
+    for name, self_us, cumulative_us, _ in top_level[:top]:
+        print(f"{name[:40]:<40} {cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}")
+    return process.returncode
+
+
+def run_example(example, argv):
+    import importlib
+
+    module_name, function_name = example.target.split(":")
+    function = getattr(importlib.import_module(module_name), function_name)
+    if example.args == "argv":
+        function(argv)
+    elif example.args == "stream":
+        # --stream shows partial responses as they arrive (examples 2-4)
+        function(stream="--stream" in argv)
     else:
+        function()
+
+
+def main(argv):
+    if not argv:
         print("Please specify which example to run:")
-        print("python run_examples.py [example_number or name]")
-        print("Available examples: 1/simple, 2/structured, 3/dependencies, 4/tools, 5/self-correction")
+        print("python run_examples.py [example_number or name] [--stream] [--metrics PATH] [--trace PATH]")
+        print("python run_examples.py --list | --import-time [command ...]")
+        print(f"Available examples: {AVAILABLE}")
+        return 0
+    if argv[0] == "--list":
+        list_examples()
+        return 0
+    if argv[0] == "--import-time":
+        return import_time_report(argv[1:])
+
+    name, example = find_example(argv[0])
+    if example is None:
+        print(f"Unknown example: {argv[0]}")
+        print(f"Available examples: {AVAILABLE}")
+        return 1
+
+    options = argv[1:]
+    # --metrics PATH writes the run's usage metrics in Prometheus text format (examples 1-5)
+    metrics_path = options[options.index("--metrics") + 1] if "--metrics" in options[:-1] else None
+    # --trace PATH traces each phase of the run (examples 3-5) and writes the spans as JSON
+    trace_path = options[options.index("--trace") + 1] if "--trace" in options[:-1] else None
+    # Batch mode handles both options itself; the service exposes /metrics instead
+    standalone = name not in ("batch", "serve")
+    if trace_path and standalone:
+        from utils.tracing import tracer
+        tracer.enable()
+
+    # Batch mode writes JSONL results to stdout; keep its banner out of them
+    print_header(example.title, file=sys.stderr if name == "batch" else None)
+    run_example(example, options)
+
+    # Only report metrics if the example loaded the registry at all
+    metrics = sys.modules.get("utils.metrics")
+    if standalone and metrics is not None and metrics.registry.series():
+        print_header("Usage Metrics")
+        print(metrics.registry.summary_table())
+        if metrics_path:
+            metrics.registry.write_prometheus(metrics_path)
+            print(f"\nMetrics written to {metrics_path}")
+    if trace_path and standalone:
+        print_header("Trace")
+        print(tracer.format_tree())
+        print()
+        print(tracer.summary_table())
+        tracer.write_json(trace_path)
+        print(f"\nSpans written to {trace_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
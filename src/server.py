@@ -0,0 +1,364 @@
+"""
+Support service: the tools agent behind a long-running HTTP server.
+
+Endpoints:
+- POST /v1/tickets: a ticket as JSON (see `utils.tickets.Ticket`) in,
+  a `ResponseModel` as JSON out.
+- POST /v1/tickets/stream: the same as Server-Sent Events - `partial` events
+  with the fields generated so far, then a `result` (or `error`) event.
+- GET /healthz: admission state.
+- GET /metrics: usage and service metrics in Prometheus text format.
+
+One pooled, keep-alive model client serves every request, and each run
+checks an agent out of a shared pool (see `agents.AgentPool`).
+At most `--concurrency` agent runs are in flight and up to `--queue` more
+requests wait for a slot. Beyond that the server answers 429 with a
+Retry-After header instead of building an unbounded backlog. With
+`--fast-path`, plain order-status tickets are answered from the shipping
+store before admission, without an agent run (see `utils.fast_path`).
+With several `--ollama-url` endpoints, the balancer's health checks run for
+as long as the server does.
+With `--sessions PATH`, each customer's conversation is kept in a SQLite
+session store shared by every server process: a ticket is answered with
+the customer's earlier turns (compacted to `--history-tokens`) as message
+history, and the run's new messages are appended (see `utils.sessions`).
+
+Usage:
+    python run_examples.py serve --port 8000 --concurrency 8 --queue 32
+    python server.py --ollama qwen2.5:14b --ollama-url http://gpu-1:11434/v1
+    python server.py --sessions sessions.sqlite --history-tokens 2000
+
+    curl -N localhost:8000/v1/tickets/stream -d @../data/shipping_query.json
+
+The service can be load-tested against a local fake model server with
+`python -m benchmarks.service_load`.
+"""
+
+import argparse
+import asyncio
+import signal
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Union
+
+from pydantic import ValidationError
+from pydantic_ai.messages import ModelMessage
+
+from agent4_tools import SHIPPING_INFO_DB, CustomerDetails, Order, SupportDeps
+from agents import AgentPool, get_agent_pool
+from batch import ticket_prompt
+from setup import OLLAMA_BASE_URL, OllamaModel, aclose_http_clients, get_model
+from utils.http import HTTPServer, Request, Response, sse_event
+from utils.balancer import BalancedModel
+from utils.fast_path import FastPath
+from utils.history import HistoryManager
+from utils.metrics import registry
+from utils.sessions import SessionStore
+from utils.shipping import BatchingShippingStore, InMemoryShippingStore, ShippingStore
+from utils.stats import LatencyHistogram
+from utils.streaming import iter_partial_responses
+from utils.tickets import Ticket
+from utils.tracing import traced_run
+
+
+class QueueFull(Exception):
+    """Raised when every run slot and queue position is taken."""
+
+
+class AdmissionControl:
+    """At most `concurrency` runs at once and `queue` more waiting; the rest are rejected."""
+
+    def __init__(self, concurrency: int = 8, queue: int = 32):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.queue_wait = LatencyHistogram()
+        self._slots = asyncio.Semaphore(concurrency)
+
+    def admit(self) -> None:
+        """Take a queue position, or raise `QueueFull`; follow with `acquire()`."""
+        if self.active + self.waiting >= self.concurrency + self.queue:
+            self.rejected += 1
+            raise QueueFull(f"{self.active} running and {self.waiting} queued")
+        self.waiting += 1
+
+    async def acquire(self) -> None:
+        """Wait in the queue for a run slot."""
+        start = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        self.queue_wait.observe(time.perf_counter() - start)
+
+    def release(self) -> None:
+        self.active -= 1
+        self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        self.admit()
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def collect(self) -> Dict[str, float]:
+        return {
+            "active_runs": self.active,
+            "queued_requests": self.waiting,
+            "admitted_total": self.admitted,
+            "rejected_total": self.rejected,
+            "queue_wait_seconds_total": self.queue_wait.sum_s,
+        }
+
+
+def ticket_to_deps(ticket: Ticket, store: ShippingStore) -> SupportDeps:
+    """Deps for the tools agent: the ticket's customer and the shared shipping store."""
+    orders = [Order(order_id=ticket.order_id, status="unknown", items=[])] if ticket.order_id else None
+    customer = CustomerDetails(customer_id=ticket.email, name=ticket.customer_name, email=ticket.email, orders=orders)
+    return SupportDeps(customer=customer, shipping_store=store)
+
+
+class SupportService:
+    """HTTP front end for one pool of agents.
+
+    Args:
+        agents: Agents answering tickets, one checked out per run (e.g. `get_agent_pool("tools", model)`).
+        store: Shipping store shared by every request.
+        concurrency: Agent runs in flight at once.
+        queue: Requests allowed to wait for a run slot before 429s are returned.
+        retry_after: Seconds suggested to rejected clients.
+        fast_path: Answer plain order-status tickets from `store` without the agent.
+        sessions: Continue each customer's conversation from this store.
+        history_tokens: Token budget for the session history sent with a ticket.
+        health_check_interval: Seconds between endpoint health checks while the service
+            runs, when the agents' model is balanced across several endpoints.
+    """
+
+    def __init__(
+        self,
+        agents: AgentPool,
+        store: ShippingStore,
+        *,
+        concurrency: int = 8,
+        queue: int = 32,
+        retry_after: int = 1,
+        fast_path: bool = False,
+        sessions: Optional[SessionStore] = None,
+        history_tokens: int = 2000,
+        health_check_interval: float = 10.0,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+    ):
+        self.agents = agents
+        self.store = store
+        self.retry_after = retry_after
+        self.admission = AdmissionControl(concurrency, queue)
+        self.fast_path = FastPath(store, response_type=agents.result_type) if fast_path else None
+        self.sessions = sessions
+        self.history = HistoryManager(max_tokens=history_tokens)
+        self.health_check_interval = health_check_interval
+        self._health_checks: Optional[asyncio.Task] = None
+        self.http = HTTPServer(self.handle, host, port)
+        registry.add_collector("service", self.admission.collect)
+
+    @property
+    def url(self) -> str:
+        return self.http.url
+
+    async def start(self) -> "SupportService":
+        await self.http.start()
+        if isinstance(self.agents.model, BalancedModel):
+            self._health_checks = self.agents.model.start_health_checks(self.health_check_interval)
+        return self
+
+    async def close(self) -> None:
+        await self.http.close()
+        if self._health_checks is not None:
+            await self.agents.model.stop_health_checks(self._health_checks)
+            self._health_checks = None
+
+    async def __aenter__(self) -> "SupportService":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def handle(self, request: Request) -> Response:
+        routes = {
+            ("POST", "/v1/tickets"): self.answer,
+            ("POST", "/v1/tickets/stream"): self.stream,
+            ("GET", "/healthz"): self.health,
+            ("GET", "/metrics"): self.metrics,
+        }
+        route = routes.get((request.method, request.path))
+        if route is not None:
+            return await route(request)
+        if any(path == request.path for _, path in routes):
+            return Response.json({"error": f"{request.method} not allowed on {request.path}"}, status=405)
+        return Response.json({"error": f"no route for {request.path}"}, status=404)
+
+    def _parse(self, request: Request) -> Union[Ticket, Response]:
+        try:
+            return Ticket.model_validate_json(request.body)
+        except ValidationError as exc:
+            return Response.json({"error": "invalid ticket", "details": exc.errors(include_url=False)}, status=422)
+
+    def _busy(self) -> Response:
+        return Response.json(
+            {"error": "server busy, retry later"}, status=429, headers={"Retry-After": str(self.retry_after)}
+        )
+
+    async def answer(self, request: Request) -> Response:
+        ticket = self._parse(request)
+        if isinstance(ticket, Response):
+            return ticket
+        if self.fast_path is not None:
+            response = await self.fast_path.answer(ticket)
+            if response is not None:
+                return Response(body=response.model_dump_json().encode())
+        deps = ticket_to_deps(ticket, self.store)
+        try:
+            async with self.admission.slot():
+                with self.agents.checkout() as agent, \
+                        registry.observe("service", self.agents.model, ticket.query_type) as run:
+                    result = run.result = await traced_run(
+                        agent, ticket_prompt(ticket), deps=deps,
+                        message_history=await self._history(deps.customer.customer_id),
+                        attributes={"ticket_id": ticket.ticket_id, "query_type": ticket.query_type},
+                    )
+                self._save(deps.customer.customer_id, result.new_messages())
+        except QueueFull:
+            return self._busy()
+        except Exception as exc:
+            return Response.json({"error": f"{type(exc).__name__}: {exc}"}, status=502)
+        return Response(body=result.data.model_dump_json().encode())
+
+    async def stream(self, request: Request) -> Response:
+        ticket = self._parse(request)
+        if isinstance(ticket, Response):
+            return ticket
+        if self.fast_path is not None:
+            response = await self.fast_path.answer(ticket)
+            if response is not None:
+                return Response.sse(self._fast_events(response))
+        try:
+            self.admission.admit()
+        except QueueFull:
+            return self._busy()
+        # The stream waits for its run slot before the first event, and the
+        # server holds the response headers back until then
+        return Response.sse(self._events(ticket))
+
+    async def _history(self, customer_id: str) -> Optional[List[ModelMessage]]:
+        """The customer's earlier turns within the token budget (None without a session store)."""
+        if self.sessions is None:
+            return None
+        return await self.history.compact_async(self.sessions.load(customer_id)) or None
+
+    def _save(self, customer_id: str, messages: List[ModelMessage]) -> None:
+        if self.sessions is not None:
+            self.sessions.append(customer_id, messages)
+
+    async def _events(self, ticket: Ticket):
+        """SSE events for one streamed run, admitted by `stream`; holds a run slot until done."""
+        await self.admission.acquire()
+        try:
+            deps = ticket_to_deps(ticket, self.store)
+            with self.agents.checkout() as agent, \
+                    registry.observe("service", self.agents.model, ticket.query_type) as run:
+                async for snapshot in iter_partial_responses(
+                    agent, ticket_prompt(ticket), deps=deps,
+                    message_history=await self._history(deps.customer.customer_id),
+                ):
+                    if snapshot.final:
+                        run.result = snapshot.result
+                        yield sse_event(snapshot.data.model_dump(), event="result")
+                    else:
+                        yield sse_event(snapshot.data.model_dump(exclude_none=True), event="partial")
+            # The streamed run's messages are complete only once the stream has closed
+            if run.result is not None:
+                self._save(deps.customer.customer_id, run.result.new_messages())
+        except Exception as exc:
+            yield sse_event({"error": f"{type(exc).__name__}: {exc}"}, event="error")
+        finally:
+            self.admission.release()
+
+    async def _fast_events(self, response):
+        """The single `result` event of a fast-path answer."""
+        yield sse_event(response.model_dump(), event="result")
+
+    async def health(self, request: Request) -> Response:
+        return Response.json({"status": "ok", **self.admission.collect()})
+
+    async def metrics(self, request: Request) -> Response:
+        return Response(body=registry.to_prometheus().encode(), content_type="text/plain; version=0.0.4")
+
+
+async def serve(service: SupportService) -> None:
+    """Run `service` until SIGINT/SIGTERM, then close it and the pooled model clients."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await service.start()
+    print(f"Support service listening on {service.url}")
+    try:
+        await stop.wait()
+    finally:
+        print("Shutting down")
+        await service.close()
+        await aclose_http_clients()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="run_examples.py serve", description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Agent runs in flight at once")
+    parser.add_argument("-q", "--queue", type=int, default=32, help="Requests that may wait for a slot before 429s")
+    parser.add_argument("--batch-window", type=float, metavar="MS",
+                        help="Coalesce shipping lookups from concurrent runs into one query per window")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="Answer plain order-status tickets from the shipping store without the agent")
+    parser.add_argument("--sessions", metavar="PATH",
+                        help="Continue each customer's conversation, stored in this SQLite file")
+    parser.add_argument("--history-tokens", type=int, default=2000,
+                        help="Token budget for the session history sent with a ticket (default 2000)")
+    parser.add_argument("--ollama", metavar="MODEL", help="Use a local Ollama model instead of OpenAI")
+    parser.add_argument("--ollama-url", metavar="URL", action="append",
+                        help="Ollama endpoint to use (repeat to balance across several)")
+    args = parser.parse_args(argv)
+
+    model = OllamaModel(args.ollama, args.ollama_url or OLLAMA_BASE_URL).get_model() if args.ollama else get_model()
+    store = InMemoryShippingStore(SHIPPING_INFO_DB)
+    if args.batch_window is not None:
+        store = BatchingShippingStore(store, window=args.batch_window / 1000, threaded=False)
+    service = SupportService(
+        get_agent_pool("tools", model),
+        store,
+        concurrency=args.concurrency,
+        queue=args.queue,
+        fast_path=args.fast_path,
+        sessions=SessionStore(args.sessions) if args.sessions else None,
+        history_tokens=args.history_tokens,
+        host=args.host,
+        port=args.port,
+    )
+    try:
+        asyncio.run(serve(service))
+    finally:
+        if service.sessions is not None:
+            print(service.sessions.stats)
+            service.sessions.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,185 @@
     
 """
 Basic setup for PydanticAI examples.
+
+pydantic-ai and the OpenAI client are imported when the first model or
+provider is created, so importing this module (e.g. for warm-up or the
+constants) stays cheap.
 """
 
+import argparse
+import asyncio
+import atexit
+import dataclasses
+import importlib.util
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+
 # import nest_asyncio
-from pydantic_ai.models.openai import OpenAIModel
-from pydantic_ai.providers.openai import OpenAIProvider
+
+if TYPE_CHECKING:
+    import httpx
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    from utils.balancer import BalancedModel
+    from utils.cache import ResponseCache
+    from utils.http_pool import LoopTransport
+
+OLLAMA_BASE_URL = 'http://localhost:11434/v1'
+# How long Ollama keeps a warmed-up model in memory (its default is 5m)
+OLLAMA_KEEP_ALIVE = '30m'
 
 
 # Apply nest_asyncio to allow nested event loops (needed for Jupyter/interactive environments)
 # nest_asyncio.apply()
 
+# Shared HTTP connection pools, one per base URL
+@dataclasses.dataclass
+class HTTPPoolSettings:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    timeout: float = 600.0
+    connect_timeout: float = 5.0
+    http2: bool = False
+
+http_pool_settings = HTTPPoolSettings()
+# The clients outlive event loops: each has a `LoopTransport` with one pool per loop
+_http_clients: Dict[Optional[str], "httpx.AsyncClient"] = {}
+_transports: Dict[Optional[str], "LoopTransport"] = {}
+_providers: Dict[Optional[str], "OpenAIProvider"] = {}
+# One balancer per (model, endpoints) so in-flight counts are shared by every agent
+_balanced_models: Dict[Tuple[str, Tuple[str, ...]], "BalancedModel"] = {}
+_pool_lock = threading.Lock()
+
+def configure_http_pool(**settings):
+    """Change pool settings (e.g. max_connections=50, http2=True) for clients created afterwards."""
+    for name, value in settings.items():
+        if not hasattr(http_pool_settings, name):
+            raise TypeError(f"Unknown HTTP pool setting: {name}")
+        setattr(http_pool_settings, name, value)
+
+def get_http_client(base_url: Optional[str] = None) -> "httpx.AsyncClient":
+    """Return the process-wide keep-alive client for `base_url` (None = OpenAI).
+
+    The client can be used from any event loop: connections are pooled per
+    loop (see `utils.http_pool.LoopTransport`).
+    """
+    import httpx
+
+    from utils.http_pool import LoopTransport
+
+    with _pool_lock:
+        client = _http_clients.get(base_url)
+        if client is None or client.is_closed:
+            settings = http_pool_settings
+            if settings.http2 and importlib.util.find_spec("h2") is None:
+                raise ImportError("HTTP/2 needs the h2 package: pip install 'httpx[http2]'")
+            transport = _transports[base_url] = LoopTransport(
+                limits=httpx.Limits(
+                    max_connections=settings.max_connections,
+                    max_keepalive_connections=settings.max_keepalive_connections,
+                    keepalive_expiry=settings.keepalive_expiry,
+                ),
+                http2=settings.http2,
+            )
+            client = _http_clients[base_url] = httpx.AsyncClient(
+                transport=transport,
+                timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+            )
+            _providers.pop(base_url, None)
+        return client
+
+def get_provider(base_url: Optional[str] = None) -> "OpenAIProvider":
+    """Return the shared OpenAI-compatible provider for `base_url`."""
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    client = get_http_client(base_url)
+    with _pool_lock:
+        provider = _providers.get(base_url)
+        if provider is None:
+            provider = _providers[base_url] = OpenAIProvider(base_url=base_url, http_client=client)
+        return provider
+
+async def aclose_http_clients():
+    """Close the pooled connections opened on the running event loop (call before it shuts down).
+
+    The clients stay usable; a later loop opens connections of its own.
+    """
+    with _pool_lock:
+        transports = list(_transports.values())
+    for transport in transports:
+        await transport.aclose_loop()
+
+def close_http_clients():
+    """Close the connections of event loops that are still open, e.g. the one `run_sync()` uses.
+
+    Registered to run at exit; loops run through `run_async` have closed theirs already.
+    """
+    with _pool_lock:
+        transports = list(_transports.values())
+    for transport in transports:
+        transport.close()
+
+atexit.register(close_http_clients)
+
+def run_async(coro):
+    """`asyncio.run(coro)`, closing the connections pooled on its loop before the loop ends."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await aclose_http_clients()
+
+    return asyncio.run(main())
+
 # Initialize the OpenAI model
-def get_model():
-    return OpenAIModel("gpt-4o")
+def get_model(cache: "ResponseCache" = None):
+    """Return the OpenAI model, wrapped in a response cache if one is given."""
+    from pydantic_ai.models.openai import OpenAIModel
+    from utils.cache import CachedModel
+
+    model = OpenAIModel("gpt-4o", provider=get_provider())
+    return CachedModel(model, cache) if cache is not None else model
+
+def get_balanced_model(model_name: str, base_urls: Sequence[str], **options) -> "BalancedModel":
+    """Return the shared least-outstanding-requests balancer for `model_name` across `base_urls`.
+
+    `options` (max_failures, eject_for, slow_threshold, ...) apply when the balancer is first created.
+    """
+    from pydantic_ai.models.openai import OpenAIModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+    from utils.balancer import BalancedModel, Endpoint
+
+    key = (model_name, tuple(base_urls))
+    with _pool_lock:
+        balanced = _balanced_models.get(key)
+    if balanced is None:
+        endpoints = []
+        for base_url in base_urls:
+            # Fail over to the next endpoint at once instead of the client retrying the same one
+            client = get_provider(base_url).client.with_options(max_retries=0)
+            model = OpenAIModel(model_name, provider=OpenAIProvider(openai_client=client))
+            endpoints.append(Endpoint(base_url, model, http_client=get_http_client(base_url)))
+        with _pool_lock:
+            balanced = _balanced_models.setdefault(key, BalancedModel(endpoints, **options))
+    return balanced
+
+@dataclasses.dataclass
+class WarmUpResult:
+    model_name: str
+    seconds: float
+    load_seconds: Optional[float] = None  # load time reported by Ollama itself
+    error: Optional[str] = None
+    base_url: Optional[str] = None
+
+    def __str__(self):
+        name = f"{self.model_name} @ {self.base_url}" if self.base_url else self.model_name
+        if self.error:
+            return f"{name}: failed after {self.seconds:.2f}s ({self.error})"
+        loaded = f", load {self.load_seconds:.2f}s" if self.load_seconds is not None else ""
+        return f"{name}: ready in {self.seconds:.2f}s{loaded}"
 
 class OllamaModel:
     LLAMA3_3 = "llama3.3:latest" #ok
@@ -23,11 +189,102 @@ class OllamaModel:
     QWQ_32b = "qwq:32b" #ok
     GEMMA3_27b = "gemma3:27b"
     
-    def __init__(self, model_name=QWQ_32b):
+    def __init__(self, model_name=QWQ_32b, base_url: Union[str, Sequence[str]] = OLLAMA_BASE_URL):
+        """`base_url` may also be a list of endpoints serving the same model to balance across."""
         self.model_name = model_name
+        self.base_urls = [base_url] if isinstance(base_url, str) else list(base_url)
+        self.base_url = self.base_urls[0]
     
-    def get_model(self):
-        return OpenAIModel(
-            model_name=self.model_name,
-            provider=OpenAIProvider(base_url='http://localhost:11434/v1')
-        )
\ No newline at end of file
+    def get_model(self, cache: "ResponseCache" = None, **balancer_options):
+        from pydantic_ai.models.openai import OpenAIModel
+        from utils.cache import CachedModel
+
+        if len(self.base_urls) > 1:
+            model = get_balanced_model(self.model_name, self.base_urls, **balancer_options)
+        else:
+            model = OpenAIModel(
+                model_name=self.model_name,
+                provider=get_provider(self.base_url)
+            )
+        return CachedModel(model, cache) if cache is not None else model
+
+    @staticmethod
+    def native_url(base_url: str) -> str:
+        """Ollama's own API root (the OpenAI-compatible one lives under /v1)."""
+        return base_url[:-len("/v1")] if base_url.endswith("/v1") else base_url
+
+    async def _warm_up_endpoint(self, base_url: str, keep_alive) -> WarmUpResult:
+        import httpx
+
+        start = time.perf_counter()
+        label = base_url if len(self.base_urls) > 1 else None
+        try:
+            response = await get_http_client(base_url).post(
+                f"{self.native_url(base_url)}/api/generate",
+                json={"model": self.model_name, "prompt": "", "keep_alive": keep_alive},
+            )
+            response.raise_for_status()
+            load_duration = response.json().get("load_duration")
+        except (httpx.HTTPError, ValueError) as exc:
+            return WarmUpResult(
+                self.model_name, time.perf_counter() - start, error=str(exc) or type(exc).__name__, base_url=label
+            )
+        return WarmUpResult(
+            self.model_name,
+            time.perf_counter() - start,
+            load_seconds=load_duration / 1e9 if load_duration is not None else None,
+            base_url=label,
+        )
+
+    async def warm_up(self, keep_alive=OLLAMA_KEEP_ALIVE) -> List[WarmUpResult]:
+        """Load the model on every endpoint with an empty generate request and extend its keep-alive."""
+        return list(await asyncio.gather(
+            *(self._warm_up_endpoint(base_url, keep_alive) for base_url in self.base_urls)
+        ))
+
+    @classmethod
+    async def warm_up_all(
+        cls, model_names: Sequence[str], keep_alive=OLLAMA_KEEP_ALIVE, base_url=OLLAMA_BASE_URL
+    ) -> List[WarmUpResult]:
+        """Warm up several models in parallel; one result per model and endpoint, in order."""
+        results = await asyncio.gather(*(cls(name, base_url).warm_up(keep_alive) for name in model_names))
+        return [result for per_model in results for result in per_model]
+
+    @classmethod
+    async def keep_warm(
+        cls, model_names: Sequence[str], interval: float = 240.0, keep_alive=OLLAMA_KEEP_ALIVE, base_url=OLLAMA_BASE_URL
+    ):
+        """Ping the models every `interval` seconds so they are never unloaded.
+
+        Runs until cancelled, e.g. `task = asyncio.create_task(OllamaModel.keep_warm([...]))`.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            for result in await cls.warm_up_all(model_names, keep_alive, base_url):
+                if result.error:
+                    print(f"Keep-warm ping failed: {result}")
+
+def warm_up_main(argv=None):
+    """Command line entry point: warm up Ollama models and optionally keep them loaded."""
+    parser = argparse.ArgumentParser(prog="run_examples.py warmup", description="Preload local Ollama models")
+    parser.add_argument("models", nargs="*", default=[OllamaModel.QWQ_32b], help="Ollama model names")
+    parser.add_argument("--keep-alive", default=OLLAMA_KEEP_ALIVE, help="How long Ollama keeps each model loaded")
+    parser.add_argument("--keep-warm", type=float, metavar="SECONDS", help="Keep pinging at this interval until interrupted")
+    parser.add_argument("--base-url", nargs="+", default=[OLLAMA_BASE_URL], help="One or more Ollama endpoints")
+    args = parser.parse_args(argv)
+
+    async def run():
+        start = time.perf_counter()
+        results = await OllamaModel.warm_up_all(args.models, args.keep_alive, args.base_url)
+        for result in results:
+            print(result)
+        print(f"Warmed up {len(results)} model(s) in {time.perf_counter() - start:.2f}s")
+        if args.keep_warm:
+            print(f"Keeping models warm every {args.keep_warm:g}s (Ctrl+C to stop)")
+            await OllamaModel.keep_warm(args.models, args.keep_warm, args.keep_alive, args.base_url)
+        await aclose_http_clients()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
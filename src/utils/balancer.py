@@ -0,0 +1,251 @@
+"""
+Least-outstanding-requests load balancing across model endpoints.
+
+`BalancedModel` spreads requests over several copies of the same model
+served from different OpenAI-compatible endpoints (e.g. one Ollama per GPU
+box). Each request goes to the available endpoint with the fewest requests
+in flight, ties broken by recent latency. An endpoint that fails
+`max_failures` times in a row - or answers slower than `slow_threshold` - is
+ejected for `eject_for` seconds and then re-admitted on probation (one more
+failure ejects it again). Health checks (`GET {base_url}/models`) re-admit
+recovered endpoints early and eject unreachable ones before traffic hits them.
+
+Usage:
+    model = BalancedModel([Endpoint(url, OpenAIModel(name, provider=...)) for url in urls])
+    async with model.health_checks(interval=10):
+        ...
+    print(model.format_stats())
+"""
+
+import asyncio
+import dataclasses
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import openai
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import ModelResponse
+from pydantic_ai.models import Model
+from pydantic_ai.usage import Usage
+
+from utils.stats import LatencyHistogram
+
+
+@dataclasses.dataclass(eq=False)
+class Endpoint:
+    """One backend serving the model, with its live balancing state."""
+    base_url: str
+    model: Model
+    http_client: Optional[httpx.AsyncClient] = None  # used for health checks
+    in_flight: int = 0
+    requests: int = 0
+    errors: int = 0
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+    ewma_s: float = 0.0
+    latency: LatencyHistogram = dataclasses.field(default_factory=LatencyHistogram)
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "available": self.available,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "ewma_ms": self.ewma_s * 1000,
+            "p50_le_s": self.latency.quantile(0.5),
+            "p95_le_s": self.latency.quantile(0.95),
+            "latency_buckets": self.latency.cumulative(),
+        }
+
+
+def is_endpoint_failure(exc: BaseException) -> bool:
+    """Errors that say something about the endpoint rather than the request."""
+    if isinstance(exc, ModelHTTPError):
+        return exc.status_code >= 500 or exc.status_code == 429
+    return isinstance(exc, (openai.APIConnectionError, httpx.TransportError, OSError, asyncio.TimeoutError))
+
+
+class BalancedModel(Model):
+    """Least-outstanding-requests balancer over `endpoints` serving the same model.
+
+    Args:
+        endpoints: Backends to balance across.
+        max_failures: Consecutive failures (or slow responses) before ejection.
+        eject_for: Seconds an ejected endpoint receives no traffic.
+        slow_threshold: Responses slower than this many seconds count as failures.
+        ewma_alpha: Weight of the newest latency in the moving average.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[Endpoint],
+        *,
+        max_failures: int = 3,
+        eject_for: float = 30.0,
+        slow_threshold: Optional[float] = None,
+        ewma_alpha: float = 0.3,
+    ):
+        if not endpoints:
+            raise ValueError("BalancedModel needs at least one endpoint")
+        self.endpoints = list(endpoints)
+        self.max_failures = max_failures
+        self.eject_for = eject_for
+        self.slow_threshold = slow_threshold
+        self.ewma_alpha = ewma_alpha
+
+    def choose(self, exclude: Sequence[Endpoint] = ()) -> Endpoint:
+        """The endpoint for the next request.
+
+        When every endpoint is ejected, the one re-admitted soonest is used
+        rather than failing outright.
+        """
+        candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+        available = [e for e in candidates if e.available]
+        if not available:
+            return min(candidates, key=lambda e: e.ejected_until)
+        return min(available, key=lambda e: (e.in_flight, e.ewma_s))
+
+    def _start(self, endpoint: Endpoint) -> float:
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        return time.perf_counter()
+
+    def _finish(self, endpoint: Endpoint, start: float, failed: bool = False) -> None:
+        elapsed = time.perf_counter() - start
+        endpoint.in_flight -= 1
+        if failed:
+            endpoint.errors += 1
+            self._record_failure(endpoint)
+            return
+        endpoint.latency.observe(elapsed)
+        endpoint.ewma_s = elapsed if not endpoint.ewma_s else (
+            self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * endpoint.ewma_s
+        )
+        if self.slow_threshold is not None and elapsed > self.slow_threshold:
+            self._record_failure(endpoint)
+        else:
+            endpoint.consecutive_failures = 0
+
+    def _record_failure(self, endpoint: Endpoint) -> None:
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= self.max_failures and endpoint.available:
+            self.eject(endpoint)
+
+    def eject(self, endpoint: Endpoint) -> None:
+        endpoint.ejected_until = time.monotonic() + self.eject_for
+        endpoint.ejections += 1
+        # Re-admitted on probation: the next failure ejects it again
+        endpoint.consecutive_failures = self.max_failures - 1
+
+    def readmit(self, endpoint: Endpoint) -> None:
+        endpoint.ejected_until = 0.0
+        endpoint.consecutive_failures = 0
+
+    async def request(self, messages, model_settings, model_request_parameters) -> Tuple[ModelResponse, Usage]:
+        # Fail over to the next endpoint on endpoint errors, trying each one at most once
+        tried: List[Endpoint] = []
+        while True:
+            endpoint = self.choose(tried)
+            tried.append(endpoint)
+            start = self._start(endpoint)
+            try:
+                result = await endpoint.model.request(messages, model_settings, model_request_parameters)
+            except Exception as exc:
+                failed = is_endpoint_failure(exc)
+                self._finish(endpoint, start, failed=failed)
+                if not failed or len(tried) >= len(self.endpoints):
+                    raise
+                continue
+            self._finish(endpoint, start)
+            return result
+
+    @asynccontextmanager
+    async def request_stream(self, messages, model_settings, model_request_parameters):
+        endpoint = self.choose()
+        start = self._start(endpoint)
+        failed = False
+        try:
+            async with endpoint.model.request_stream(messages, model_settings, model_request_parameters) as response:
+                yield response
+        except Exception as exc:
+            failed = is_endpoint_failure(exc)
+            raise
+        finally:
+            self._finish(endpoint, start, failed=failed)
+
+    async def check_health(self, timeout: float = 5.0) -> Dict[str, bool]:
+        """Probe every endpoint; re-admit healthy ones and eject unreachable ones."""
+        async def probe(endpoint: Endpoint) -> bool:
+            client = endpoint.http_client or httpx.AsyncClient()
+            try:
+                response = await client.get(f"{endpoint.base_url}/models", timeout=timeout)
+                return response.status_code < 500
+            except httpx.HTTPError:
+                return False
+            finally:
+                if endpoint.http_client is None:
+                    await client.aclose()
+
+        healthy = await asyncio.gather(*(probe(e) for e in self.endpoints))
+        for endpoint, ok in zip(self.endpoints, healthy):
+            if ok and not endpoint.available:
+                self.readmit(endpoint)
+            elif not ok and endpoint.available:
+                self.eject(endpoint)
+        return {e.base_url: ok for e, ok in zip(self.endpoints, healthy)}
+
+    async def run_health_checks(self, interval: float = 10.0, timeout: float = 5.0) -> None:
+        """Check health every `interval` seconds until cancelled."""
+        while True:
+            await self.check_health(timeout)
+            await asyncio.sleep(interval)
+
+    def start_health_checks(self, interval: float = 10.0, timeout: float = 5.0) -> asyncio.Task:
+        """Run health checks in the background of the current event loop; cancel the task to stop."""
+        return asyncio.get_running_loop().create_task(self.run_health_checks(interval, timeout))
+
+    async def stop_health_checks(self, task: asyncio.Task) -> None:
+        """Cancel a task from `start_health_checks` and wait for it to finish."""
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    @asynccontextmanager
+    async def health_checks(self, interval: float = 10.0, timeout: float = 5.0):
+        """Run health checks in the background for the duration of the block."""
+        task = self.start_health_checks(interval, timeout)
+        try:
+            yield self
+        finally:
+            await self.stop_health_checks(task)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.to_dict() for endpoint in self.endpoints]
+
+    def format_stats(self) -> str:
+        lines = [f"{'endpoint':<32} {'state':<8} {'in-flight':>9} {'requests':>8} {'errors':>6} {'ewma ms':>8}"]
+        for e in self.endpoints:
+            lines.append(
+                f"{e.base_url:<32} {'up' if e.available else 'ejected':<8} {e.in_flight:>9} "
+                f"{e.requests:>8} {e.errors:>6} {e.ewma_s * 1000:>8.1f}"
+            )
+        return "\n".join(lines)
+
+    @property
+    def model_name(self) -> str:
+        return self.endpoints[0].model.model_name
+
+    @property
+    def system(self) -> str:
+        return self.endpoints[0].model.system
@@ -0,0 +1,235 @@
+"""
+Opt-in response cache for agent runs.
+
+`CachedModel` wraps any pydantic-ai model and memoizes its responses. The
+cache key covers everything the model sees: the model name, the full message
+list (system prompts - including dynamic ones like `add_customer_name` - the
+user prompt and any message history), the model settings and the tool /
+`result_type` JSON schemas. Timestamps are stripped so that identical
+conversations hash identically.
+
+Responses live in an in-memory LRU tier backed by an optional SQLite tier,
+both with TTL and size-based eviction.
+
+Usage:
+    cache = ResponseCache(path="agent_cache.sqlite", ttl=3600)
+    model = get_model(cache=cache)
+    ...
+    print(cache.stats)
+"""
+
+import dataclasses
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic_ai.messages import ModelMessagesTypeAdapter, ModelResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.usage import Usage
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Hit/miss counters and the model usage avoided by cache hits."""
+    hits: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    saved_requests: int = 0
+    saved_request_tokens: int = 0
+    saved_response_tokens: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.saved_request_tokens + self.saved_response_tokens
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"cache hits={self.hits} (memory={self.memory_hits}, disk={self.disk_hits}) "
+            f"misses={self.misses} hit_rate={self.hit_rate:.1%} "
+            f"saved_requests={self.saved_requests} saved_tokens={self.saved_tokens}"
+        )
+
+
+def _strip_volatile(value: Any) -> Any:
+    """Drop fields (timestamps) that differ between otherwise identical runs."""
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k != "timestamp"}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def cache_key(model_name: str, messages, model_settings, model_request_parameters) -> str:
+    """Stable hash of everything that determines a model response."""
+    payload = {
+        "model": model_name,
+        "messages": _strip_volatile(ModelMessagesTypeAdapter.dump_python(messages, mode="json")),
+        "settings": model_settings or {},
+        "parameters": dataclasses.asdict(model_request_parameters),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + SQLite) store of serialized model responses.
+
+    Args:
+        path: SQLite file for the persistent tier, or None for memory only.
+        ttl: Seconds an entry stays valid, or None to never expire.
+        max_memory_entries: Size of the in-memory LRU tier.
+        max_disk_entries: Maximum rows kept in SQLite; oldest are evicted first.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_memory_entries: int = 1024,
+        max_disk_entries: int = 100_000,
+    ):
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.stats = CacheStats()
+        self._memory: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, created REAL NOT NULL, value BLOB NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+            self._db.commit()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value for `key`, promoting disk hits to memory."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.stats.hits += 1
+                    self.stats.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, value FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[0]):
+                        self._remember(key, row[0], row[1])
+                        self.stats.hits += 1
+                        self.stats.disk_hits += 1
+                        return row[1]
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.stats.misses += 1
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store `value` in both tiers, evicting the oldest entries if full."""
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, created, value) VALUES (?, ?, ?)",
+                    (key, created, value),
+                )
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, created: float, value: bytes) -> None:
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def prune(self) -> int:
+        """Remove expired entries from both tiers; returns the number of disk rows removed."""
+        if self.ttl is None:
+            return 0
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for key in [k for k, (created, _) in self._memory.items() if created < cutoff]:
+                del self._memory[key]
+            if self._db is None:
+                return 0
+            removed = self._db.execute("DELETE FROM responses WHERE created < ?", (cutoff,)).rowcount
+            self._db.commit()
+            return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def _encode(response: ModelResponse, usage: Usage) -> bytes:
+    return json.dumps({
+        "response": json.loads(ModelMessagesTypeAdapter.dump_json([response])),
+        "usage": dataclasses.asdict(usage),
+    }).encode()
+
+
+def _decode(value: bytes) -> Tuple[ModelResponse, Usage]:
+    data: Dict[str, Any] = json.loads(value)
+    response = ModelMessagesTypeAdapter.validate_python(data["response"])[0]
+    return response, Usage(**data["usage"])
+
+
+class CachedModel(WrapperModel):
+    """Model wrapper that serves repeated requests from a `ResponseCache`.
+
+    Cache hits report empty usage to the agent run; the usage of the original
+    response is added to `cache.stats` as saved tokens instead. Streaming
+    requests are passed through uncached.
+    """
+
+    def __init__(self, wrapped, cache: ResponseCache):
+        super().__init__(wrapped)
+        self.cache = cache
+
+    async def request(self, messages, model_settings, model_request_parameters) -> Tuple[ModelResponse, Usage]:
+        key = cache_key(self.model_name, messages, model_settings, model_request_parameters)
+        cached = self.cache.get(key)
+        if cached is not None:
+            response, usage = _decode(cached)
+            self.cache.stats.saved_requests += 1
+            self.cache.stats.saved_request_tokens += usage.request_tokens or 0
+            self.cache.stats.saved_response_tokens += usage.response_tokens or 0
+            return response, Usage()
+
+        response, usage = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        self.cache.set(key, _encode(response, usage))
+        return response, usage
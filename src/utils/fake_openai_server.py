@@ -0,0 +1,405 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions server.
+
+Answers `/v1/chat/completions` the way `SimulatedModel` does - call each
+function tool once, then the `final_result` tool with schema-derived
+arguments (or plain text when there are no tools) - after a configurable
+latency, with or without streaming. Connection and request counters and an
+optional capacity limit (requests beyond it queue, like on a busy GPU) make
+it suitable for load tests of the HTTP client setup.
+
+It also mimics Ollama's model loading: the first request for a model (via
+chat completions or the native `/api/generate` endpoint) pays `load_delay`,
+and the model then stays loaded for its keep-alive period.
+
+The files and batches endpoints of the Batch API are served too: an
+uploaded JSONL file of chat completion requests is answered in the
+background after `batch_delay`, with every `batch_fail_every`-th request
+failing into the error file. Requests with a JSON schema `response_format`
+get schema-derived JSON content.
+
+Usage:
+    async with FakeOpenAIServer(latency=0.05) as server:
+        model = OpenAIModel("fake-model", provider=OpenAIProvider(base_url=server.base_url))
+
+    # or standalone, e.g. in place of Ollama:
+    python -m utils.fake_openai_server --port 11434 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import email.parser
+import email.policy
+import itertools
+import json
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+
+from utils.http import HTTPServer, Request, Response, sse_event
+from utils.simulated_model import args_from_schema
+
+RESULT_TOOL_PREFIX = "final_result"
+
+# Ollama's default keep-alive for a loaded model
+DEFAULT_KEEP_ALIVE = 300.0
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_keep_alive(value: Union[str, float, int, None]) -> float:
+    """Seconds for an Ollama keep_alive value ("30m", "1h", 300, -1 = forever)."""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    total = 0.0
+    for amount, unit in re.findall(r"(-?[\d.]+)(ms|s|m|h)?", value):
+        if float(amount) < 0:
+            return float("inf")
+        total += float(amount) * _DURATION_UNITS[unit or "s"]
+    return total
+
+
+class FakeOpenAIServer:
+    """OpenAI-compatible fake with simulated latency.
+
+    Args:
+        latency: Seconds before each completion is returned (or starts streaming).
+        chunk_delay: Seconds between streamed chunks.
+        prompt_tokens / completion_tokens: Usage reported per completion.
+        tool_args: Arguments to use per function tool name instead of schema defaults.
+        text: Content returned when no tools are offered.
+        load_delay: Seconds to "load" a model that is not currently loaded.
+        capacity: Completions generated at once; further requests queue (None = unlimited).
+        batch_delay: Seconds a submitted batch waits before it is answered.
+        batch_fail_every: Fail every n-th request of a batch (None = none fail).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        chunk_delay: float = 0.0,
+        prompt_tokens: int = 200,
+        completion_tokens: int = 50,
+        tool_args: Optional[Dict[str, Dict[str, Any]]] = None,
+        text: str = "Thanks for reaching out! Your order is on its way.",
+        load_delay: float = 0.0,
+        capacity: Optional[int] = None,
+        batch_delay: float = 0.0,
+        batch_fail_every: Optional[int] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.tool_args = tool_args or {}
+        self.text = text
+        self.load_delay = load_delay
+        self.loads: Dict[str, int] = {}
+        self.capacity = capacity
+        self._slots = asyncio.Semaphore(capacity) if capacity else None
+        self.http = HTTPServer(self.handle, host, port)
+        self._ids = itertools.count(1)
+        self._loaded_until: Dict[str, float] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.batch_delay = batch_delay
+        self.batch_fail_every = batch_fail_every
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._batch_tasks = set()
+
+    @property
+    def stats(self):
+        return self.http.stats
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.http.url}/v1"
+
+    async def start(self) -> "FakeOpenAIServer":
+        await self.http.start()
+        return self
+
+    async def close(self) -> None:
+        for task in self._batch_tasks:
+            task.cancel()
+        await self.http.close()
+
+    async def __aenter__(self) -> "FakeOpenAIServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def handle(self, request: Request) -> Response:
+        if request.method == "GET" and request.path == "/v1/models":
+            return Response.json({"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+        if request.method == "POST" and request.path == "/v1/chat/completions":
+            return await self.chat_completion(request.json())
+        if request.method == "POST" and request.path == "/api/generate":
+            return await self.generate(request.json())
+        if request.path.startswith(("/v1/files", "/v1/batches")):
+            return self.batch_api(request)
+        return Response.json({"error": f"no route for {request.method} {request.path}"}, status=404)
+
+    async def ensure_loaded(self, model: str, keep_alive=None) -> float:
+        """Load `model` if needed; returns the seconds spent loading (0 when warm)."""
+        loaded = time.monotonic() < self._loaded_until.get(model, 0.0)
+        spent = 0.0
+        if not loaded:
+            if model not in self._loading:
+                self._loading[model] = asyncio.ensure_future(self._load(model))
+            spent = await asyncio.shield(self._loading[model])
+        self._loaded_until[model] = time.monotonic() + parse_keep_alive(keep_alive)
+        return spent
+
+    async def _load(self, model: str) -> float:
+        try:
+            start = time.monotonic()
+            if self.load_delay:
+                await asyncio.sleep(self.load_delay)
+            self.loads[model] = self.loads.get(model, 0) + 1
+            return time.monotonic() - start
+        finally:
+            self._loading.pop(model, None)
+
+    async def generate(self, body: Dict[str, Any]) -> Response:
+        """Ollama's native generate endpoint; an empty prompt just loads the model."""
+        model = body.get("model", "fake-model")
+        load_seconds = await self.ensure_loaded(model, body.get("keep_alive"))
+        return Response.json({
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": self.text if body.get("prompt") else "",
+            "done": True,
+            "done_reason": "stop" if body.get("prompt") else "load",
+            "load_duration": int(load_seconds * 1e9),
+        })
+
+    def _message(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """The assistant message to return for a chat completion request."""
+        tools = [t["function"] for t in body.get("tools") or []]
+        function_tools = [t for t in tools if not t["name"].startswith(RESULT_TOOL_PREFIX)]
+        result_tools = [t for t in tools if t["name"].startswith(RESULT_TOOL_PREFIX)]
+        tools_answered = any(m.get("role") == "tool" for m in body.get("messages", []))
+
+        calls = []
+        if function_tools and not tools_answered:
+            calls = [(t["name"], self.tool_args.get(t["name"]) or args_from_schema(t.get("parameters", {})))
+                     for t in function_tools]
+        elif result_tools:
+            args = args_from_schema(result_tools[0].get("parameters", {}))
+            if "response" in args:
+                args["response"] = self.text
+            calls = [(result_tools[0]["name"], args)]
+
+        response_format = body.get("response_format") or {}
+        if not calls and response_format.get("type") == "json_schema":
+            args = args_from_schema(response_format["json_schema"].get("schema", {}))
+            if "response" in args:
+                args["response"] = self.text
+            return {"role": "assistant", "content": json.dumps(args)}
+        if not calls:
+            return {"role": "assistant", "content": self.text}
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": f"call_{next(self._ids)}", "type": "function",
+                 "function": {"name": name, "arguments": json.dumps(args)}}
+                for name, args in calls
+            ],
+        }
+
+    def _usage(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+        }
+
+    async def chat_completion(self, body: Dict[str, Any]) -> Response:
+        await self.ensure_loaded(body.get("model", "fake-model"))
+        if self._slots is not None:
+            async with self._slots:
+                await asyncio.sleep(self.latency)
+        elif self.latency:
+            await asyncio.sleep(self.latency)
+        if not body.get("stream"):
+            return Response.json(self._completion(body))
+        message = self._message(body)
+        finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+        return Response.sse(self._stream(self._envelope(body), message, finish_reason))
+
+    def _envelope(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-{next(self._ids)}",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-model"),
+        }
+
+    def _completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """A complete (non-streamed) chat completion object."""
+        message = self._message(body)
+        return {
+            **self._envelope(body),
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0, "message": message,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+            }],
+            "usage": self._usage(),
+        }
+
+    def batch_api(self, request: Request) -> Response:
+        """Files and batches endpoints: upload, create, retrieve and download."""
+        match = re.fullmatch(r"/v1/(files|batches)(?:/([\w-]+))?(/content)?", request.path)
+        if match is None:
+            return Response.json({"error": {"message": f"no route for {request.path}"}}, status=404)
+        kind, object_id, content = match.groups()
+        route = (request.method, kind, object_id is not None, content is not None)
+        if route == ("POST", "files", False, False):
+            form = _form_fields(request)
+            return Response.json(self._add_file(form.get("file", request.body), form.get("purpose", b"batch").decode()))
+        if route == ("POST", "batches", False, False):
+            return self._create_batch(request.json())
+        if object_id not in (self.files if kind == "files" else self.batches):
+            return Response.json({"error": {"message": f"No such {kind[:-1]}: {object_id}"}}, status=404)
+        if route == ("GET", "files", True, True):
+            return Response(body=self.files[object_id]["data"], content_type="application/octet-stream")
+        if route == ("GET", "files", True, False):
+            return Response.json({k: v for k, v in self.files[object_id].items() if k != "data"})
+        if route == ("GET", "batches", True, False):
+            return Response.json(self.batches[object_id])
+        return Response.json({"error": {"message": f"no route for {request.method} {request.path}"}}, status=404)
+
+    def _add_file(self, data: bytes, purpose: str) -> Dict[str, Any]:
+        file_id = f"file-{next(self._ids)}"
+        self.files[file_id] = {
+            "id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": f"{file_id}.jsonl", "purpose": purpose, "data": data,
+        }
+        return {k: v for k, v in self.files[file_id].items() if k != "data"}
+
+    def _create_batch(self, body: Dict[str, Any]) -> Response:
+        input_file = self.files.get(body.get("input_file_id"))
+        if input_file is None:
+            return Response.json({"error": {"message": "input_file_id not found"}}, status=400)
+        batch_id = f"batch_{next(self._ids)}"
+        batch = self.batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": body.get("endpoint"),
+            "input_file_id": input_file["id"], "completion_window": body.get("completion_window", "24h"),
+            "status": "validating", "output_file_id": None, "error_file_id": None, "errors": None,
+            "created_at": int(time.time()), "in_progress_at": None, "completed_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        task = asyncio.ensure_future(self._run_batch(batch, input_file["data"]))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+        return Response.json(batch)
+
+    async def _run_batch(self, batch: Dict[str, Any], data: bytes) -> None:
+        try:
+            lines = [json.loads(line) for line in data.splitlines() if line.strip()]
+        except json.JSONDecodeError as exc:
+            error = {"code": "invalid_json_line", "message": str(exc)}
+            batch.update(status="failed", errors={"object": "list", "data": [error]})
+            return
+        counts = batch["request_counts"]
+        counts["total"] = len(lines)
+        batch.update(status="in_progress", in_progress_at=int(time.time()))
+        if self.batch_delay:
+            await asyncio.sleep(self.batch_delay)
+
+        outputs, errors = [], []
+        for index, line in enumerate(lines, 1):
+            record = {"id": f"batch_req_{next(self._ids)}", "custom_id": line.get("custom_id")}
+            if self.batch_fail_every and index % self.batch_fail_every == 0:
+                errors.append({**record, "response": None,
+                               "error": {"code": "server_error", "message": "The model failed to respond"}})
+                counts["failed"] += 1
+                continue
+            completion = self._completion(line.get("body") or {})
+            outputs.append({**record, "response": {"status_code": 200, "body": completion}, "error": None})
+            counts["completed"] += 1
+
+        if outputs:
+            batch["output_file_id"] = self._add_file(_jsonl(outputs), "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self._add_file(_jsonl(errors), "batch_output")["id"]
+        batch.update(status="completed", completed_at=int(time.time()))
+
+    def _deltas(self, message: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Split a message into streaming deltas of a few characters each."""
+        deltas = [{"role": "assistant"}]
+        if message.get("content"):
+            text = message["content"]
+            deltas += [{"content": text[i:i + 8]} for i in range(0, len(text), 8)]
+        for index, call in enumerate(message.get("tool_calls", [])):
+            deltas.append({"tool_calls": [{
+                "index": index, "id": call["id"], "type": "function",
+                "function": {"name": call["function"]["name"], "arguments": ""},
+            }]})
+            arguments = call["function"]["arguments"]
+            deltas += [
+                {"tool_calls": [{"index": index, "function": {"arguments": arguments[i:i + 8]}}]}
+                for i in range(0, len(arguments), 8)
+            ]
+        return deltas
+
+    async def _stream(self, envelope, message, finish_reason):
+        chunk = {**envelope, "object": "chat.completion.chunk"}
+        for delta in self._deltas(message):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield sse_event({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        yield sse_event({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+                         "usage": self._usage()})
+        yield sse_event("[DONE]")
+
+
+def _jsonl(records: List[Dict[str, Any]]) -> bytes:
+    return b"".join(json.dumps(record).encode() + b"\n" for record in records)
+
+
+def _form_fields(request: Request) -> Dict[str, bytes]:
+    """Fields of a multipart/form-data body (empty for any other content type)."""
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        return {}
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + request.body
+    )
+    return {
+        part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+        for part in message.iter_parts()
+    }
+
+
+async def _serve(args) -> None:
+    server = FakeOpenAIServer(
+        latency=args.latency, chunk_delay=args.chunk_delay, load_delay=args.load_delay, capacity=args.capacity,
+        batch_delay=args.batch_delay, host=args.host, port=args.port,
+    )
+    await server.start()
+    print(f"Fake OpenAI-compatible server on {server.base_url}")
+    await server.http.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--load-delay", type=float, default=0.0, help="Simulated model load time in seconds")
+    parser.add_argument("--capacity", type=int, help="Completions served at once (default: unlimited)")
+    parser.add_argument("--batch-delay", type=float, default=0.0, help="Seconds before a submitted batch is answered")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
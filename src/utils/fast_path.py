@@ -0,0 +1,168 @@
+"""
+Deterministic fast path for order-status tickets.
+
+Many shipping tickets only ask "where is order X?", which the shipping store
+answers directly. `FastPath` classifies a ticket with a few regular
+expressions before any agent runs: a shipping ticket that asks for an
+order's status, names exactly one order and shows no sign of a complaint,
+refund, change request or policy question is answered from the store with a
+`ResponseModel` built locally. An order is recognised by a leading '#'
+("#12345") or by following the word "order" ("order 12345"), so dates,
+years and quantities in a description are not mistaken for orders, and
+statuses are read with the store's async (batched) lookup. Anything else - including orders the store
+does not know - falls through to the agent, and the reason is counted.
+
+Usage:
+    fast_path = FastPath(store, response_type=ResponseModel)
+    response = await fast_path.answer(ticket)
+    if response is None:
+        response = (await agent.run(...)).data
+    print(fast_path.stats)
+"""
+
+import dataclasses
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from utils.metrics import registry
+from utils.shipping import ShippingStore, canonical_order_id
+from utils.tickets import Ticket
+
+QUERY_TYPES = frozenset({"shipping", "order_status", "delivery"})
+# Asking where an order is or when it arrives
+STATUS_INTENT = re.compile(
+    r"\b(where|status|track(?:ing)?|shipped|ship|arriv\w*|deliver(?:ed|y)?|eta|on (?:its|the) way|update)\b"
+)
+# Anything that needs judgement, an action or a policy answer goes to the agent
+NEEDS_AGENT = re.compile(
+    r"\b(refund|return|cancel\w*|damaged|broken|wrong|missing|lost|stolen|never|complain\w*|angry|frustrat\w*|"
+    r"unacceptable|ridiculous|charge[ds]?|invoice|bill\w*|policy|policies|international|customs|address|change|"
+    r"replace\w*|exchange|manager|lawyer|urgent|asap|again|still)\b"
+)
+# "#12345", or numbers after the word "order(s)" ("order 12345", "order no. 12345",
+# "orders 12345 and 67890"); other bare numbers are usually years, dates or quantities
+ORDER_ID = re.compile(
+    r"#\s?([A-Za-z0-9-]{4,})|\borders?\s+(?:(?:no\.?|number)\s*)?(\d{4,}(?:\s*(?:,|and|&|or)\s*#?\d{4,})*)\b",
+    re.IGNORECASE,
+)
+NUMBER = re.compile(r"\d{4,}")
+# Long descriptions tend to carry more than a status question
+MAX_WORDS = 40
+
+
+@dataclasses.dataclass
+class FastPathStats:
+    seen: int = 0
+    answered: int = 0
+    latency_s: float = 0.0
+    max_latency_s: float = 0.0
+    fallthrough: Counter = dataclasses.field(default_factory=Counter)
+
+    @property
+    def fraction(self) -> float:
+        return self.answered / self.seen if self.seen else 0.0
+
+    def __str__(self) -> str:
+        mean_us = self.latency_s / self.answered * 1e6 if self.answered else 0.0
+        reasons = ", ".join(f"{reason}={count}" for reason, count in self.fallthrough.most_common())
+        return (
+            f"fast path answered {self.answered}/{self.seen} ({self.fraction:.1%}) "
+            f"mean={mean_us:.0f}us max={self.max_latency_s * 1e6:.0f}us | fell through: {reasons or 'none'}"
+        )
+
+
+def order_ids_in(text: str) -> List[str]:
+    """Canonical order IDs mentioned in `text`, in order of appearance."""
+    ids = []
+    for match in ORDER_ID.finditer(text):
+        for order_id in [match.group(1)] if match.group(1) else NUMBER.findall(match.group(2)):
+            order_id = canonical_order_id(order_id)
+            if order_id not in ids:
+                ids.append(order_id)
+    return ids
+
+
+class FastPath:
+    """Answer plain order-status tickets from the shipping store.
+
+    Args:
+        store: Shipping store to read statuses from.
+        response_type: The agent's result model; built with `response`,
+            `needs_escalation`, `follow_up_required` and `sentiment`.
+    """
+
+    def __init__(self, store: ShippingStore, response_type: Type[BaseModel]):
+        self.store = store
+        self.response_type = response_type
+        self.stats = FastPathStats()
+        self._lock = threading.Lock()
+        registry.add_collector("fast_path", self.collect)
+
+    def classify(self, ticket: Ticket) -> Optional[str]:
+        """The order ID a status answer would be about, or None with the reason recorded."""
+        order_id, reason = self._classify(ticket)
+        if order_id is None:
+            with self._lock:
+                self.stats.fallthrough[reason] += 1
+        return order_id
+
+    def _classify(self, ticket: Ticket):
+        if ticket.query_type.lower() not in QUERY_TYPES:
+            return None, "query_type"
+        text = ticket.description.lower()
+        if len(text.split()) > MAX_WORDS:
+            return None, "long"
+        if NEEDS_AGENT.search(text):
+            return None, "needs_agent"
+        if not STATUS_INTENT.search(text):
+            return None, "no_status_intent"
+        ids = order_ids_in(ticket.description)
+        if ticket.order_id:
+            ticket_id = canonical_order_id(ticket.order_id)
+            if any(order_id != ticket_id for order_id in ids):
+                return None, "several_orders"
+            return ticket_id, None
+        if len(ids) != 1:
+            return None, "no_order" if not ids else "several_orders"
+        return ids[0], None
+
+    async def answer(self, ticket: Ticket) -> Optional[BaseModel]:
+        """A locally built response for a plain status ticket, or None to use the agent."""
+        start = time.perf_counter()
+        with self._lock:
+            self.stats.seen += 1
+        order_id = self.classify(ticket)
+        if order_id is None:
+            return None
+        status = await self.store.aget(order_id)
+        if status is None:
+            with self._lock:
+                self.stats.fallthrough["unknown_order"] += 1
+            return None
+        response = self.response_type(
+            response=(
+                f"Hi {ticket.customer_name}, thanks for reaching out! "
+                f"Here is the latest on order #{order_id}: {status}."
+            ),
+            needs_escalation=False,
+            follow_up_required=False,
+            sentiment="neutral",
+        )
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats.answered += 1
+            self.stats.latency_s += elapsed
+            self.stats.max_latency_s = max(self.stats.max_latency_s, elapsed)
+        return response
+
+    def collect(self) -> Dict[str, float]:
+        return {
+            "tickets_total": self.stats.seen,
+            "answered_total": self.stats.answered,
+            "answer_seconds_total": self.stats.latency_s,
+        }
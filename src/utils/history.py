@@ -0,0 +1,277 @@
+"""
+Token-budgeted message history for multi-turn conversations.
+
+Feeding `result.all_messages()` straight back as `message_history` grows the
+prompt with every turn. `HistoryManager.compact()` keeps a conversation under
+`max_tokens` in three steps, stopping as soon as it fits:
+
+1. Tool exchanges are dropped turn by turn, oldest first, from all but the
+   `keep_turns` most recent turns, as call/return pairs (a structured answer
+   given through the result tool is kept as plain text), so the history never
+   holds an unanswered tool call.
+2. The oldest whole turns are dropped, one at a time; the system prompt is
+   always kept.
+3. With a `summarizer`, dropped turns are replaced by a summary system prompt.
+   Summaries are cached by content, so each one is generated once, and a new
+   summary folds in the previous one instead of re-reading old turns.
+
+Token counts are estimated (about four characters per token) unless a
+`count_tokens` function - e.g. a tiktoken encoder - is supplied.
+
+Usage:
+    history = HistoryManager(max_tokens=2000)
+    result = agent.run_sync(prompt, message_history=history.compact(messages))
+    messages = result.all_messages()
+    print(history.last_report)
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import inspect
+import json
+import math
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    RetryPromptPart,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+PART_OVERHEAD_TOKENS = 4
+
+Summarizer = Callable[[str], Union[str, Awaitable[str]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def part_text(part) -> str:
+    """The text a model sees for one message part."""
+    if isinstance(part, (SystemPromptPart, TextPart)):
+        return part.content
+    if isinstance(part, UserPromptPart):
+        return part.content if isinstance(part.content, str) else " ".join(
+            item for item in part.content if isinstance(item, str)
+        )
+    if isinstance(part, ToolCallPart):
+        return f"{part.tool_name}({part.args_as_json_str()})"
+    if isinstance(part, ToolReturnPart):
+        return part.model_response_str()
+    if isinstance(part, RetryPromptPart):
+        return part.model_response()
+    return str(part)
+
+
+@dataclasses.dataclass
+class CompactionReport:
+    tokens_before: int
+    tokens_after: int
+    messages_before: int
+    messages_after: int
+    tool_parts_dropped: int = 0
+    turns_dropped: int = 0
+    summarized: bool = False
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def __str__(self):
+        summary = ", summarized" if self.summarized else ""
+        return (
+            f"history {self.tokens_before} -> {self.tokens_after} tokens "
+            f"({self.messages_before} -> {self.messages_after} messages, "
+            f"{self.tool_parts_dropped} tool parts and {self.turns_dropped} turns dropped{summary})"
+        )
+
+
+def _split_turns(messages: Sequence[ModelMessage]) -> Tuple[List[SystemPromptPart], List[List[ModelMessage]]]:
+    """System prompt parts, and the messages grouped into turns (each starting at a user prompt)."""
+    system_parts: List[SystemPromptPart] = []
+    turns: List[List[ModelMessage]] = []
+    for message in messages:
+        if isinstance(message, ModelRequest):
+            system_parts.extend(p for p in message.parts if isinstance(p, SystemPromptPart))
+            other = [p for p in message.parts if not isinstance(p, SystemPromptPart)]
+            if not other:
+                continue
+            if any(isinstance(p, UserPromptPart) for p in other) or not turns:
+                turns.append([])
+            turns[-1].append(dataclasses.replace(message, parts=other))
+        else:
+            if not turns:
+                turns.append([])
+            turns[-1].append(message)
+    return system_parts, turns
+
+
+def _drop_tool_exchanges(turn: List[ModelMessage], is_result_tool: Callable[[str], bool]) -> Tuple[List[ModelMessage], int]:
+    """Remove tool call/return pairs from a turn; result tool calls become text answers."""
+    compacted, dropped = [], 0
+    for message in turn:
+        parts = []
+        for part in message.parts:
+            if isinstance(part, ToolCallPart):
+                dropped += 1
+                if is_result_tool(part.tool_name):
+                    parts.append(TextPart(part.args_as_json_str()))
+            elif isinstance(part, ToolReturnPart) or (isinstance(part, RetryPromptPart) and part.tool_name):
+                dropped += 1
+            else:
+                parts.append(part)
+        if parts:
+            compacted.append(dataclasses.replace(message, parts=parts))
+    return compacted, dropped
+
+
+class HistoryManager:
+    """Keep `message_history` under a token budget.
+
+    Args:
+        max_tokens: Budget for the history passed to the next run.
+        keep_turns: Most recent turns that are never trimmed or dropped.
+        summarizer: Optional `fn(transcript) -> summary` (sync or async) used for dropped turns,
+            e.g. `agent_summarizer(agent)`.
+        summary_tokens: Budget reserved for the summary when a summarizer is set.
+        count_tokens: Token counter for a piece of text (defaults to `estimate_tokens`).
+        result_tool_prefix: Tool name prefix of structured-result tools.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        keep_turns: int = 2,
+        summarizer: Optional[Summarizer] = None,
+        summary_tokens: int = 200,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        result_tool_prefix: str = "final_result",
+    ):
+        self.max_tokens = max_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.summarizer = summarizer
+        self.summary_tokens = summary_tokens
+        self.count_tokens = count_tokens
+        self.result_tool_prefix = result_tool_prefix
+        self.last_report: Optional[CompactionReport] = None
+        self._summaries: Dict[str, str] = {}
+
+    def tokens(self, messages: Sequence[ModelMessage]) -> int:
+        """Estimated prompt tokens for `messages`."""
+        return sum(
+            self.count_tokens(part_text(part)) + PART_OVERHEAD_TOKENS for message in messages for part in message.parts
+        )
+
+    def _is_result_tool(self, name: str) -> bool:
+        return name.startswith(self.result_tool_prefix)
+
+    def _assemble(self, system_parts: List[SystemPromptPart], turns: List[List[ModelMessage]]) -> List[ModelMessage]:
+        messages = [message for turn in turns for message in turn]
+        if not system_parts:
+            return messages
+        # System prompts go back into the first request, where the agent expects them
+        if messages and isinstance(messages[0], ModelRequest):
+            return [dataclasses.replace(messages[0], parts=[*system_parts, *messages[0].parts]), *messages[1:]]
+        return [ModelRequest(parts=list(system_parts)), *messages]
+
+    def transcript(self, messages: Sequence[ModelMessage]) -> str:
+        """Plain-text rendering of turns for the summarizer."""
+        lines = []
+        for message in messages:
+            for part in message.parts:
+                if isinstance(part, UserPromptPart):
+                    lines.append(f"User: {part_text(part)}")
+                elif isinstance(part, TextPart):
+                    lines.append(f"Assistant: {part.content}")
+        return "\n".join(lines)
+
+    async def _summarize(self, previous: Optional[str], dropped: List[ModelMessage]) -> str:
+        transcript = self.transcript(dropped)
+        if previous:
+            transcript = f"{SUMMARY_PREFIX}{previous}\n\n{transcript}"
+        key = hashlib.sha256(transcript.encode()).hexdigest()
+        if key not in self._summaries:
+            summary = self.summarizer(transcript)
+            self._summaries[key] = await summary if inspect.isawaitable(summary) else summary
+        return self._summaries[key]
+
+    async def compact_async(self, messages: Sequence[ModelMessage]) -> List[ModelMessage]:
+        """Compact `messages` to fit the budget; the input list is not modified."""
+        messages = list(messages)
+        before = self.tokens(messages)
+        report = CompactionReport(before, before, len(messages), len(messages))
+        self.last_report = report
+        if before <= self.max_tokens:
+            return messages
+
+        system_parts, turns = _split_turns(messages)
+        previous_summary = None
+        for part in system_parts:
+            if part.content.startswith(SUMMARY_PREFIX):
+                previous_summary = part.content[len(SUMMARY_PREFIX):]
+        system_parts = [p for p in system_parts if not p.content.startswith(SUMMARY_PREFIX)]
+
+        summary_part = SystemPromptPart(SUMMARY_PREFIX + previous_summary) if previous_summary else None
+
+        # Tokens add up part by part, so track the total as turns shrink instead of recounting
+        turn_tokens = [self.tokens(turn) for turn in turns]
+        used = sum(turn_tokens) + self.tokens([ModelRequest(parts=list(system_parts))])
+        if self.summarizer is not None:
+            # The summary is rewritten if anything is dropped; reserve room for it
+            used += self.summary_tokens
+        elif summary_part is not None:
+            used += self.tokens([ModelRequest(parts=[summary_part])])
+
+        # 1. Drop tool exchanges from the turns before the last `keep_turns`, a turn at a
+        #    time starting with the oldest, until the history fits
+        for i in range(max(0, len(turns) - self.keep_turns)):
+            if used <= self.max_tokens:
+                break
+            turns[i], dropped = _drop_tool_exchanges(turns[i], self._is_result_tool)
+            report.tool_parts_dropped += dropped
+            used -= turn_tokens[i]
+            turn_tokens[i] = self.tokens(turns[i])
+            used += turn_tokens[i]
+        turn_tokens = [tokens for turn, tokens in zip(turns, turn_tokens) if turn]
+        turns = [turn for turn in turns if turn]
+
+        # 2. Drop the oldest turns until the rest fits, keeping room for a summary
+        dropped_messages: List[ModelMessage] = []
+        while len(turns) > self.keep_turns and used > self.max_tokens:
+            dropped_messages.extend(turns.pop(0))
+            used -= turn_tokens.pop(0)
+            report.turns_dropped += 1
+
+        # 3. Replace what was dropped with a (cached) summary
+        if self.summarizer is not None and dropped_messages:
+            summary_part = SystemPromptPart(SUMMARY_PREFIX + await self._summarize(previous_summary, dropped_messages))
+            report.summarized = True
+        if summary_part is not None:
+            system_parts = system_parts + [summary_part]
+
+        compacted = self._assemble(system_parts, turns)
+        report.tokens_after = self.tokens(compacted)
+        report.messages_after = len(compacted)
+        return compacted
+
+    def compact(self, messages: Sequence[ModelMessage]) -> List[ModelMessage]:
+        """Synchronous `compact_async`, for use alongside `agent.run_sync()`."""
+        return asyncio.get_event_loop().run_until_complete(self.compact_async(messages))
+
+
+def agent_summarizer(agent, instructions: str = "Summarize this support conversation in a few sentences, "
+                     "keeping order numbers, names and open questions:") -> Callable[[str], Awaitable[str]]:
+    """Summarizer that asks `agent` (a plain-text agent) to condense a transcript."""
+    async def summarize(transcript: str) -> str:
+        result = await agent.run(f"{instructions}\n\n{transcript}")
+        return result.data if isinstance(result.data, str) else json.dumps(result.data)
+    return summarize
@@ -0,0 +1,198 @@
+"""
+Minimal asyncio HTTP/1.1 server with keep-alive and chunked streaming.
+
+Just enough HTTP for the local stand-in model servers and the support
+service, without adding a web framework dependency. Handlers are
+`async def handler(request: Request) -> Response`; a `Response` may carry
+an async iterator of byte chunks (e.g. Server-Sent Events), which is sent
+with chunked transfer encoding so the connection can be kept alive.
+"""
+
+import asyncio
+import dataclasses
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+REASONS = {
+    200: "OK", 202: "Accepted", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    429: "Too Many Requests", 500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable",
+}
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+@dataclasses.dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, list]
+    headers: Dict[str, str]
+    body: bytes = b""
+
+    def json(self) -> Any:
+        return json.loads(self.body or b"null")
+
+
+@dataclasses.dataclass
+class Response:
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "application/json"
+    headers: Dict[str, str] = dataclasses.field(default_factory=dict)
+    stream: Optional[AsyncIterator[bytes]] = None
+
+    @classmethod
+    def json(cls, data: Any, status: int = 200, **kwargs) -> "Response":
+        return cls(status=status, body=json.dumps(data).encode(), **kwargs)
+
+    @classmethod
+    def sse(cls, events: AsyncIterator[bytes], **kwargs) -> "Response":
+        headers = {"Cache-Control": "no-cache", **kwargs.pop("headers", {})}
+        return cls(content_type="text/event-stream", stream=events, headers=headers, **kwargs)
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> bytes:
+    """Encode one Server-Sent Event; non-string data is sent as JSON."""
+    payload = data if isinstance(data, str) else json.dumps(data)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {payload}\n\n".encode()
+
+
+@dataclasses.dataclass
+class ServerStats:
+    connections_opened: int = 0
+    open_connections: int = 0
+    requests: int = 0
+
+
+class HTTPServer:
+    """Serve `handler` on host:port (port 0 picks a free port)."""
+
+    def __init__(self, handler: Callable[[Request], Awaitable[Response]], host: str = "127.0.0.1", port: int = 0):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.stats = ServerStats()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "HTTPServer":
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        """Stop listening and drop open (keep-alive) connections."""
+        if self._server is not None:
+            self._server.close()
+            connections = list(self._connections.items())
+            for writer, _ in connections:
+                writer.close()
+            await asyncio.gather(*(task for _, task in connections), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def __aenter__(self) -> "HTTPServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats.connections_opened += 1
+        self.stats.open_connections += 1
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                self.stats.requests += 1
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                try:
+                    response = await self.handler(request)
+                except Exception as exc:  # surface handler bugs as 500s, keep serving
+                    response = Response.json({"error": f"{type(exc).__name__}: {exc}"}, status=500)
+                await self._write_response(writer, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self.stats.open_connections -= 1
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return Request(method.upper(), url.path, parse_qs(url.query), headers, body)
+
+    @staticmethod
+    def _head(response: Response, headers: Dict[str, str]) -> bytes:
+        reason = REASONS.get(response.status, "Unknown")
+        head = f"HTTP/1.1 {response.status} {reason}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        return head.encode("latin-1") + b"\r\n"
+
+    async def _write_response(self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool) -> None:
+        headers = {
+            "Content-Type": response.content_type,
+            "Connection": "keep-alive" if keep_alive else "close",
+            **response.headers,
+        }
+        if response.stream is None:
+            headers["Content-Length"] = str(len(response.body))
+            writer.write(self._head(response, headers) + response.body)
+        else:
+            headers["Transfer-Encoding"] = "chunked"
+            chunks = response.stream.__aiter__()
+            try:
+                # Start the stream before sending the head: its setup (and cleanup,
+                # below) always runs, and a stream that waits before its first
+                # chunk keeps the client waiting for headers too
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    chunk = None
+                writer.write(self._head(response, headers))
+                while chunk is not None:
+                    if chunk:
+                        writer.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+                        await writer.drain()
+                    try:
+                        chunk = await chunks.__anext__()
+                    except StopAsyncIteration:
+                        chunk = None
+            finally:
+                # Run the stream's cleanup now if the client went away mid-stream
+                aclose = getattr(chunks, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
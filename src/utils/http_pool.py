@@ -0,0 +1,78 @@
+"""
+Keep-alive connection pools that follow the running event loop.
+
+An `httpx.AsyncClient`'s pooled connections belong to the event loop they
+were opened on. The examples share one client per endpoint for the whole
+process, but run on more than one loop - `agent.run_sync()` uses the default
+loop, streaming and batch mode `asyncio.run()` their own - so a connection
+opened on one loop would be reused on another, already closed one.
+`LoopTransport` keeps one pool per event loop and sends each request
+through the pool of the loop it runs on; the client, and every provider and
+model holding it, stays valid across loops.
+
+Usage:
+    transport = LoopTransport(limits=httpx.Limits(max_keepalive_connections=20))
+    client = httpx.AsyncClient(transport=transport)
+    ...
+    await transport.aclose_loop()   # at the end of each asyncio.run()
+    transport.close()               # at exit, for loops that are still open
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any
+
+import httpx
+
+
+class LoopTransport(httpx.AsyncBaseTransport):
+    """An `httpx.AsyncHTTPTransport` per event loop, created on the loop's first request.
+
+    Args:
+        **options: Passed to every `httpx.AsyncHTTPTransport` (limits, http2, ...).
+    """
+
+    def __init__(self, **options: Any):
+        self.options = options
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def _pool(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = self._pools[loop] = httpx.AsyncHTTPTransport(**self.options)
+            return pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._pool().handle_async_request(request)
+
+    async def aclose_loop(self) -> None:
+        """Close the running loop's connections (before the loop shuts down)."""
+        with self._lock:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+    async def aclose(self) -> None:
+        await self.aclose_loop()
+
+    def close(self) -> None:
+        """Close the connections of every loop that is open and idle.
+
+        Pools of loops that have already closed are dropped: their sockets
+        can only be closed from that loop, and it no longer runs.
+        """
+        with self._lock:
+            pools = list(self._pools.items())
+            self._pools.clear()
+        for loop, pool in pools:
+            if not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(pool.aclose())
+
+    def __len__(self) -> int:
+        return len(self._pools)
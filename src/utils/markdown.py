@@ -1,24 +1,104 @@
+import datetime
+import decimal
+import enum
+import types
+import typing
+import weakref
+from typing import Dict, List, Tuple
+
 from pydantic import BaseModel
 
+# id(model) -> (weakref to the model, rendered markdown), for immutable models only
+_snapshots: Dict[int, Tuple[weakref.ref, str]] = {}
 
-def to_markdown(data, indent=0):
-    markdown = ""
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None), decimal.Decimal, enum.Enum,
+                    datetime.date, datetime.time, datetime.timedelta)
+_CONTAINERS = (dict, list, tuple)
+# isinstance against BaseModel goes through ABCMeta; the common scalars skip it
+_SCALARS = frozenset({str, int, float, bool, type(None)})
+# `X | Y` annotations (Python 3.10+) have their own origin
+_UNION_TYPES = (typing.Union, getattr(types, "UnionType", typing.Union))
+# model class -> whether every field is immutable too
+_immutable_types: Dict[type, bool] = {}
+
+
+def _render(data, indent: int, out: List[str]) -> None:
+    """Append the markdown for `data` to `out`; models are dumped to dicts first."""
     if isinstance(data, BaseModel):
         data = data.model_dump()
     if isinstance(data, dict):
+        heading = "#" * (indent + 2)
         for key, value in data.items():
-            markdown += f"{'#' * (indent + 2)} {key.upper()}\n"
-            if isinstance(value, (dict, list, BaseModel)):
-                markdown += to_markdown(value, indent + 1)
+            out.append(f"{heading} {key.upper()}\n")
+            if isinstance(value, _CONTAINERS) or (type(value) not in _SCALARS and isinstance(value, BaseModel)):
+                _render(value, indent + 1, out)
             else:
-                markdown += f"{value}\n\n"
-    elif isinstance(data, list):
+                out.append(f"{value}\n\n")
+    elif isinstance(data, (list, tuple)):
         for item in data:
-            if isinstance(item, (dict, list, BaseModel)):
-                markdown += to_markdown(item, indent)
+            if isinstance(item, _CONTAINERS) or (type(item) not in _SCALARS and isinstance(item, BaseModel)):
+                _render(item, indent, out)
             else:
-                markdown += f"- {item}\n"
-        markdown += "\n"
+                out.append(f"- {item}\n")
+        out.append("\n")
     else:
-        markdown += f"{data}\n\n"
+        out.append(f"{data}\n\n")
+
+
+def _is_immutable_annotation(annotation) -> bool:
+    origin = typing.get_origin(annotation)
+    if origin is None:
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return _is_immutable_type(annotation)
+        return annotation is type(None) or (isinstance(annotation, type) and issubclass(annotation, _IMMUTABLE_TYPES))
+    if origin in _UNION_TYPES or origin in (tuple, frozenset):
+        return all(arg is Ellipsis or _is_immutable_annotation(arg) for arg in typing.get_args(annotation))
+    return origin is typing.Literal
+
+
+def _is_immutable_type(model_type: type) -> bool:
+    verdict = _immutable_types.get(model_type)
+    if verdict is None:
+        config = model_type.model_config
+        if not config.get("frozen") or config.get("extra") == "allow":
+            verdict = False
+        else:
+            # Provisionally immutable, so self-referencing models terminate
+            _immutable_types[model_type] = True
+            verdict = all(_is_immutable_annotation(f.annotation) for f in model_type.model_fields.values())
+        _immutable_types[model_type] = verdict
+    return verdict
+
+
+def is_immutable(data) -> bool:
+    """Whether `data` is a frozen model whose fields can't change either.
+
+    Frozen models only stop field assignment; a `List` field can still be
+    appended to. Only models whose fields are all scalars, tuples and other
+    immutable models can be memoized by identity.
+    """
+    return isinstance(data, BaseModel) and _is_immutable_type(type(data))
+
+
+def to_markdown(data, indent=0):
+    """Render a model, dict or list as nested markdown sections.
+
+    A model is dumped once with `model_dump()` and the result is walked into
+    a single buffer, so rendering is linear in the size of `data`. Renderings
+    of immutable models (see `is_immutable`) are memoized for as long as the
+    model is alive, so the same customer snapshot is only rendered once.
+    """
+    memoize = indent == 0 and is_immutable(data)
+    if memoize:
+        entry = _snapshots.get(id(data))
+        if entry is not None and entry[0]() is data:
+            return entry[1]
+
+    out: List[str] = []
+    _render(data, indent, out)
+    markdown = "".join(out)
+
+    if memoize:
+        key = id(data)
+        _snapshots[key] = (weakref.ref(data, lambda _, key=key: _snapshots.pop(key, None)), markdown)
     return markdown
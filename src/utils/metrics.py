@@ -0,0 +1,322 @@
+"""
+Usage metrics for every agent run.
+
+`MetricsRegistry` aggregates model requests, request/response tokens, tool
+calls and wall time per `(example, model, query_type)` label set. Recording a
+run is a dict lookup and a few additions under a lock, so it can stay on in
+production. Aggregates export in Prometheus text format (for scraping, or as
+a node-exporter textfile), and each run can also be appended to a
+size-rotated JSONL log for offline capacity planning and cost attribution.
+Other components (e.g. the system prompt cache) export their own values
+through `add_collector`.
+
+Usage:
+    with registry.observe("tools", agent.model, query_type="shipping") as run:
+        run.result = agent.run_sync(prompt, deps=deps)
+    print(registry.summary_table())
+    registry.write_prometheus("agent_metrics.prom")
+"""
+
+import dataclasses
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.stats import LatencyHistogram
+
+LABELS = ("example", "model", "query_type")
+RESULT_TOOL_PREFIX = "final_result"
+
+
+def model_label(model) -> str:
+    """Model name for labels; accepts a model, a model name or None."""
+    if model is None:
+        return "default"
+    if isinstance(model, str):
+        return model
+    return getattr(model, "model_name", type(model).__name__)
+
+
+def count_tool_calls(messages) -> int:
+    """Function tool calls in `messages` (the structured-result tool is not counted)."""
+    from pydantic_ai.messages import ToolCallPart
+
+    return sum(
+        1
+        for message in messages
+        for part in message.parts
+        if isinstance(part, ToolCallPart) and not part.tool_name.startswith(RESULT_TOOL_PREFIX)
+    )
+
+
+@dataclasses.dataclass
+class RunObservation:
+    """Filled in by the caller inside `MetricsRegistry.observe()`.
+
+    Set `result` to the run result (`AgentRunResult` or `StreamedRunResult`),
+    or set the counters directly when there is no result object.
+    """
+    result: Any = None
+    requests: int = 0
+    request_tokens: int = 0
+    response_tokens: int = 0
+    tool_calls: int = 0
+
+    def resolve(self) -> "RunObservation":
+        if self.result is not None:
+            usage = self.result.usage()
+            self.requests = usage.requests
+            self.request_tokens = usage.request_tokens or 0
+            self.response_tokens = usage.response_tokens or 0
+            self.tool_calls = count_tool_calls(self.result.new_messages())
+        return self
+
+
+@dataclasses.dataclass
+class SeriesTotals:
+    """Aggregates for one label set."""
+    runs: int = 0
+    errors: int = 0
+    requests: int = 0
+    request_tokens: int = 0
+    response_tokens: int = 0
+    tool_calls: int = 0
+    wall: LatencyHistogram = dataclasses.field(default_factory=LatencyHistogram)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.request_tokens + self.response_tokens
+
+
+class JsonlLog:
+    """Append-only JSONL file rotated by size (`path`, `path.1`, ... `path.{backups}`).
+
+    Lines are buffered and written every `flush_every` records, on `flush()` and on `close()`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5, flush_every: int = 64):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+
+    def append(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._buffer.append(json.dumps(record))
+            if len(self._buffer) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    close = flush
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        data = "\n".join(self._buffer) + "\n"
+        self._buffer.clear()
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "a") as f:
+            f.write(data)
+
+    def _rotate(self) -> None:
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class MetricsRegistry:
+    """In-memory aggregation of agent run metrics, optionally logging each run."""
+
+    def __init__(self, log: Optional[JsonlLog] = None):
+        self.log = log
+        self._series: Dict[Tuple[str, str, str], SeriesTotals] = {}
+        self._collectors: List[Tuple[str, Dict[str, str], Callable[[], Dict[str, float]]]] = []
+        self._lock = threading.Lock()
+
+    def log_to(self, path: str, **options) -> JsonlLog:
+        """Also append every run to a rotating JSONL file at `path`."""
+        self.log = JsonlLog(path, **options)
+        return self.log
+
+    def add_collector(self, name: str, collect: Callable[[], Dict[str, float]], **labels: str) -> None:
+        """Also export the values returned by `collect()` (e.g. cache statistics).
+
+        Each key becomes a `{prefix}_{name}_{key}` series with `labels`; keys
+        ending in `_total` are counters, the rest gauges. Collectors may share
+        a name and labels (e.g. one per service instance); their values are
+        merged into one series.
+        """
+        with self._lock:
+            self._collectors.append((name, labels, collect))
+
+    def collected(self) -> List[Tuple[str, Dict[str, str], Dict[str, float]]]:
+        """Current values of every collector as (name, labels, values).
+
+        Collectors with the same name and labels are merged: values are summed,
+        except `_ratio` gauges, which are averaged.
+        """
+        with self._lock:
+            collectors = list(self._collectors)
+        merged: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Tuple[Dict[str, str], Dict[str, float], int]] = {}
+        for name, labels, collect in collectors:
+            key = (name, tuple(sorted(labels.items())))
+            values = collect()
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = (labels, dict(values), 1)
+                continue
+            totals, count = entry[1], entry[2] + 1
+            for field, value in values.items():
+                totals[field] = totals.get(field, 0) + value
+            merged[key] = (labels, totals, count)
+        result = []
+        for (name, _), (labels, values, count) in merged.items():
+            if count > 1:
+                values = {field: value / count if field.endswith("_ratio") else value for field, value in values.items()}
+            result.append((name, labels, values))
+        return result
+
+    def record(
+        self,
+        example: str,
+        model,
+        query_type: str = "",
+        *,
+        wall_s: float,
+        observation: Optional[RunObservation] = None,
+        error: bool = False,
+    ) -> None:
+        """Add one run to the aggregates (and the JSONL log, if configured)."""
+        run = (observation or RunObservation()).resolve()
+        labels = (example, model_label(model), query_type or "")
+        with self._lock:
+            totals = self._series.get(labels)
+            if totals is None:
+                totals = self._series[labels] = SeriesTotals()
+            totals.runs += 1
+            totals.errors += error
+            totals.requests += run.requests
+            totals.request_tokens += run.request_tokens
+            totals.response_tokens += run.response_tokens
+            totals.tool_calls += run.tool_calls
+            totals.wall.observe(wall_s)
+        if self.log is not None:
+            self.log.append({
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                **dict(zip(LABELS, labels)),
+                "wall_s": round(wall_s, 6),
+                "requests": run.requests,
+                "request_tokens": run.request_tokens,
+                "response_tokens": run.response_tokens,
+                "tool_calls": run.tool_calls,
+                "error": error,
+            })
+
+    @contextmanager
+    def observe(self, example: str, model, query_type: str = "") -> Iterator[RunObservation]:
+        """Time the block and record it as one run; exceptions are counted as errors and re-raised."""
+        observation = RunObservation()
+        start = time.perf_counter()
+        try:
+            yield observation
+        except BaseException:
+            self.record(example, model, query_type, wall_s=time.perf_counter() - start,
+                        observation=observation, error=True)
+            raise
+        self.record(example, model, query_type, wall_s=time.perf_counter() - start, observation=observation)
+
+    def series(self) -> Dict[Tuple[str, str, str], SeriesTotals]:
+        """A consistent copy of the aggregates, keyed by (example, model, query_type)."""
+        with self._lock:
+            return {labels: dataclasses.replace(totals, wall=dataclasses.replace(
+                totals.wall, counts=list(totals.wall.counts))) for labels, totals in self._series.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def to_prometheus(self, prefix: str = "agent") -> str:
+        """Aggregates in the Prometheus text exposition format."""
+        series = self.series()
+        counters = [
+            ("runs_total", "Agent runs.", "runs"),
+            ("run_errors_total", "Agent runs that raised.", "errors"),
+            ("model_requests_total", "Model requests made by agent runs.", "requests"),
+            ("request_tokens_total", "Prompt tokens sent to the model.", "request_tokens"),
+            ("response_tokens_total", "Completion tokens returned by the model.", "response_tokens"),
+            ("tool_calls_total", "Function tool calls.", "tool_calls"),
+        ]
+        lines = []
+        for name, help_text, field in counters:
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} counter"]
+            lines += [f"{prefix}_{name}{{{_labels(key)}}} {getattr(t, field)}" for key, t in series.items()]
+
+        name = f"{prefix}_run_duration_seconds"
+        lines += [f"# HELP {name} Wall time of agent runs.", f"# TYPE {name} histogram"]
+        for key, totals in series.items():
+            labels = _labels(key)
+            for bound, count in totals.wall.cumulative().items():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {totals.wall.sum_s:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {totals.wall.count}")
+
+        samples: Dict[str, List[str]] = {}
+        for collector, labels, values in self.collected():
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+            label_text = f"{{{label_text}}}" if label_text else ""
+            for key, value in values.items():
+                name = f"{prefix}_{collector}_{key}"
+                samples.setdefault(name, []).append(f"{name}{label_text} {value:g}")
+        for name, values in samples.items():
+            lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            lines += values
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "agent") -> None:
+        """Write `to_prometheus()` atomically (safe for a textfile collector)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(tmp, path)
+
+    def summary_table(self) -> str:
+        rows = [f"{'example':<16} {'model':<20} {'query type':<12} {'runs':>5} {'err':>4} "
+                f"{'req':>5} {'tokens':>8} {'tools':>5} {'mean s':>7}"]
+        for (example, model, query_type), t in sorted(self.series().items()):
+            rows.append(
+                f"{example:<16} {model[:20]:<20} {query_type[:12] or '-':<12} {t.runs:>5} {t.errors:>4} "
+                f"{t.requests:>5} {t.total_tokens:>8} {t.tool_calls:>5} {t.wall.mean_s:>7.2f}"
+            )
+        for collector, labels, values in self.collected():
+            if any(values.values()):
+                label_text = ",".join(labels.values())
+                rows.append(f"{collector} {label_text}: " + " ".join(
+                    f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}" for key, value in values.items()
+                ))
+        return "\n".join(rows)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(key: Tuple[str, str, str]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(LABELS, key))
+
+
+# Process-wide registry used by the examples and batch mode
+registry = MetricsRegistry()
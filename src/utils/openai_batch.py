@@ -0,0 +1,280 @@
+"""
+Offline submission of prompts through an OpenAI-style Batch API.
+
+Non-urgent tickets don't need interactive latency, and batch endpoints
+answer within a completion window at a lower price and outside the
+interactive rate limits. `batch_line` turns one conversation into a line of
+a batch JSONL file - a chat completion whose `response_format` is the strict
+JSON schema of the result type - and `BatchClient` uploads the file, creates
+the batch, polls it until it finishes and downloads the output, which
+`parse_output` validates back into the result type. Lines that failed, were
+never answered or did not validate come back by `custom_id`, so the caller
+can re-queue them on the interactive path.
+
+`FakeOpenAIServer` implements the files and batches endpoints for testing.
+
+Usage:
+    lines = [batch_line(t.ticket_id, messages_for(t), "gpt-4o", ResponseModel) for t in tickets]
+    client = BatchClient("https://api.openai.com/v1")
+    result = await client.run(lines, ResponseModel, poll_interval=60)
+    result.responses  # custom_id -> ResponseModel
+    result.errors     # custom_id -> reason, for re-queuing
+"""
+
+import asyncio
+import copy
+import dataclasses
+import functools
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+import httpx
+from pydantic import BaseModel, ValidationError
+
+from utils.metrics import registry
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+CHAT_COMPLETIONS = "/v1/chat/completions"
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+class BatchError(RuntimeError):
+    """The batch as a whole failed, expired or was cancelled, or waiting for it timed out."""
+
+
+def strict_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a JSON schema that meets structured-output strict mode.
+
+    Every object gets `additionalProperties: false` and lists all of its
+    properties as required.
+    """
+    schema = copy.deepcopy(schema)
+
+    def visit(node: Any) -> None:
+        if isinstance(node, dict):
+            if node.get("type") == "object" and "properties" in node:
+                node["additionalProperties"] = False
+                node["required"] = list(node["properties"])
+            for value in node.values():
+                visit(value)
+        elif isinstance(node, list):
+            for value in node:
+                visit(value)
+
+    visit(schema)
+    return schema
+
+
+@functools.lru_cache(maxsize=None)
+def response_format(response_type: Type[BaseModel]) -> Dict[str, Any]:
+    """`response_format` asking for JSON matching `response_type` (shared by every line; don't mutate)."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": response_type.__name__,
+            "schema": strict_schema(response_type.model_json_schema()),
+            "strict": True,
+        },
+    }
+
+
+def batch_line(
+    custom_id: str,
+    messages: List[Dict[str, str]],
+    model: str,
+    response_type: Type[BaseModel],
+    **body: Any,
+) -> Dict[str, Any]:
+    """One request of a batch file: a chat completion with a structured response."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": CHAT_COMPLETIONS,
+        "body": {"model": model, "messages": messages, "response_format": response_format(response_type), **body},
+    }
+
+
+def encode_jsonl(lines: Iterable[Dict[str, Any]]) -> bytes:
+    return b"".join(json.dumps(line, separators=(",", ":")).encode() + b"\n" for line in lines)
+
+
+def parse_output(data: bytes, response_type: Type[BaseModel]):
+    """Validate an output (or error) file; returns (custom_id -> response, custom_id -> reason)."""
+    responses: Dict[str, BaseModel] = {}
+    errors: Dict[str, str] = {}
+    for raw in data.splitlines():
+        if not raw.strip():
+            continue
+        record = json.loads(raw)
+        custom_id = record["custom_id"]
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        if record.get("error"):
+            error = record["error"]
+            errors[custom_id] = f"{error.get('code')}: {error.get('message')}"
+        elif response.get("status_code") != 200:
+            message = (body.get("error") or {}).get("message", "")
+            errors[custom_id] = f"HTTP {response.get('status_code')}: {message}".rstrip(": ")
+        else:
+            message = body["choices"][0]["message"]
+            if message.get("refusal"):
+                errors[custom_id] = f"refused: {message['refusal']}"
+                continue
+            try:
+                responses[custom_id] = response_type.model_validate_json(message.get("content") or "")
+            except ValidationError as exc:
+                errors[custom_id] = f"invalid output: {exc.error_count()} validation errors"
+    return responses, errors
+
+
+@dataclasses.dataclass
+class BatchResult:
+    """Outcome of one submitted batch."""
+    batch: Dict[str, Any]
+    responses: Dict[str, BaseModel]
+    errors: Dict[str, str]
+    wait_s: float = 0.0
+
+    def __str__(self):
+        counts = self.batch.get("request_counts", {})
+        return (
+            f"batch {self.batch['id']} {self.batch['status']}: {len(self.responses)} validated, "
+            f"{len(self.errors)} to re-queue of {counts.get('total', '?')} in {self.wait_s:.1f}s"
+        )
+
+
+@dataclasses.dataclass
+class BatchStats:
+    batches: int = 0
+    submitted: int = 0
+    validated: int = 0
+    requeued: int = 0
+    polls: int = 0
+    wait_s: float = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.batches} batches: {self.submitted} requests submitted, {self.validated} validated, "
+            f"{self.requeued} re-queued, {self.polls} polls, {self.wait_s:.1f}s waiting"
+        )
+
+
+class BatchClient:
+    """Client for the files and batches endpoints of an OpenAI-compatible API.
+
+    Args:
+        base_url: API root including `/v1` (default: OpenAI).
+        api_key: Bearer token (default: `OPENAI_API_KEY`, if set).
+        http: Client to send requests with, e.g. the pooled `setup.get_http_client(base_url)`.
+        completion_window: How long the endpoint may take ("24h" is what OpenAI offers).
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        http: Optional[httpx.AsyncClient] = None,
+        completion_window: str = "24h",
+    ):
+        self.base_url = (base_url or OPENAI_BASE_URL).rstrip("/")
+        api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY")
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._owns_http = http is None
+        self.http = http or httpx.AsyncClient(timeout=60.0)
+        self.completion_window = completion_window
+        self.stats = BatchStats()
+        registry.add_collector("offline_batch", self.collect, endpoint=self.base_url)
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        response = await self.http.request(method, self.base_url + path, headers=self.headers, **kwargs)
+        response.raise_for_status()
+        return response
+
+    async def upload(self, data: bytes, filename: str = "batch.jsonl") -> str:
+        """Upload a batch input file; returns its file id."""
+        files = {"file": (filename, data, "application/jsonl")}
+        response = await self._request("POST", "/files", data={"purpose": "batch"}, files=files)
+        return response.json()["id"]
+
+    async def create(self, input_file_id: str, metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        body = {"input_file_id": input_file_id, "endpoint": CHAT_COMPLETIONS,
+                "completion_window": self.completion_window}
+        if metadata:
+            body["metadata"] = metadata
+        return (await self._request("POST", "/batches", json=body)).json()
+
+    async def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        return (await self._request("GET", f"/batches/{batch_id}")).json()
+
+    async def content(self, file_id: str) -> bytes:
+        return (await self._request("GET", f"/files/{file_id}/content")).content
+
+    async def wait(self, batch_id: str, poll_interval: float = 60.0, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Poll until the batch reaches a terminal status; returns the batch object."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            batch = await self.retrieve(batch_id)
+            self.stats.polls += 1
+            if batch["status"] in TERMINAL_STATUSES:
+                return batch
+            if deadline is not None and time.monotonic() + poll_interval > deadline:
+                raise BatchError(f"batch {batch_id} still {batch['status']} after {timeout}s")
+            await asyncio.sleep(poll_interval)
+
+    async def run(
+        self,
+        lines: List[Dict[str, Any]],
+        response_type: Type[BaseModel],
+        poll_interval: float = 60.0,
+        timeout: Optional[float] = None,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> BatchResult:
+        """Submit `lines` as one batch, wait for it and validate every answer.
+
+        Requests missing from both the output and error files (e.g. when the
+        batch expired part-way) are reported as errors too, so every
+        `custom_id` ends up in exactly one of `responses` and `errors`.
+        """
+        start = time.perf_counter()
+        batch = await self.create(await self.upload(encode_jsonl(lines)), metadata)
+        self.stats.batches += 1
+        self.stats.submitted += len(lines)
+        batch = await self.wait(batch["id"], poll_interval, timeout)
+        if batch["status"] == "failed":
+            reasons = [e.get("message", "") for e in (batch.get("errors") or {}).get("data", [])]
+            raise BatchError(f"batch {batch['id']} failed: {'; '.join(reasons) or 'no reason given'}")
+
+        responses: Dict[str, BaseModel] = {}
+        errors: Dict[str, str] = {}
+        for key in ("output_file_id", "error_file_id"):
+            if batch.get(key):
+                ok, failed = parse_output(await self.content(batch[key]), response_type)
+                responses.update(ok)
+                errors.update(failed)
+        for line in lines:
+            if line["custom_id"] not in responses and line["custom_id"] not in errors:
+                errors[line["custom_id"]] = f"not answered (batch {batch['status']})"
+
+        wait_s = time.perf_counter() - start
+        self.stats.validated += len(responses)
+        self.stats.requeued += len(errors)
+        self.stats.wait_s += wait_s
+        return BatchResult(batch, responses, errors, wait_s)
+
+    def collect(self) -> Dict[str, float]:
+        """Values exported by the metrics registry."""
+        stats = self.stats
+        return {
+            "batches_total": stats.batches,
+            "submitted_total": stats.submitted,
+            "validated_total": stats.validated,
+            "requeued_total": stats.requeued,
+            "wait_seconds_total": stats.wait_s,
+        }
+
+    async def aclose(self) -> None:
+        """Close the HTTP client if this client created it."""
+        if self._owns_http:
+            await self.http.aclose()
@@ -0,0 +1,229 @@
+"""
+Cached dynamic system prompts.
+
+A dynamic system prompt such as `add_customer_name` renders the deps again on
+every run. `cached_system_prompt` keeps its output under a stable content hash
+of the deps (or of the part selected by `key`), so a customer sending many
+messages reuses the rendered text - also when the deps are rebuilt for every
+run, as batch mode does per ticket. The hash covers every field, so when a
+customer's orders change the key changes and the prompt is rendered again;
+the stale entry ages out of the LRU. Concurrent runs that miss on the same key
+wait for one rendering instead of each doing it.
+
+Hits, misses, render time and the estimated time saved (hits x mean render
+time, minus hashing) are exported through `utils.metrics.registry`.
+
+Usage:
+    @cached_system_prompt(key=lambda deps: deps.customer)
+    async def add_customer_name(ctx: RunContext[SupportDeps]) -> str:
+        return f"Customer details: {to_markdown(ctx.deps.customer)}"
+
+    agent.system_prompt(dynamic=True)(add_customer_name)
+    print(add_customer_name.cache.stats)
+"""
+
+import asyncio
+import dataclasses
+import functools
+import hashlib
+import inspect
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pydantic_core
+
+from utils.markdown import is_immutable
+from utils.metrics import registry
+
+# id(model) -> (weakref to the model, digest), for immutable models only
+_digests: Dict[int, Tuple[weakref.ref, str]] = {}
+
+
+def content_hash(value: Any) -> str:
+    """Stable digest of a model, dataclass or JSON-like value, covering every field.
+
+    Digests of immutable models (see `utils.markdown.is_immutable`) are
+    memoized for as long as the model is alive.
+    """
+    memoize = is_immutable(value)
+    if memoize:
+        entry = _digests.get(id(value))
+        if entry is not None and entry[0]() is value:
+            return entry[1]
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(type(value).__qualname__.encode())
+    digest.update(pydantic_core.to_json(value))
+    result = digest.hexdigest()
+
+    if memoize:
+        key = id(value)
+        _digests[key] = (weakref.ref(value, lambda _, key=key: _digests.pop(key, None)), result)
+    return result
+
+
+@dataclasses.dataclass
+class PromptCacheStats:
+    hits: int = 0
+    misses: int = 0
+    render_s: float = 0.0  # spent rendering on misses
+    lookup_s: float = 0.0  # spent hashing and looking up on hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def mean_render_s(self) -> float:
+        return self.render_s / self.misses if self.misses else 0.0
+
+    @property
+    def saved_s(self) -> float:
+        """Estimated rendering time avoided by hits."""
+        return max(0.0, self.hits * self.mean_render_s - self.lookup_s)
+
+    def __str__(self):
+        return (
+            f"{self.hits} hits / {self.misses} misses ({self.hit_rate:.0%}), "
+            f"{self.saved_s * 1000:.2f}ms saved, mean render {self.mean_render_s * 1e6:.1f}us"
+        )
+
+
+class PromptCache:
+    """Bounded LRU of rendered prompts keyed by content hash, safe across threads.
+
+    Args:
+        maxsize: Entries kept; the least recently used is evicted first.
+        ttl: Optional seconds after which an entry is rendered again.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = PromptCacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, value: Any = None) -> None:
+        """Drop the entry for `value` (as passed to `key`), or every entry when omitted."""
+        with self._lock:
+            if value is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(content_hash(value), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _hit(self, seconds: float) -> None:
+        with self._lock:
+            self.stats.hits += 1
+            self.stats.lookup_s += seconds
+
+    def _miss(self, seconds: float) -> None:
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.render_s += seconds
+
+    def collect(self) -> Dict[str, float]:
+        """Values exported by the metrics registry."""
+        stats = self.stats
+        return {
+            "hits_total": stats.hits,
+            "misses_total": stats.misses,
+            "render_seconds_total": stats.render_s,
+            "saved_seconds_total": stats.saved_s,
+            "hit_ratio": stats.hit_rate,
+            "entries": len(self),
+        }
+
+
+def cached_system_prompt(
+    func: Optional[Callable] = None,
+    *,
+    key: Optional[Callable[[Any], Any]] = None,
+    maxsize: int = 1024,
+    ttl: Optional[float] = None,
+):
+    """Cache a dynamic system prompt function `fn(ctx) -> str` (sync or async) by its deps.
+
+    Args:
+        key: Selects the part of `ctx.deps` the prompt depends on (default: all of it).
+        maxsize: Rendered prompts kept across runs.
+        ttl: Optional lifetime of an entry in seconds.
+
+    The wrapper exposes its `PromptCache` as `.cache`.
+    """
+    if func is None:
+        return functools.partial(cached_system_prompt, key=key, maxsize=maxsize, ttl=ttl)
+
+    cache = PromptCache(maxsize=maxsize, ttl=ttl)
+    select = key or (lambda deps: deps)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(ctx):
+            start = time.perf_counter()
+            digest = content_hash(select(ctx.deps))
+            text = cache.get(digest)
+            while text is None and digest in cache._pending:
+                # Another run is rendering the same prompt; a failed rendering resolves to None,
+                # and the first waiter to wake up renders it instead
+                text = await asyncio.shield(cache._pending[digest])
+            if text is not None:
+                cache._hit(time.perf_counter() - start)
+                return text
+
+            future = cache._pending[digest] = asyncio.get_running_loop().create_future()
+            try:
+                render_start = time.perf_counter()
+                text = await func(ctx)
+                cache._miss(time.perf_counter() - render_start)
+                cache.put(digest, text)
+            finally:
+                future.set_result(text)
+                if cache._pending.get(digest) is future:
+                    del cache._pending[digest]
+            return text
+    else:
+        @functools.wraps(func)
+        def wrapper(ctx):
+            # Runs in a worker thread; concurrent misses may both render, which is harmless
+            start = time.perf_counter()
+            digest = content_hash(select(ctx.deps))
+            text = cache.get(digest)
+            if text is not None:
+                cache._hit(time.perf_counter() - start)
+                return text
+            render_start = time.perf_counter()
+            text = func(ctx)
+            cache._miss(time.perf_counter() - render_start)
+            cache.put(digest, text)
+            return text
+
+    wrapper.cache = cache
+    registry.add_collector("system_prompt_cache", cache.collect, prompt=f"{func.__module__}.{func.__qualname__}")
+    return wrapper
@@ -0,0 +1,194 @@
+"""
+Retry telemetry for self-correcting agents.
+
+When a tool raises `ModelRetry` or the result fails `ResponseModel`
+validation, pydantic-ai sends a `RetryPromptPart` back to the model and asks
+again. `run_with_retry_telemetry` steps through the agent graph node by node,
+and whenever a model request carries retry prompts it charges that request's
+latency and token usage to the retries that caused it.
+
+Per-run `RunRetryReport`s are collected in a `RetryTelemetry`, which can be
+exported as JSONL and summarized per tool. When `utils.tracing.tracer` is
+enabled the run is traced as well.
+
+Usage:
+    telemetry = RetryTelemetry()
+    result, report = await run_with_retry_telemetry(agent, prompt, deps=deps, telemetry=telemetry)
+    print(telemetry.summary_table())
+    telemetry.write_jsonl("retries.jsonl")
+"""
+
+import dataclasses
+import json
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import RetryPromptPart
+
+from utils.tracing import step, tracer
+
+RESULT_VALIDATION = "<result validation>"
+
+
+@dataclasses.dataclass
+class RetryEvent:
+    """One retry prompt sent back to the model and what answering it cost."""
+    kind: str  # "tool" or "result"
+    tool_name: str
+    message: str
+    latency_s: float = 0.0
+    request_tokens: int = 0
+    response_tokens: int = 0
+
+
+@dataclasses.dataclass
+class RunRetryReport:
+    """Retry accounting for a single agent run."""
+    label: Optional[str] = None
+    latency_s: float = 0.0
+    requests: int = 0
+    request_tokens: int = 0
+    response_tokens: int = 0
+    events: List[RetryEvent] = dataclasses.field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def tool_retries(self) -> int:
+        return sum(1 for e in self.events if e.kind == "tool")
+
+    @property
+    def result_retries(self) -> int:
+        return sum(1 for e in self.events if e.kind == "result")
+
+    @property
+    def retry_latency_s(self) -> float:
+        return sum(e.latency_s for e in self.events)
+
+    @property
+    def retry_tokens(self) -> int:
+        return sum(e.request_tokens + e.response_tokens for e in self.events)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dataclasses.asdict(self)
+        data.update(
+            tool_retries=self.tool_retries,
+            result_retries=self.result_retries,
+            retry_latency_s=self.retry_latency_s,
+            retry_tokens=self.retry_tokens,
+        )
+        return data
+
+
+class RetryTelemetry:
+    """Collects `RunRetryReport`s and aggregates them."""
+
+    def __init__(self):
+        self.reports: List[RunRetryReport] = []
+
+    def record(self, report: RunRetryReport) -> None:
+        self.reports.append(report)
+
+    def write_jsonl(self, path: str) -> None:
+        """Append one JSON line per recorded run to `path`."""
+        with open(path, "a") as f:
+            for report in self.reports:
+                f.write(json.dumps(report.to_dict()) + "\n")
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool retry counts, added latency/tokens and most common messages."""
+        per_tool: Dict[str, Dict[str, Any]] = defaultdict(
+            lambda: {"retries": 0, "latency_s": 0.0, "tokens": 0, "messages": Counter()}
+        )
+        for report in self.reports:
+            for event in report.events:
+                row = per_tool[event.tool_name]
+                row["retries"] += 1
+                row["latency_s"] += event.latency_s
+                row["tokens"] += event.request_tokens + event.response_tokens
+                row["messages"][event.message.splitlines()[0][:80]] += 1
+        return dict(per_tool)
+
+    def summary_table(self) -> str:
+        runs = len(self.reports)
+        retried = sum(1 for r in self.reports if r.events)
+        total_latency = sum(r.latency_s for r in self.reports)
+        retry_latency = sum(r.retry_latency_s for r in self.reports)
+        lines = [
+            f"{runs} runs, {retried} with retries; "
+            f"{retry_latency:.2f}s of {total_latency:.2f}s spent answering retries",
+            f"{'tool':<28} {'retries':>7} {'added s':>9} {'added tok':>10}  top message",
+        ]
+        for tool_name, row in sorted(self.summary().items(), key=lambda kv: -kv[1]["latency_s"]):
+            top = row["messages"].most_common(1)[0][0] if row["messages"] else ""
+            lines.append(
+                f"{tool_name:<28} {row['retries']:>7} {row['latency_s']:>9.2f} {row['tokens']:>10}  {top}"
+            )
+        return "\n".join(lines)
+
+
+def _retry_events(parts, result_tool_names) -> List[RetryEvent]:
+    events = []
+    for part in parts:
+        if not isinstance(part, RetryPromptPart):
+            continue
+        if part.tool_name is None or part.tool_name in result_tool_names:
+            kind, tool_name = "result", RESULT_VALIDATION
+        else:
+            kind, tool_name = "tool", part.tool_name
+        message = part.content if isinstance(part.content, str) else json.dumps(part.content, default=str)
+        events.append(RetryEvent(kind=kind, tool_name=tool_name, message=message))
+    return events
+
+
+async def run_with_retry_telemetry(
+    agent: Agent, user_prompt: str, *, telemetry: Optional[RetryTelemetry] = None, label: Optional[str] = None, **kwargs
+) -> Tuple[Any, RunRetryReport]:
+    """Run `agent` like `agent.run` while recording what each retry costs.
+
+    Returns `(result, report)`; the report is also added to `telemetry` if given,
+    including for runs that fail after exhausting their retries.
+    """
+    report = RunRetryReport(label=label)
+    start = time.perf_counter()
+    run = None
+    try:
+        with tracer.span("agent run", **({"label": label} if label else {})):
+            async with agent.iter(user_prompt, **kwargs) as run:
+                result_schema = run.ctx.deps.result_schema
+                result_tool_names = set(result_schema.tools) if result_schema is not None else set()
+                node = run.next_node
+                while not Agent.is_end_node(node):
+                    if not Agent.is_model_request_node(node):
+                        node = await step(run, node)
+                        continue
+
+                    events = _retry_events(node.request.parts, result_tool_names)
+                    before = dataclasses.replace(run.usage())
+                    node_start = time.perf_counter()
+                    node = await step(run, node)
+                    if events:
+                        elapsed = time.perf_counter() - node_start
+                        after = run.usage()
+                        request_tokens = (after.request_tokens or 0) - (before.request_tokens or 0)
+                        response_tokens = (after.response_tokens or 0) - (before.response_tokens or 0)
+                        for event in events:
+                            event.latency_s = elapsed / len(events)
+                            event.request_tokens = request_tokens // len(events)
+                            event.response_tokens = response_tokens // len(events)
+                        report.events.extend(events)
+                result = run.result
+    except Exception as exc:
+        report.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        report.latency_s = time.perf_counter() - start
+        if run is not None:
+            usage = run.usage()
+            report.requests = usage.requests
+            report.request_tokens = usage.request_tokens or 0
+            report.response_tokens = usage.response_tokens or 0
+        if telemetry is not None:
+            telemetry.record(report)
+    return result, report
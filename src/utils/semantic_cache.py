@@ -0,0 +1,471 @@
+"""
+Local semantic cache for near-duplicate queries.
+
+Exact-match caching misses rephrased repeats ("where is my order 12345" vs
+"track order #12345"). `SemanticCache` embeds each query locally - hashed
+word and character n-grams, no model or network involved - and answers
+from the most similar earlier query above a cosine `threshold`. A small
+synonym map folds the common ways of asking the same thing ("where is",
+"track", "status of") into one word first, since hashed n-grams cannot see
+that they mean the same.
+
+Lookups are scoped: only entries with the same customer, `query_type` and
+identifiers (tokens containing digits, such as order numbers, plus the
+ticket's `order_id`) are compared, so "order 12345" can never be answered
+with the response for "order 67890" - nor can "where is my order?" asked
+about two different orders.
+
+Vectors live in a `VectorIndex`: fixed-width float16 rows plus scope and
+timestamp columns, kept as memory-mapped files when a directory is given,
+so an index of hundreds of thousands of entries opens instantly and is
+paged in on demand. Search is batched: queries are grouped by scope and
+each group is scored against its candidate rows with one matrix product.
+The index records a fingerprint of the embedder (its settings, stop words,
+synonyms and hashing scheme); an index written with a different one holds
+vectors that no longer compare with new queries, so it is discarded and
+refills as tickets are answered.
+
+Usage:
+    cache = SemanticCache("semantic_cache/", response_type=ResponseModel, threshold=0.8)
+    scope = dict(customer=ticket.email, query_type=ticket.query_type, order_id=ticket.order_id)
+    hit = cache.lookup(ticket.description, **scope)
+    if hit is None:
+        result = await agent.run(...)
+        cache.add(ticket.description, result.data, **scope)
+    print(cache.stats)
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+from utils.metrics import registry
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Filler words that make rephrasings look different without changing the question
+STOP_WORDS = frozenset(
+    "a an and any are as at be been by can could did do does for from has have i im in is it its like me my need of on "
+    "or our please s so that the there this to want was we what whats when who why will with would you your".split()
+)
+# Words asking the same thing, mapped to one canonical word before embedding
+SYNONYMS = {
+    **dict.fromkeys(["where", "track", "tracking", "tracked", "status", "locate", "whereabouts"], "track"),
+    **dict.fromkeys(["package", "parcel", "shipment", "delivery"], "order"),
+    **dict.fromkeys(["billed", "charged"], "charged"),
+}
+# Feature hashing scheme of `HashingEmbedder`; change it whenever the features or their hashing change
+HASHING = "crc32-mod-dim-signed-v1"
+# Rows scored per matrix product, bounding temporary memory for large scopes
+SEARCH_CHUNK_ROWS = 65_536
+# Rows appended since the scope index was last sorted; these are scanned linearly
+UNSORTED_TAIL_ROWS = 4096
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercased alphanumeric words ("#12345," -> "12345")."""
+    return _WORD.findall(text.lower())
+
+
+def _has_digit(word: str) -> bool:
+    return any(c.isdigit() for c in word)
+
+
+def identifiers(words: Sequence[str]) -> Tuple[str, ...]:
+    """Words containing digits (order numbers, invoice numbers), which must match exactly."""
+    return tuple(sorted({w.lstrip("0") or "0" for w in words if _has_digit(w)}))
+
+
+def content_words(words: Sequence[str]) -> List[str]:
+    """Words that carry the question, with synonyms folded: no stop words, no identifiers (those are matched by scope)."""
+    return [SYNONYMS.get(w, w) for w in words if w not in STOP_WORDS and not _has_digit(w)]
+
+
+class HashingEmbedder:
+    """Hashed word unigram/bigram and character n-gram vectors, L2-normalized.
+
+    The vectors are lexical: rewordings that share words or word stems score
+    high, synonyms only when `SYNONYMS` folds them. Hashing is stable across
+    processes (CRC32), so persisted vectors stay valid.
+
+    Args:
+        dim: Vector width.
+        char_ngrams: Range of character n-gram lengths, taken within words.
+        word_weight: Weight of word features relative to character n-grams.
+    """
+
+    def __init__(self, dim: int = 512, char_ngrams: Tuple[int, int] = (3, 5), word_weight: float = 2.0):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.word_weight = word_weight
+
+    def config(self) -> Dict[str, Any]:
+        return {"dim": self.dim, "char_ngrams": list(self.char_ngrams), "word_weight": self.word_weight}
+
+    def fingerprint(self) -> str:
+        """Digest of everything that decides a text's vector: settings, tokenizer, stop words, synonyms, hashing."""
+        spec = {
+            **self.config(),
+            "hashing": HASHING,
+            "word": _WORD.pattern,
+            "stop_words": sorted(STOP_WORDS),
+            "synonyms": sorted(SYNONYMS.items()),
+        }
+        return hashlib.blake2b(json.dumps(spec, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+    def _features(self, words: Sequence[str]):
+        for word in words:
+            yield f"w:{word}", self.word_weight
+        for first, second in zip(words, words[1:]):
+            yield f"b:{first} {second}", self.word_weight
+        low, high = self.char_ngrams
+        for word in words:
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n], 1.0
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_words(content_words(normalize(text)))
+
+    def embed_words(self, words: Sequence[str]) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(words):
+            h = zlib.crc32(feature.encode())
+            # The top bit picks the sign so colliding features tend to cancel out
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def scope_id(customer: Optional[str], query_type: Optional[str], ids: Sequence[str] = ()) -> int:
+    """Stable 64-bit id for a lookup scope."""
+    key = "\0".join([customer or "", query_type or "", *ids]).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little", signed=True)
+
+
+class VectorIndex:
+    """Append-only float16 vector rows with a scope id and creation time per row.
+
+    On disk, each column is a headerless `<name>.bin` file of native-endian
+    rows (shape and row count are in meta.json), memory-mapped with `np.memmap`.
+
+    Args:
+        dim: Vector width.
+        path: Directory for the memory-mapped columns and payload file, or None for memory only.
+        capacity: Initial number of rows; the columns double when full.
+        fingerprint: Identifies how the vectors were made; an index on disk with
+            another fingerprint is discarded and starts empty (`rebuilt` is set).
+    """
+
+    def __init__(self, dim: int, path: Optional[str] = None, capacity: int = 1024, fingerprint: Optional[str] = None):
+        self.dim = dim
+        self.path = path
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.rebuilt = False
+        self._payloads: List[bytes] = []
+        self._payload_file = None
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            meta = self._read_meta()
+            if meta is not None and fingerprint is not None and meta.get("fingerprint") != fingerprint:
+                self._remove_files()
+                self.rebuilt = True
+            elif meta is not None:
+                if meta["dim"] != dim:
+                    raise ValueError(f"{path} holds {meta['dim']}-d vectors, not {dim}-d")
+                self.count = meta["count"]
+            self._payload_file = open(os.path.join(path, "payloads.bin"), "a+b")
+        self._allocate(max(capacity, self.count, 1))
+        self._sort_scopes()
+        if self.rebuilt:
+            self.flush()
+
+    def _columns(self) -> List[Tuple[str, Any, Tuple[int, ...]]]:
+        return [
+            ("vectors", np.float16, (self.dim,)),
+            ("scopes", np.int64, ()),
+            ("created", np.float64, ()),
+            ("offsets", np.int64, (2,)),  # payload start and length
+        ]
+
+    def _allocate(self, capacity: int) -> None:
+        for name, dtype, width in self._columns():
+            shape = (capacity, *width)
+            if self.path is None:
+                column = np.zeros(shape, dtype=dtype)
+                old = getattr(self, name, None)
+                if old is not None:
+                    column[:self.count] = old[:self.count]
+            else:
+                file = os.path.join(self.path, f"{name}.bin")
+                size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+                with open(file, "ab") as f:
+                    if f.tell() < size:
+                        f.truncate(size)
+                column = np.memmap(file, dtype=dtype, mode="r+", shape=shape)
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path, "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _remove_files(self) -> None:
+        # Columns were once written as "<name>.npy"; remove those too
+        names = [f"{name}{ext}" for name, _, _ in self._columns() for ext in (".bin", ".npy")]
+        for name in [*names, "payloads.bin", "meta.json"]:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+
+    def _sort_scopes(self) -> None:
+        """Row ids ordered by scope, so a scope's rows are found by binary search."""
+        self._sorted_rows = np.argsort(self.scopes[:self.count], kind="stable")
+        self._sorted_scopes = self.scopes[:self.count][self._sorted_rows]
+
+    def _scope_rows(self, scope: int) -> np.ndarray:
+        sorted_count = len(self._sorted_rows)
+        left = np.searchsorted(self._sorted_scopes, scope, "left")
+        right = np.searchsorted(self._sorted_scopes, scope, "right")
+        tail = np.flatnonzero(self.scopes[sorted_count:self.count] == scope) + sorted_count
+        return np.concatenate([self._sorted_rows[left:right], tail]) if tail.size else self._sorted_rows[left:right]
+
+    def flush(self, extra: Optional[Dict[str, Any]] = None, sync: bool = True) -> None:
+        """Write the row count to disk (no-op in memory).
+
+        With `sync`, the mapped columns are written back first; otherwise the
+        kernel writes them back on its own schedule.
+        """
+        if self.path is None:
+            return
+        if sync:
+            for name, _, _ in self._columns():
+                getattr(self, name).flush()
+        self._payload_file.flush()
+        meta = {"dim": self.dim, "count": self.count, "fingerprint": self.fingerprint, **(extra or {})}
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def add(self, vectors: np.ndarray, scopes: Sequence[int], payloads: Sequence[bytes]) -> None:
+        n = len(payloads)
+        if self.count + n > self.capacity:
+            capacity = self.capacity
+            while capacity < self.count + n:
+                capacity *= 2
+            self._allocate(capacity)
+        rows = slice(self.count, self.count + n)
+        self.vectors[rows] = vectors
+        self.scopes[rows] = scopes
+        self.created[rows] = time.time()
+        if self._payload_file is None:
+            self._payloads.extend(payloads)
+        else:
+            self._payload_file.seek(0, os.SEEK_END)
+            start = self._payload_file.tell()
+            for i, payload in enumerate(payloads):
+                self.offsets[self.count + i] = (start, len(payload))
+                start += len(payload)
+            self._payload_file.write(b"".join(payloads))
+        self.count += n
+        if self.count - len(self._sorted_rows) > UNSORTED_TAIL_ROWS:
+            self._sort_scopes()
+
+    def payload(self, row: int) -> bytes:
+        if self._payload_file is None:
+            return self._payloads[row]
+        start, length = self.offsets[row]
+        self._payload_file.flush()
+        return os.pread(self._payload_file.fileno(), int(length), int(start))
+
+    def search(
+        self, vectors: np.ndarray, scopes: Sequence[int], not_before: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Best row and cosine similarity for each query vector, within its scope (-1 when none)."""
+        best_rows = np.full(len(vectors), -1, dtype=np.int64)
+        best_sims = np.full(len(vectors), -np.inf, dtype=np.float32)
+        scopes = np.asarray(scopes, dtype=np.int64)
+        for scope in np.unique(scopes):
+            rows = self._scope_rows(scope)
+            if not_before is not None and rows.size:
+                rows = rows[self.created[rows] >= not_before]
+            if not rows.size:
+                continue
+            queries = np.flatnonzero(scopes == scope)
+            q = vectors[queries].T
+            for start in range(0, rows.size, SEARCH_CHUNK_ROWS):
+                chunk = rows[start:start + SEARCH_CHUNK_ROWS]
+                sims = self.vectors[chunk].astype(np.float32) @ q  # (rows, queries)
+                best = sims.argmax(axis=0)
+                top = sims[best, np.arange(len(queries))]
+                better = top > best_sims[queries]
+                best_rows[queries[better]] = chunk[best[better]]
+                best_sims[queries[better]] = top[better]
+        return best_rows, best_sims
+
+    def close(self) -> None:
+        if self._payload_file is not None:
+            self._payload_file.close()
+            self._payload_file = None
+
+
+@dataclasses.dataclass
+class SemanticHit:
+    response: Any
+    similarity: float
+    cached_query: str
+
+
+@dataclasses.dataclass
+class SemanticCacheStats:
+    hits: int = 0
+    misses: int = 0
+    entries: int = 0
+    lookup_s: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        lookups = self.hits + self.misses
+        mean_us = self.lookup_s / lookups * 1e6 if lookups else 0.0
+        return (
+            f"semantic cache hits={self.hits} misses={self.misses} hit_rate={self.hit_rate:.1%} "
+            f"entries={self.entries} mean_lookup={mean_us:.0f}us"
+        )
+
+
+class SemanticCache:
+    """Answer near-duplicate queries from earlier responses.
+
+    Args:
+        path: Directory for the memory-mapped index, or None for memory only.
+        response_type: Pydantic model the responses are stored as (e.g. `ResponseModel`);
+            without one, responses must be JSON-serializable.
+        threshold: Minimum cosine similarity for a hit. Keep it high: a wrong hit answers a
+            different question. At 0.8, rephrasings such as "where is my order 12345" and
+            "track order #12345" (1.0 with the synonym map) hit, while different questions
+            about the same order ("return order 12345", 0.44) miss; see
+            `python -m benchmarks.semantic_cache` for the numbers on your own phrasings.
+        ttl: Seconds an entry stays valid (order statuses go stale), or None.
+        embedder: Defaults to a 512-d `HashingEmbedder`.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        response_type: Optional[Type[BaseModel]] = None,
+        threshold: float = 0.8,
+        ttl: Optional[float] = None,
+        embedder: Optional[HashingEmbedder] = None,
+    ):
+        self.response_type = response_type
+        self.threshold = threshold
+        self.ttl = ttl
+        self.embedder = embedder or HashingEmbedder()
+        self.index = VectorIndex(self.embedder.dim, path, fingerprint=self.embedder.fingerprint())
+        self.stats = SemanticCacheStats(entries=self.index.count)
+        self._lock = threading.Lock()
+        registry.add_collector("semantic_cache", self.collect, path=path or ":memory:")
+
+    def _prepare(
+        self, query: str, customer: Optional[str], query_type: Optional[str], order_id: Optional[str] = None
+    ) -> Tuple[np.ndarray, int]:
+        words = normalize(query)
+        ids = identifiers(words + normalize(order_id or ""))
+        return self.embedder.embed_words(content_words(words)), scope_id(customer, query_type, ids)
+
+    def lookup_many(self, queries: Sequence[Tuple[Optional[str], ...]]) -> List[Optional[SemanticHit]]:
+        """Look up `(query, customer, query_type[, order_id])` tuples in one batched search."""
+        if not queries:
+            return []
+        start = time.perf_counter()
+        prepared = [self._prepare(*q) for q in queries]
+        vectors = np.stack([vector for vector, _ in prepared])
+        not_before = time.time() - self.ttl if self.ttl is not None else None
+        with self._lock:
+            rows, sims = self.index.search(vectors, [scope for _, scope in prepared], not_before)
+            hits: List[Optional[SemanticHit]] = []
+            for row, similarity in zip(rows, sims):
+                if row < 0 or similarity < self.threshold:
+                    hits.append(None)
+                    continue
+                record = json.loads(self.index.payload(int(row)))
+                response = record["response"]
+                if self.response_type is not None:
+                    response = self.response_type.model_validate(response)
+                hits.append(SemanticHit(response, float(similarity), record["query"]))
+            found = sum(hit is not None for hit in hits)
+            self.stats.hits += found
+            self.stats.misses += len(hits) - found
+            self.stats.lookup_s += time.perf_counter() - start
+        return hits
+
+    def lookup(
+        self,
+        query: str,
+        *,
+        customer: Optional[str] = None,
+        query_type: Optional[str] = None,
+        order_id: Optional[str] = None,
+    ) -> Optional[SemanticHit]:
+        return self.lookup_many([(query, customer, query_type, order_id)])[0]
+
+    def add_many(self, entries: Sequence[Tuple[Any, ...]]) -> None:
+        """Store `(query, response, customer, query_type[, order_id])` entries."""
+        if not entries:
+            return
+        prepared = [self._prepare(query, customer, query_type, *order_id)
+                    for query, _, customer, query_type, *order_id in entries]
+        payloads = [
+            json.dumps({
+                "query": entry[0],
+                "response": entry[1].model_dump(mode="json") if isinstance(entry[1], BaseModel) else entry[1],
+            }).encode()
+            for entry in entries
+        ]
+        with self._lock:
+            self.index.add(np.stack([v for v, _ in prepared]), [s for _, s in prepared], payloads)
+            self.index.flush({"embedder": self.embedder.config()}, sync=False)
+            self.stats.entries = self.index.count
+
+    def add(
+        self,
+        query: str,
+        response: Any,
+        *,
+        customer: Optional[str] = None,
+        query_type: Optional[str] = None,
+        order_id: Optional[str] = None,
+    ) -> None:
+        self.add_many([(query, response, customer, query_type, order_id)])
+
+    def collect(self) -> Dict[str, float]:
+        return {
+            "hits_total": self.stats.hits,
+            "misses_total": self.stats.misses,
+            "entries": self.stats.entries,
+            "lookup_seconds_total": self.stats.lookup_s,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self.index.flush({"embedder": self.embedder.config()})
+            self.index.close()
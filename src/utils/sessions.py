@@ -0,0 +1,232 @@
+"""
+Persistent per-customer conversation sessions.
+
+Holding `result.new_messages()` in a local variable loses the conversation
+when the process exits and ties a customer to one process. `SessionStore`
+keeps each customer's message history in SQLite, keyed by
+`CustomerDetails.customer_id`:
+
+- Every run appends its new messages as one row - JSON from the framework's
+  `ModelMessagesTypeAdapter`, zlib-compressed with a preset dictionary of
+  the message format's keys, so even a short turn compresses well. Earlier
+  turns are never rewritten.
+- Rows are clustered by customer (a `WITHOUT ROWID` table on
+  `(customer_id, seq)`), so loading a session is one range scan.
+- Decoded histories of recently used sessions stay in an in-memory LRU.
+  A load still asks SQLite for turns newer than the cached ones, which is
+  a single index probe when there are none, so several processes can share
+  one file without serving stale sessions.
+
+Loaded histories are the full conversation; compact them for the prompt
+with `utils.history.HistoryManager`.
+
+Usage:
+    sessions = SessionStore("sessions.sqlite")
+    history = sessions.load(customer.customer_id)
+    result = await agent.run(prompt, deps=deps, message_history=history)
+    sessions.append(customer.customer_id, result.new_messages())
+    print(sessions.stats)
+"""
+
+import dataclasses
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelRequest, SystemPromptPart
+
+from utils.metrics import registry
+
+# Preset dictionary for zlib: fragments that recur in every serialized turn.
+# Part of the on-disk format - rows written with it can only be read with it.
+ZDICT = (
+    b'"dynamic_ref":null,"part_kind":"system-prompt"},{"content":"Customer details: ## CUSTOMER_ID\\n'
+    b'"part_kind":"retry-prompt"},{"tool_name":"get_shipping_info","args":{},'
+    b'{"parts":[{"tool_name":"final_result","args":{"response":"","needs_escalation":false,'
+    b'"follow_up_required":false,"sentiment":""},"tool_call_id":"call_","part_kind":"tool-call"}],'
+    b'"model_name":"gpt-4o","timestamp":"2025-01-01T00:00:00.000000Z","kind":"response"},'
+    b'{"parts":[{"tool_name":"final_result","content":"Final result processed.","tool_call_id":"pyd_ai_",'
+    b'"timestamp":"2025-01-01T00:00:00.000000Z","part_kind":"tool-return"}],"kind":"request"}]'
+    b'[{"parts":[{"content":"","timestamp":"2025-01-01T00:00:00.000000Z","part_kind":"user-prompt"}],'
+    b'"kind":"request"},'
+)
+FORMAT_VERSION = 1
+
+
+def compress_turn(raw: bytes, level: int = 6) -> bytes:
+    """Compress one turn's serialized messages with the preset dictionary."""
+    compressor = zlib.compressobj(level, zdict=ZDICT)
+    return compressor.compress(raw) + compressor.flush()
+
+
+def decode_turn(data: bytes) -> List[ModelMessage]:
+    """The messages of one stored turn."""
+    decompressor = zlib.decompressobj(zdict=ZDICT)
+    return ModelMessagesTypeAdapter.validate_json(decompressor.decompress(data) + decompressor.flush())
+
+
+def _copy_request(message: ModelRequest) -> ModelRequest:
+    if any(isinstance(p, SystemPromptPart) for p in message.parts):
+        return dataclasses.replace(message, parts=list(message.parts))
+    return message
+
+
+@dataclasses.dataclass
+class SessionStats:
+    loads: int = 0
+    memory_hits: int = 0  # loads answered from the LRU without decoding any row
+    rows_read: int = 0
+    appends: int = 0
+    bytes_written: int = 0
+    raw_bytes_written: int = 0  # the same turns as uncompressed JSON
+    load_s: float = 0.0
+    append_s: float = 0.0
+
+    @property
+    def bytes_per_turn(self) -> float:
+        return self.bytes_written / self.appends if self.appends else 0.0
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.raw_bytes_written / self.bytes_written if self.bytes_written else 0.0
+
+    def __str__(self):
+        mean_load = self.load_s / self.loads * 1000 if self.loads else 0.0
+        mean_append = self.append_s / self.appends * 1000 if self.appends else 0.0
+        return (
+            f"sessions: {self.loads} loads ({self.memory_hits} from memory, {self.rows_read} rows read, "
+            f"mean {mean_load:.3f}ms), {self.appends} appends (mean {mean_append:.3f}ms, "
+            f"{self.bytes_per_turn:.0f} bytes/turn, {self.compression_ratio:.1f}x compression)"
+        )
+
+
+class SessionStore:
+    """Append-only message histories per customer, in SQLite with an in-memory LRU.
+
+    Args:
+        path: SQLite file shared by every process serving the customers (None = memory only).
+        max_memory_sessions: Decoded sessions kept in memory.
+        compression_level: zlib level for new turns.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_sessions: int = 1024, compression_level: int = 6):
+        self.path = path
+        self.max_memory_sessions = max_memory_sessions
+        self.compression_level = compression_level
+        self.stats = SessionStats()
+        # customer_id -> (last seq included, messages)
+        self._memory: "OrderedDict[str, Tuple[int, List[ModelMessage]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        if path is not None:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "customer_id TEXT NOT NULL, seq INTEGER NOT NULL, created REAL NOT NULL, data BLOB NOT NULL, "
+            "PRIMARY KEY (customer_id, seq)) WITHOUT ROWID"
+        )
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, FORMAT_VERSION):
+            raise ValueError(f"{path} holds sessions in format {version}, expected {FORMAT_VERSION}")
+        self._db.execute(f"PRAGMA user_version = {FORMAT_VERSION}")
+        self._db.commit()
+        registry.add_collector("sessions", self.collect, path=path or ":memory:")
+
+    def load(self, customer_id: str) -> List[ModelMessage]:
+        """The customer's whole conversation so far (empty for a new customer)."""
+        start = time.perf_counter()
+        with self._lock:
+            seq, messages = self._memory.get(customer_id, (0, []))
+            rows = self._db.execute(
+                "SELECT seq, data FROM turns WHERE customer_id = ? AND seq > ? ORDER BY seq", (customer_id, seq)
+            ).fetchall()
+            if rows:
+                messages = messages + [m for _, data in rows for m in decode_turn(data)]
+                seq = rows[-1][0]
+            elif customer_id in self._memory:
+                self.stats.memory_hits += 1
+            # Remembered even when empty, so the first append starts the cached history
+            self._remember(customer_id, seq, messages)
+            self.stats.loads += 1
+            self.stats.rows_read += len(rows)
+            self.stats.load_s += time.perf_counter() - start
+            # A copy: callers may extend it, and the agent re-renders dynamic system
+            # prompts in place in the request that holds them; the cache must not change
+            return [_copy_request(m) if isinstance(m, ModelRequest) else m for m in messages]
+
+    def append(self, customer_id: str, messages: Sequence[ModelMessage]) -> None:
+        """Add one run's new messages (e.g. `result.new_messages()`) to the session."""
+        if not messages:
+            return
+        start = time.perf_counter()
+        raw = ModelMessagesTypeAdapter.dump_json(list(messages))
+        data = compress_turn(raw, self.compression_level)
+        with self._lock:
+            seq = self._db.execute(
+                "INSERT INTO turns (customer_id, seq, created, data) "
+                "SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ? FROM turns WHERE customer_id = ? RETURNING seq",
+                (customer_id, time.time(), data, customer_id),
+            ).fetchone()[0]
+            self._db.commit()
+            cached = self._memory.get(customer_id)
+            if cached is not None and cached[0] == seq - 1:
+                self._remember(customer_id, seq, cached[1] + list(messages))
+            elif cached is not None:
+                # Another process appended in between; the next load catches up from disk
+                del self._memory[customer_id]
+            self.stats.appends += 1
+            self.stats.bytes_written += len(data)
+            self.stats.raw_bytes_written += len(raw)
+            self.stats.append_s += time.perf_counter() - start
+
+    def _remember(self, customer_id: str, seq: int, messages: List[ModelMessage]) -> None:
+        self._memory[customer_id] = (seq, messages)
+        self._memory.move_to_end(customer_id)
+        while len(self._memory) > self.max_memory_sessions:
+            self._memory.popitem(last=False)
+
+    def turns(self, customer_id: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM turns WHERE customer_id = ?", (customer_id,)).fetchone()[0]
+
+    def delete(self, customer_id: str) -> None:
+        """Forget a customer's conversation."""
+        with self._lock:
+            self._memory.pop(customer_id, None)
+            self._db.execute("DELETE FROM turns WHERE customer_id = ?", (customer_id,))
+            self._db.commit()
+
+    def prune(self, max_age: float) -> int:
+        """Delete sessions idle for more than `max_age` seconds; returns the number of sessions removed."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            idle = [row[0] for row in self._db.execute(
+                "SELECT customer_id FROM turns GROUP BY customer_id HAVING MAX(created) < ?", (cutoff,)
+            )]
+            self._db.executemany("DELETE FROM turns WHERE customer_id = ?", ((c,) for c in idle))
+            self._db.commit()
+            for customer_id in idle:
+                self._memory.pop(customer_id, None)
+            return len(idle)
+
+    def collect(self) -> Dict[str, float]:
+        """Values exported by the metrics registry."""
+        stats = self.stats
+        return {
+            "loads_total": stats.loads,
+            "memory_hits_total": stats.memory_hits,
+            "appends_total": stats.appends,
+            "bytes_written_total": stats.bytes_written,
+            "load_seconds_total": stats.load_s,
+            "append_seconds_total": stats.append_s,
+            "sessions_in_memory": len(self._memory),
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
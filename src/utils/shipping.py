@@ -0,0 +1,318 @@
+"""
+Shipping-status stores used by the tool examples.
+
+Order IDs reach the tools in whatever form the model chose ("12345",
+"#12345", " #12345 "), so every store indexes a canonical form of the ID and
+resolves all variants locally. Without this, a format mismatch costs a full
+`ModelRetry` round-trip to the LLM; `LookupStats.retries_avoided` counts how
+many lookups only succeeded thanks to the canonical index.
+
+Three implementations share the same interface:
+- `InMemoryShippingStore`: a dict, fine for the examples and small datasets.
+- `SQLiteShippingStore`: an indexed SQLite table (memory-mapped reads), for
+  millions of rows without loading them into Python objects.
+- `RemoteShippingStore`: a simulated carrier API with one request per order,
+  for measuring what concurrent lookups buy.
+
+Async tools use `aget`/`aget_many`, which local stores answer inline and
+remote ones override to overlap their requests. `BatchingShippingStore`
+wraps any store DataLoader-style: lookups awaited by concurrent runs within
+a short window are deduplicated and sent to the wrapped store as one bulk
+query, and each caller gets its own rows back.
+"""
+
+import asyncio
+import dataclasses
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+
+def canonical_order_id(order_id: str) -> str:
+    """Normalize an order ID: drop whitespace and leading '#', uppercase."""
+    return "".join(str(order_id).split()).lstrip("#").upper()
+
+
+@dataclasses.dataclass
+class LookupStats:
+    """Counters for shipping lookups."""
+    lookups: int = 0
+    exact_hits: int = 0
+    retries_avoided: int = 0
+    misses: int = 0
+
+    def record(self, requested: str, stored_id: Optional[str]) -> None:
+        self.lookups += 1
+        if stored_id is None:
+            self.misses += 1
+        elif stored_id == requested:
+            self.exact_hits += 1
+        else:
+            self.retries_avoided += 1
+
+    def __str__(self) -> str:
+        return (
+            f"lookups={self.lookups} exact={self.exact_hits} "
+            f"retries_avoided={self.retries_avoided} misses={self.misses}"
+        )
+
+
+class ShippingStore:
+    """Base class: shipping status by order ID, resolved via the canonical ID."""
+
+    def __init__(self):
+        self.stats = LookupStats()
+
+    def _lookup(self, keys: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        """Map canonical keys to (stored order ID, status) for the keys that exist."""
+        raise NotImplementedError
+
+    def get(self, order_id: str) -> Optional[str]:
+        """Shipping status for `order_id`, or None when the order is unknown."""
+        return self.get_many([order_id]).get(order_id)
+
+    def get_many(self, order_ids: Iterable[str]) -> Dict[str, str]:
+        """Statuses for several order IDs, keyed by the IDs as requested."""
+        order_ids = list(order_ids)
+        return self._statuses(order_ids, self._lookup({canonical_order_id(o) for o in order_ids}))
+
+    def _statuses(self, order_ids: List[str], found: Mapping[str, Optional[Tuple[str, str]]]) -> Dict[str, str]:
+        """Map rows found by canonical key back onto the requested IDs, recording stats."""
+        statuses = {}
+        for order_id in order_ids:
+            row = found.get(canonical_order_id(order_id))
+            self.stats.record(order_id, row[0] if row else None)
+            if row is not None:
+                statuses[order_id] = row[1]
+        return statuses
+
+    async def aget(self, order_id: str) -> Optional[str]:
+        """`get` for async callers."""
+        return (await self.aget_many([order_id])).get(order_id)
+
+    async def aget_many(self, order_ids: Iterable[str]) -> Dict[str, str]:
+        """`get_many` for async callers; local stores answer without leaving the event loop."""
+        return self.get_many(order_ids)
+
+
+class InMemoryShippingStore(ShippingStore):
+    """Dict-backed store keyed by canonical order ID."""
+
+    def __init__(self, statuses: Optional[Mapping[str, str]] = None):
+        super().__init__()
+        self._rows: Dict[str, Tuple[str, str]] = {}
+        for order_id, status in (statuses or {}).items():
+            self.add(order_id, status)
+
+    def add(self, order_id: str, status: str) -> None:
+        self._rows[canonical_order_id(order_id)] = (order_id, status)
+
+    def _lookup(self, keys):
+        return {key: self._rows[key] for key in keys if key in self._rows}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class SQLiteShippingStore(ShippingStore):
+    """SQLite-backed store with a primary-key index on the canonical order ID.
+
+    Args:
+        path: Database file (":memory:" for a throwaway store).
+        mmap_size: Bytes of the database file to memory-map for reads.
+    """
+
+    # SQLite's default limit on host parameters in a single statement
+    MAX_PARAMS = 999
+
+    def __init__(self, path: str = ":memory:", mmap_size: int = 1 << 30):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS shipping ("
+            "order_key TEXT PRIMARY KEY, order_id TEXT NOT NULL, status TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_mapping(cls, statuses: Mapping[str, str], path: str = ":memory:") -> "SQLiteShippingStore":
+        store = cls(path)
+        store.load(statuses.items())
+        return store
+
+    def load(self, rows: Iterable[Tuple[str, str]]) -> None:
+        """Bulk insert (order_id, status) pairs; `rows` may be a lazy iterator."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO shipping (order_key, order_id, status) VALUES (?, ?, ?)",
+                ((canonical_order_id(order_id), order_id, status) for order_id, status in rows),
+            )
+            self._db.commit()
+
+    def _lookup(self, keys):
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), self.MAX_PARAMS):
+                chunk = keys[start:start + self.MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                for key, order_id, status in self._db.execute(
+                    f"SELECT order_key, order_id, status FROM shipping WHERE order_key IN ({placeholders})",
+                    chunk,
+                ):
+                    found[key] = (order_id, status)
+        return found
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM shipping").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class RemoteShippingStore(ShippingStore):
+    """Simulated carrier API: one request per order, each taking `latency` seconds.
+
+    Synchronous lookups make the requests one after another; `aget_many`
+    keeps up to `concurrency` of them in flight.
+    """
+
+    def __init__(self, statuses: Optional[Mapping[str, str]] = None, latency: float = 0.02, concurrency: int = 32):
+        super().__init__()
+        self.latency = latency
+        self.concurrency = concurrency
+        self.requests = 0
+        self._rows = InMemoryShippingStore(statuses)._rows
+
+    def _lookup(self, keys):
+        found = {}
+        for key in keys:
+            time.sleep(self.latency)
+            self.requests += 1
+            if key in self._rows:
+                found[key] = self._rows[key]
+        return found
+
+    async def _fetch(self, key: str, slots: asyncio.Semaphore) -> Optional[Tuple[str, str]]:
+        async with slots:
+            await asyncio.sleep(self.latency)
+            self.requests += 1
+            return self._rows.get(key)
+
+    async def aget_many(self, order_ids: Iterable[str]) -> Dict[str, str]:
+        order_ids = list(order_ids)
+        keys: List[str] = list(dict.fromkeys(canonical_order_id(o) for o in order_ids))
+        slots = asyncio.Semaphore(self.concurrency)
+        rows = dict(zip(keys, await asyncio.gather(*(self._fetch(key, slots) for key in keys))))
+        return self._statuses(order_ids, rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+@dataclasses.dataclass
+class BatchStats:
+    """Counters for lookups coalesced by `BatchingShippingStore`."""
+    calls: int = 0  # aget/aget_many calls
+    keys_requested: int = 0  # canonical keys asked for, before deduplication
+    keys_fetched: int = 0  # keys sent to the backend
+    batches: int = 0  # bulk queries sent to the backend
+
+    @property
+    def mean_batch(self) -> float:
+        return self.keys_fetched / self.batches if self.batches else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"calls={self.calls} keys={self.keys_requested} fetched={self.keys_fetched} "
+            f"batches={self.batches} mean_batch={self.mean_batch:.1f}"
+        )
+
+
+class BatchingShippingStore(ShippingStore):
+    """Coalesce concurrent async lookups into bulk queries on `store`.
+
+    Keys requested while a batch is open are collected and deduplicated; the
+    batch is sent `window` seconds after it opened (0: at the end of the
+    current event-loop tick) or as soon as it holds `max_batch` keys.
+    Synchronous lookups bypass the batching.
+
+    Args:
+        store: Backend answering the bulk queries (its `_lookup`).
+        window: Seconds to wait for more keys before querying.
+        max_batch: Keys per bulk query.
+        threaded: Run the backend query in a worker thread, for blocking backends.
+    """
+
+    def __init__(self, store: ShippingStore, window: float = 0.002, max_batch: int = 1000, threaded: bool = True):
+        super().__init__()
+        self.store = store
+        self.window = window
+        self.max_batch = max_batch
+        self.threaded = threaded
+        self.batch_stats = BatchStats()
+        self._queue: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.Handle] = None
+        # Bulk queries in flight; the event loop only keeps weak references to tasks
+        self._fetches: Set[asyncio.Task] = set()
+
+    def _lookup(self, keys):
+        return self.store._lookup(keys)
+
+    async def aget_many(self, order_ids: Iterable[str]) -> Dict[str, str]:
+        order_ids = list(order_ids)
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for key in dict.fromkeys(canonical_order_id(o) for o in order_ids):
+            futures[key] = loop.create_future()
+            self._queue.setdefault(key, []).append(futures[key])
+        self.batch_stats.calls += 1
+        self.batch_stats.keys_requested += len(futures)
+        if len(self._queue) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch) if self.window else loop.call_soon(self._dispatch)
+        rows = {key: await future for key, future in futures.items()}
+        return self._statuses(order_ids, rows)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        queue, self._queue = self._queue, {}
+        if queue:
+            self.batch_stats.batches += 1
+            self.batch_stats.keys_fetched += len(queue)
+            task = asyncio.ensure_future(self._fetch(queue))
+            self._fetches.add(task)
+            task.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, queue: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            keys = list(queue)
+            found = await asyncio.to_thread(self.store._lookup, keys) if self.threaded else self.store._lookup(keys)
+        except BaseException as exc:
+            # Every waiter sees the failure (or the cancellation) instead of waiting forever
+            for waiters in queue.values():
+                for future in waiters:
+                    if future.done():
+                        continue
+                    if isinstance(exc, Exception):
+                        future.set_exception(exc)
+                    else:
+                        future.cancel()
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for key, waiters in queue.items():
+            for future in waiters:
+                if not future.done():
+                    future.set_result(found.get(key))
+
+    def __len__(self) -> int:
+        return len(self.store)
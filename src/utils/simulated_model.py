@@ -0,0 +1,94 @@
+"""
+Deterministic stand-in model for offline benchmarks.
+
+`SimulatedModel` behaves like a well-behaved LLM without any network: on the
+first request of a run it calls each function tool once, then returns the
+result tool (or text) with arguments generated from the JSON schema. Every
+request sleeps for a configurable latency and reports configurable token
+counts, so framework overhead can be separated from model time.
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models import Model
+from pydantic_ai.usage import Usage
+
+_SCHEMA_DEFAULTS = {"string": "ok", "boolean": False, "integer": 0, "number": 0.0, "array": [], "object": {}}
+
+
+def _default_for(prop: Dict[str, Any]) -> Any:
+    # Optional[X] arrives as anyOf [X, null]: use X
+    options = [option for option in prop.get("anyOf", [prop]) if option.get("type") != "null"]
+    return _SCHEMA_DEFAULTS.get(options[0].get("type") if options else None, "ok")
+
+
+def args_from_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Minimal valid arguments for an object JSON schema."""
+    properties = schema.get("properties", {})
+    return {name: _default_for(properties[name]) for name in schema.get("required", properties)}
+
+
+class SimulatedModel(Model):
+    """Model with fixed latency and token usage per request.
+
+    Args:
+        latency: Seconds each request takes.
+        request_tokens: Tokens reported for each request's prompt.
+        response_tokens: Tokens reported for each response.
+        tool_args: Arguments to use per function tool name instead of schema defaults.
+        text: Text returned when the agent accepts plain-text results.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        request_tokens: int = 200,
+        response_tokens: int = 50,
+        tool_args: Optional[Dict[str, Dict[str, Any]]] = None,
+        text: str = "Thanks for reaching out! Your order is on its way.",
+    ):
+        self.latency = latency
+        self.request_tokens = request_tokens
+        self.response_tokens = response_tokens
+        self.tool_args = tool_args or {}
+        self.text = text
+        self.requests = 0
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # pydantic-ai counts the request itself; reporting requests=1 here would count it twice
+        usage = Usage(
+            request_tokens=self.request_tokens,
+            response_tokens=self.response_tokens,
+            total_tokens=self.request_tokens + self.response_tokens,
+        )
+        return self._respond(messages, model_request_parameters), usage
+
+    def _respond(self, messages, params) -> ModelResponse:
+        tools_called = any(
+            isinstance(part, ToolReturnPart) for message in messages for part in getattr(message, "parts", [])
+        )
+        if params.function_tools and not tools_called:
+            return ModelResponse(parts=[
+                ToolCallPart(tool.name, self.tool_args.get(tool.name) or args_from_schema(tool.parameters_json_schema))
+                for tool in params.function_tools
+            ], model_name=self.model_name)
+        if params.result_tools:
+            tool = params.result_tools[0]
+            return ModelResponse(
+                parts=[ToolCallPart(tool.name, args_from_schema(tool.parameters_json_schema))],
+                model_name=self.model_name,
+            )
+        return ModelResponse(parts=[TextPart(self.text)], model_name=self.model_name)
+
+    @property
+    def model_name(self) -> str:
+        return f"simulated-{self.latency * 1000:.0f}ms"
+
+    @property
+    def system(self) -> str:
+        return "simulated"
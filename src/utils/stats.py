@@ -0,0 +1,85 @@
+"""
+Small helpers for reporting latency and throughput.
+"""
+
+import bisect
+import dataclasses
+import math
+from typing import Dict, List, Sequence, Tuple
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(latencies: Sequence[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and p50/p95/p99 latency for a set of completed requests."""
+    return {
+        "count": len(latencies),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "p99_s": percentile(latencies, 99),
+        "max_s": max(latencies, default=0.0),
+    }
+
+
+def format_summary(summary: Dict[str, float]) -> str:
+    """Render a latency summary as a single human-readable line."""
+    return (
+        f"{summary['count']} requests in {summary['elapsed_s']:.2f}s "
+        f"({summary['throughput_rps']:.2f} req/s) | "
+        f"p50 {summary['p50_s'] * 1000:.0f}ms "
+        f"p95 {summary['p95_s'] * 1000:.0f}ms "
+        f"p99 {summary['p99_s'] * 1000:.0f}ms"
+    )
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclasses.dataclass
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (seconds), Prometheus style."""
+    buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    counts: List[int] = dataclasses.field(default_factory=list)  # per bucket, plus +Inf
+    count: int = 0
+    sum_s: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum_s += seconds
+
+    @property
+    def mean_s(self) -> float:
+        return self.sum_s / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self) -> Dict[str, int]:
+        """Cumulative counts keyed by upper bound, as in a Prometheus `le` label."""
+        result, seen = {}, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            result["+Inf" if bound == float("inf") else f"{bound:g}"] = seen
+        return result
@@ -0,0 +1,144 @@
+"""
+Streaming structured responses with partial validation.
+
+`agent.run_stream` delivers the result tool's JSON arguments as they are
+generated. Until the JSON is complete, required fields of `ResponseModel`
+are missing, so each snapshot is validated against a derived "partial"
+model in which every field is optional: the `response` text grows and the
+flags appear as soon as the model has written them. The final snapshot is
+validated against the real result type.
+
+Usage:
+    async for snapshot in iter_partial_responses(agent, prompt, deps=deps):
+        print(snapshot.data.response)
+
+    data, timings = await stream_structured_response(agent, prompt, on_partial=print)
+    print(timings)
+"""
+
+import asyncio
+import dataclasses
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Optional, Tuple, Type
+
+import pydantic_core
+from pydantic import BaseModel, ValidationError, create_model
+from pydantic_ai import Agent
+from pydantic_ai.messages import ToolCallPart
+
+
+@lru_cache(maxsize=None)
+def partial_model(model_cls: Type[BaseModel]) -> Type[BaseModel]:
+    """A copy of `model_cls` where every field is optional and defaults to None."""
+    fields = {name: (Optional[field.annotation], None) for name, field in model_cls.model_fields.items()}
+    return create_model(f"Partial{model_cls.__name__}", __doc__=model_cls.__doc__, **fields)
+
+
+@dataclasses.dataclass
+class StreamSnapshot:
+    """A partially (or, when `final`, fully) validated result."""
+    data: Any
+    final: bool
+    elapsed_s: float
+    result: Any = None  # the StreamedRunResult (final snapshot only), for usage and messages
+
+
+@dataclasses.dataclass
+class StreamTimings:
+    """Latency profile of a streamed run."""
+    first_token_s: Optional[float] = None
+    complete_s: Optional[float] = None
+    snapshots: int = 0
+    result: Any = dataclasses.field(default=None, repr=False)  # StreamedRunResult of the run
+
+    def __str__(self) -> str:
+        first = f"{self.first_token_s:.2f}s" if self.first_token_s is not None else "n/a"
+        complete = f"{self.complete_s:.2f}s" if self.complete_s is not None else "n/a"
+        return f"time to first token: {first}, time to complete: {complete} ({self.snapshots} snapshots)"
+
+
+def _result_args(message, result_tool_name: str) -> Optional[dict]:
+    """Parse the (possibly incomplete) JSON arguments of the result tool call."""
+    for part in reversed(message.parts):
+        if isinstance(part, ToolCallPart) and part.tool_name == result_tool_name:
+            if isinstance(part.args, dict):
+                return part.args
+            try:
+                parsed = pydantic_core.from_json(part.args or "{}", allow_partial="trailing-strings")
+            except ValueError:
+                return None
+            return parsed if isinstance(parsed, dict) else None
+    return None
+
+
+async def iter_partial_responses(
+    agent: Agent,
+    user_prompt: str,
+    *,
+    debounce_by: Optional[float] = 0.05,
+    result_tool_name: str = "final_result",
+    **kwargs,
+) -> AsyncIterator[StreamSnapshot]:
+    """Yield partial result snapshots as the agent streams its structured response.
+
+    Intermediate snapshots hold an instance of `partial_model(agent.result_type)`;
+    the last one (`final=True`) holds the fully validated result.
+    `result_tool_name` must match the agent's (pydantic-ai's default is used here).
+    """
+    partial_cls = None
+    if isinstance(agent.result_type, type) and issubclass(agent.result_type, BaseModel):
+        partial_cls = partial_model(agent.result_type)
+
+    previous = None
+    start = time.perf_counter()
+    async with agent.run_stream(user_prompt, **kwargs) as result:
+        async for message, last in result.stream_structured(debounce_by=debounce_by):
+            if last:
+                data = await result.validate_structured_result(message)
+                yield StreamSnapshot(data=data, final=True, elapsed_s=time.perf_counter() - start, result=result)
+                continue
+            if partial_cls is None:
+                continue
+            args = _result_args(message, result_tool_name)
+            if not args:
+                continue
+            try:
+                snapshot = partial_cls.model_validate(args)
+            except ValidationError:
+                continue
+            if snapshot == previous:
+                continue
+            previous = snapshot
+            yield StreamSnapshot(data=snapshot, final=False, elapsed_s=time.perf_counter() - start)
+
+
+async def stream_structured_response(
+    agent: Agent,
+    user_prompt: str,
+    *,
+    on_partial: Optional[Callable[[StreamSnapshot], Any]] = None,
+    **kwargs,
+) -> Tuple[Any, StreamTimings]:
+    """Stream a run to `on_partial` (sync or async) and return `(result, timings)`."""
+    timings = StreamTimings()
+    data = None
+    async for snapshot in iter_partial_responses(agent, user_prompt, **kwargs):
+        timings.snapshots += 1
+        if timings.first_token_s is None:
+            timings.first_token_s = snapshot.elapsed_s
+        if snapshot.final:
+            timings.complete_s = snapshot.elapsed_s
+            timings.result = snapshot.result
+            data = snapshot.data
+        if on_partial is not None:
+            outcome = on_partial(snapshot)
+            if asyncio.iscoroutine(outcome):
+                await outcome
+    return data, timings
+
+
+def print_snapshot(snapshot: StreamSnapshot) -> None:
+    """`on_partial` callback that redraws the growing `response` text in place."""
+    text = getattr(snapshot.data, "response", None) or ""
+    print(f"\r{text}", end="\n" if snapshot.final else "", flush=True)
@@ -0,0 +1,162 @@
+"""
+Support ticket schema and streaming loaders.
+
+Tickets come from a directory of JSON files (like data/), a JSON file with
+one ticket or a list of them, or a JSONL feed (optionally gzipped). JSONL is
+read incrementally and validated `batch_size` lines at a time with a single
+call into pydantic-core through a precompiled `TypeAdapter`, so memory stays
+flat however large the feed is. Small batches (about 100 lines) are fastest:
+larger ones keep more objects alive for the garbage collector to traverse. When a batch fails validation it is
+re-validated line by line, so bad lines can be reported or skipped by line
+number.
+
+Usage:
+    for ticket in iter_tickets("tickets.jsonl"):
+        ...
+
+    stats = IngestStats()
+    for batch in iter_ticket_batches("tickets.jsonl.gz", errors="skip", stats=stats):
+        ...
+    print(stats)
+"""
+
+import dataclasses
+import gzip
+import json
+from itertools import islice
+from pathlib import Path
+from typing import IO, Iterator, List, Optional
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+
+class Ticket(BaseModel):
+    """Structure for an incoming support ticket."""
+    ticket_id: str
+    customer_name: str
+    email: str
+    query_type: str
+    description: str
+    order_id: Optional[str] = None
+
+
+# Built once: validators are compiled when the adapter is created
+TICKET_ADAPTER = TypeAdapter(Ticket)
+TICKET_LIST_ADAPTER = TypeAdapter(List[Ticket])
+
+
+class TicketError(ValueError):
+    """A ticket that failed validation, with where it came from."""
+
+
+@dataclasses.dataclass
+class IngestStats:
+    lines: int = 0
+    bytes: int = 0
+    tickets: int = 0
+    invalid: int = 0
+
+    def __str__(self):
+        lines = f" from {self.lines} lines" if self.lines else ""
+        return f"{self.tickets} tickets{lines} ({self.bytes / 1e6:.1f} MB), {self.invalid} invalid"
+
+
+def _open(path: Path) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.suffix == ".gz" else path.open("rb")
+
+
+def _validate_batch(lines: List[bytes], first_line: int, source: str, errors: str, stats: IngestStats) -> List[Ticket]:
+    """Validate raw JSON lines as one JSON array; fall back to line by line to locate failures."""
+    try:
+        # Line breaks are JSON whitespace, so the lines can be joined as they are
+        tickets = TICKET_LIST_ADAPTER.validate_json(b"[" + b",".join(lines) + b"]")
+        # A malformed line such as `{...},{...}` would otherwise pass as two tickets
+        if len(tickets) != len(lines):
+            raise TicketError("line count mismatch")
+    except (ValidationError, TicketError):
+        tickets = []
+        for number, line in enumerate(lines, first_line):
+            if not line.strip():
+                continue
+            try:
+                tickets.append(TICKET_ADAPTER.validate_json(line))
+            except ValidationError as exc:
+                stats.invalid += 1
+                if errors == "raise":
+                    raise TicketError(f"{source}:{number}: {exc}") from exc
+    stats.tickets += len(tickets)
+    return tickets
+
+
+def _jsonl_batches(path: Path, batch_size: int, errors: str, stats: IngestStats) -> Iterator[List[Ticket]]:
+    with _open(path) as f:
+        first_line = 1
+        while True:
+            lines = list(islice(f, batch_size))
+            if not lines:
+                break
+            stats.lines += len(lines)
+            stats.bytes += sum(map(len, lines))
+            yield _validate_batch(lines, first_line, str(path), errors, stats)
+            first_line += len(lines)
+
+
+def _json_file_tickets(path: Path, errors: str, stats: IngestStats) -> List[Ticket]:
+    """Tickets from a JSON file holding one ticket or a list of them."""
+    data = path.read_bytes()
+    stats.bytes += len(data)
+    try:
+        parsed = json.loads(data)
+        if isinstance(parsed, list):
+            tickets = TICKET_LIST_ADAPTER.validate_python(parsed)
+        else:
+            tickets = [TICKET_ADAPTER.validate_python(parsed)]
+    except (ValueError, ValidationError) as exc:
+        stats.invalid += 1
+        if errors == "raise":
+            raise TicketError(f"{path}: {exc}") from exc
+        return []
+    stats.tickets += len(tickets)
+    return tickets
+
+
+def iter_ticket_batches(
+    path, batch_size: int = 100, errors: str = "raise", stats: Optional[IngestStats] = None
+) -> Iterator[List[Ticket]]:
+    """Yield lists of up to `batch_size` tickets from a directory, JSON file or JSONL file.
+
+    Args:
+        errors: "raise" stops at the first invalid ticket with a `TicketError`;
+            "skip" drops it and counts it in `stats.invalid`.
+        stats: Filled in with line, byte, ticket and invalid counts as the input is read.
+    """
+    if errors not in ("raise", "skip"):
+        raise ValueError(f"errors must be 'raise' or 'skip', not {errors!r}")
+    stats = stats if stats is not None else IngestStats()
+    path = Path(path)
+    if path.is_dir():
+        batch: List[Ticket] = []
+        for file in sorted(path.glob("*.json")):
+            batch.extend(_json_file_tickets(file, errors, stats))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    elif path.name.endswith((".jsonl", ".jsonl.gz", ".ndjson")):
+        yield from _jsonl_batches(path, batch_size, errors, stats)
+    else:
+        tickets = _json_file_tickets(path, errors, stats)
+        for start in range(0, len(tickets), batch_size):
+            yield tickets[start:start + batch_size]
+
+
+def iter_tickets(path, batch_size: int = 100, errors: str = "raise", stats: Optional[IngestStats] = None) -> Iterator[Ticket]:
+    """Yield tickets one at a time (validated in batches) from a directory, JSON file or JSONL file."""
+    for batch in iter_ticket_batches(path, batch_size, errors, stats):
+        yield from batch
+
+
+def load_tickets(path, **options) -> List[Ticket]:
+    """Load all tickets from `path` into a list (prefer `iter_tickets` for large feeds)."""
+    return list(iter_tickets(path, **options))
@@ -0,0 +1,314 @@
+"""
+TTL cache for agent tool results.
+
+Tools such as `get_shipping_info` hit the backing store on every call, and a
+self-correcting run can call the same tool several times. `cached_tool`
+memoizes a tool function by its validated arguments - and, for tools that
+take a `RunContext`, by the part of `ctx.deps` selected with `key` - with a
+per-tool TTL and LRU size limit. The cache belongs to the decorated function,
+so every run of the shared agent uses it, and concurrent async calls with the
+same key wait for one call instead of each making it. A call that raises
+(e.g. `ModelRetry` for an unknown order) is never cached.
+
+Per-tool hits, misses, retries and latency are exported through
+`utils.metrics.registry`; `summary_table()` prints them.
+
+Usage:
+    # Tool(..., takes_ctx=True): key on the deps the result depends on
+    @cached_tool(ttl=30, key=lambda deps: (deps.customer.orders, deps.shipping_store))
+    def get_shipping_info(ctx: RunContext[SupportDeps]) -> str: ...
+
+    @agent.tool_plain
+    @cached_tool(ttl=300)
+    def get_return_policy(region: str) -> str: ...
+"""
+
+import asyncio
+import dataclasses
+import functools
+import hashlib
+import inspect
+import itertools
+import threading
+import time
+import typing
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pydantic_core
+from pydantic_ai import RunContext
+
+from utils.metrics import registry
+
+_MISSING = object()
+# (tool name, cache) for every decorated tool, for `summary_table` and the
+# metrics registry; a function decorated more than once (e.g. inside an agent builder)
+# has one cache per decoration, all reported under its tool name
+TOOL_CACHES: List[Tuple[str, "ToolCache"]] = []
+_TOKEN_ATTR = "_tool_cache_token"
+_tokens = itertools.count(1)
+# id(object) -> (weakref to the object, token), for objects that can't carry a token
+_foreign_tokens: Dict[int, Tuple[weakref.ref, str]] = {}
+
+
+def _takes_ctx(func: Callable) -> bool:
+    parameters = list(inspect.signature(func).parameters)
+    if not parameters:
+        return False
+    hint = typing.get_type_hints(func).get(parameters[0])
+    return hint is RunContext or typing.get_origin(hint) is RunContext
+
+
+def _identity(value: Any) -> str:
+    """Key part for an object that is not serializable, such as a store or client.
+
+    A token is stored on the instance the first time it is seen; unlike
+    `id()`, it is never reused by another object after this one is collected.
+    Objects without a `__dict__` get theirs from a map that drops the entry
+    when the object is collected; objects that take neither attributes nor
+    weak references can't be told apart safely and are refused.
+    """
+    token = getattr(value, _TOKEN_ATTR, None)
+    if token is not None:
+        return token
+    token = f"{type(value).__qualname__}#{next(_tokens)}"
+    try:
+        object.__setattr__(value, _TOKEN_ATTR, token)
+        return token
+    except (AttributeError, TypeError):
+        pass
+    key = id(value)
+    entry = _foreign_tokens.get(key)
+    if entry is not None and entry[0]() is value:
+        return entry[1]
+    try:
+        ref = weakref.ref(value, lambda _, key=key: _foreign_tokens.pop(key, None))
+    except TypeError:
+        raise TypeError(
+            f"{type(value).__qualname__} can't be part of a tool cache key: it takes neither attributes nor "
+            "weak references; key on something serializable instead"
+        ) from None
+    _foreign_tokens[key] = (ref, token)
+    return token
+
+
+def call_key(deps_key: Any, args: Tuple, kwargs: Dict[str, Any]) -> str:
+    """Digest of the deps part and the (already validated) arguments of a call."""
+    data = pydantic_core.to_json([deps_key, args, sorted(kwargs.items())], fallback=_identity)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@dataclasses.dataclass
+class ToolCacheStats:
+    hits: int = 0
+    misses: int = 0
+    retries: int = 0  # calls that raised and were not cached
+    call_s: float = 0.0  # spent in the tool on misses and retries
+    hit_s: float = 0.0  # spent hashing and looking up on hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses + self.retries
+        return self.hits / total if total else 0.0
+
+    @property
+    def mean_call_s(self) -> float:
+        calls = self.misses + self.retries
+        return self.call_s / calls if calls else 0.0
+
+    @property
+    def mean_hit_s(self) -> float:
+        return self.hit_s / self.hits if self.hits else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.hits} hits / {self.misses} misses / {self.retries} retries ({self.hit_rate:.0%}), "
+            f"mean call {self.mean_call_s * 1000:.2f}ms, mean hit {self.mean_hit_s * 1e6:.1f}us"
+        )
+
+
+class ToolCache:
+    """Bounded LRU of tool results with a TTL, safe across threads.
+
+    Args:
+        maxsize: Entries kept; the least recently used is evicted first.
+        ttl: Seconds an entry is served for (None keeps it until evicted).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = ToolCacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """The cached result, or `_MISSING`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _record(self, field: str, seconds: float) -> None:
+        with self._lock:
+            setattr(self.stats, field, getattr(self.stats, field) + 1)
+            if field == "hits":
+                self.stats.hit_s += seconds
+            else:
+                self.stats.call_s += seconds
+
+    def collect(self) -> Dict[str, float]:
+        """Values of this cache alone, in the form exported by the metrics registry."""
+        return _export(self.stats, len(self))
+
+
+def _export(stats: ToolCacheStats, entries: int) -> Dict[str, float]:
+    return {
+        "hits_total": stats.hits,
+        "misses_total": stats.misses,
+        "retries_total": stats.retries,
+        "call_seconds_total": stats.call_s,
+        "hit_ratio": stats.hit_rate,
+        "entries": entries,
+    }
+
+
+def cached_tool(
+    func: Optional[Callable] = None,
+    *,
+    ttl: Optional[float] = 60.0,
+    maxsize: int = 1024,
+    key: Optional[Callable[[Any], Any]] = None,
+    name: Optional[str] = None,
+):
+    """Cache the results of a tool function (sync or async, with or without `RunContext`).
+
+    Args:
+        ttl: Seconds a result is reused; pick it per tool from how fast the data changes.
+        maxsize: Results kept across runs.
+        key: For `RunContext` tools, selects the part of `ctx.deps` the result
+            depends on (default: all of it). Objects that are not serializable,
+            such as stores, are keyed by identity.
+        name: Tool name in stats and metrics (default: the function name).
+
+    The wrapper keeps the tool's signature and docstring, so the tool schema is
+    unchanged, and exposes its `ToolCache` as `.cache`.
+    """
+    if func is None:
+        return functools.partial(cached_tool, ttl=ttl, maxsize=maxsize, key=key, name=name)
+
+    cache = ToolCache(maxsize=maxsize, ttl=ttl)
+    takes_ctx = _takes_ctx(func)
+    select = key or (lambda deps: deps)
+
+    def make_key(args, kwargs) -> str:
+        if takes_ctx:
+            return call_key(select(args[0].deps), args[1:], kwargs)
+        return call_key(None, args, kwargs)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            digest = make_key(args, kwargs)
+            value = cache.get(digest)
+            while value is _MISSING and digest in cache._pending:
+                # Another run is making the same call; a failed call resolves to _MISSING,
+                # and the first waiter to wake up makes it instead
+                value = await asyncio.shield(cache._pending[digest])
+            if value is not _MISSING:
+                cache._record("hits", time.perf_counter() - start)
+                return value
+
+            future = cache._pending[digest] = asyncio.get_running_loop().create_future()
+            call_start = time.perf_counter()
+            try:
+                value = await func(*args, **kwargs)
+            except Exception:
+                value = _MISSING
+                cache._record("retries", time.perf_counter() - call_start)
+                raise
+            else:
+                cache._record("misses", time.perf_counter() - call_start)
+                cache.put(digest, value)
+            finally:
+                future.set_result(value)
+                if cache._pending.get(digest) is future:
+                    del cache._pending[digest]
+            return value
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Runs in a worker thread; concurrent misses may both call the tool, which is harmless
+            start = time.perf_counter()
+            digest = make_key(args, kwargs)
+            value = cache.get(digest)
+            if value is not _MISSING:
+                cache._record("hits", time.perf_counter() - start)
+                return value
+            call_start = time.perf_counter()
+            try:
+                value = func(*args, **kwargs)
+            except Exception:
+                cache._record("retries", time.perf_counter() - call_start)
+                raise
+            cache._record("misses", time.perf_counter() - call_start)
+            cache.put(digest, value)
+            return value
+
+    tool_name = name or func.__name__
+    wrapper.cache = cache
+    if all(existing != tool_name for existing, _ in TOOL_CACHES):
+        registry.add_collector("tool_cache", functools.partial(collect_tool, tool_name), tool=tool_name)
+    TOOL_CACHES.append((tool_name, cache))
+    return wrapper
+
+
+def tool_stats() -> Dict[str, ToolCacheStats]:
+    """Stats of every cached tool, summed over the caches of each tool name."""
+    totals: Dict[str, ToolCacheStats] = {}
+    for tool_name, cache in list(TOOL_CACHES):
+        total = totals.setdefault(tool_name, ToolCacheStats())
+        for field in dataclasses.fields(ToolCacheStats):
+            setattr(total, field.name, getattr(total, field.name) + getattr(cache.stats, field.name))
+    return totals
+
+
+def collect_tool(tool_name: str) -> Dict[str, float]:
+    """Values exported by the metrics registry for one tool name."""
+    entries = sum(len(cache) for name, cache in list(TOOL_CACHES) if name == tool_name)
+    return _export(tool_stats()[tool_name], entries)
+
+
+def summary_table() -> str:
+    """Per-tool hit rates and latencies of every cached tool."""
+    totals = tool_stats()
+
+    lines = [f"{'tool':<24} {'hits':>6} {'misses':>7} {'retries':>8} {'hit rate':>9} {'call ms':>8} {'hit us':>7}"]
+    for tool_name, s in totals.items():
+        lines.append(
+            f"{tool_name:<24} {s.hits:>6} {s.misses:>7} {s.retries:>8} {s.hit_rate:>9.0%} "
+            f"{s.mean_call_s * 1000:>8.2f} {s.mean_hit_s * 1e6:>7.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,337 @@
+"""
+Lightweight per-phase tracing for agent runs.
+
+OpenTelemetry-style spans (trace/span ids, parent links, start/end times,
+attributes) recorded in process, with local exporters only: an indented
+console tree, a JSON file, and a phase summary ranking span names by their
+cumulative time over many runs. No collector is needed.
+
+Runs are traced by stepping through the agent graph (`agent.iter`), one
+span per phase:
+
+- system prompt: building the first request, including dynamic system
+  prompts such as `add_customer_name`
+- model request: the request to the model (with token attributes)
+- result validation: validating the structured result (e.g. `ResponseModel`)
+- tool:<name>: each function tool call, e.g. `tool:get_shipping_info`
+
+Tracing is off by default; `Tracer.span()` then returns a shared no-op
+context manager and `step()` is a plain `run.next(node)`, so instrumented
+code pays a single attribute check.
+
+Usage:
+    tracer.enable()
+    result = await traced_run(agent, prompt, deps=deps)
+    print(tracer.format_tree())
+    print(tracer.summary_table())
+    tracer.write_json("trace.json")
+"""
+
+import asyncio
+import contextvars
+import dataclasses
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    FunctionToolCallEvent,
+    FunctionToolResultEvent,
+    RetryPromptPart,
+    TextPart,
+    ToolCallPart,
+)
+
+RESULT_TOOL_PREFIX = "final_result"
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+@dataclasses.dataclass(eq=False)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_ns: int = 0
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    status: str = "ok"
+    children: List["Span"] = dataclasses.field(default_factory=list, repr=False)
+
+    @property
+    def duration_s(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    @property
+    def self_s(self) -> float:
+        """Time not covered by child spans (parallel children can overlap, so floored at 0)."""
+        return max(0.0, self.duration_s - sum(child.duration_s for child in self.children))
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": self.duration_s * 1000,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes) -> None:
+        pass
+
+
+class _NoopContext:
+    def __enter__(self):
+        return _NOOP_SPAN
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+_NOOP_CONTEXT = _NoopContext()
+
+
+class _SpanContext:
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer.start_span(self.name, **self.attributes)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.span.status = "error"
+            self.span.set(error=f"{exc_type.__name__}: {exc}")
+        self.tracer.end_span(self.span)
+        return False
+
+
+@dataclasses.dataclass
+class PhaseStats:
+    name: str
+    count: int = 0
+    total_s: float = 0.0
+    self_s: float = 0.0
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.count if self.count else 0.0
+
+
+class Tracer:
+    """Collects finished traces (root spans with their children) in memory.
+
+    Args:
+        enabled: Whether spans are recorded at all.
+        max_traces: Most recent traces kept; older ones are discarded.
+    """
+
+    def __init__(self, enabled: bool = False, max_traces: int = 10_000):
+        self.enabled = enabled
+        self.traces: Deque[Span] = deque(maxlen=max_traces)
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        self.traces.clear()
+
+    def span(self, name: str, **attributes):
+        """Context manager for a child of the current span (a new trace when there is none)."""
+        if not self.enabled:
+            return _NOOP_CONTEXT
+        return _SpanContext(self, name, attributes)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """Start a span explicitly; it is not made current. Finish it with `end_span`."""
+        parent = parent or _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else _new_id(16),
+            span_id=_new_id(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+        )
+        if parent is not None:
+            parent.children.append(span)
+        return span
+
+    def end_span(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if span.parent_id is None:
+            self.traces.append(span)
+
+    def spans(self):
+        for trace in self.traces:
+            yield from trace.walk()
+
+    def phase_summary(self) -> List[PhaseStats]:
+        """Span names ranked by cumulative time across all traces."""
+        phases: Dict[str, PhaseStats] = {}
+        for span in self.spans():
+            stats = phases.setdefault(span.name, PhaseStats(span.name))
+            stats.count += 1
+            stats.total_s += span.duration_s
+            stats.self_s += span.self_s
+        return sorted(phases.values(), key=lambda p: p.total_s, reverse=True)
+
+    def summary_table(self) -> str:
+        phases = self.phase_summary()
+        run_total = sum(p.self_s for p in phases) or 1.0
+        rows = [f"{'phase':<32} {'count':>6} {'total s':>9} {'self s':>9} {'mean ms':>9} {'self %':>7}"]
+        for p in phases:
+            rows.append(
+                f"{p.name[:32]:<32} {p.count:>6} {p.total_s:>9.3f} {p.self_s:>9.3f} "
+                f"{p.mean_s * 1000:>9.1f} {p.self_s / run_total * 100:>6.1f}%"
+            )
+        return "\n".join(rows)
+
+    def format_tree(self, traces: Optional[List[Span]] = None) -> str:
+        """Indented tree of `traces` (default: all collected) with durations and attributes."""
+        lines = []
+
+        def render(span: Span, depth: int) -> None:
+            attrs = " ".join(f"{k}={v}" for k, v in span.attributes.items() if k != "error")
+            status = f" [{span.attributes.get('error', 'error')}]" if span.status != "ok" else ""
+            lines.append(f"{'  ' * depth}{span.name} {span.duration_s * 1000:.1f}ms {attrs}{status}".rstrip())
+            for child in sorted(span.children, key=lambda c: c.start_ns):
+                render(child, depth + 1)
+
+        for trace in self.traces if traces is None else traces:
+            render(trace, 0)
+        return "\n".join(lines)
+
+    def write_json(self, path: str) -> None:
+        """Write every collected span as a flat JSON list (parent links via span ids)."""
+        with open(path, "w") as f:
+            json.dump([span.to_dict() for span in self.spans()], f, indent=1)
+
+
+async def _step_call_tools(tracer: Tracer, run, node):
+    """Run a CallToolsNode, timing result validation and each function tool from its events."""
+    parts = node.model_response.parts
+    has_tool_calls = any(isinstance(p, ToolCallPart) for p in parts)
+    validates_result = any(
+        isinstance(p, ToolCallPart) and p.tool_name.startswith(RESULT_TOOL_PREFIX) for p in parts
+    ) or (not has_tool_calls and any(isinstance(p, TextPart) for p in parts))
+
+    validation = tracer.start_span("result validation") if validates_result else None
+    tools: Dict[str, Span] = {}
+    try:
+        async with node.stream(run.ctx) as events:
+            async for event in events:
+                if validation is not None:
+                    # Result validation happens before the first function tool event
+                    tracer.end_span(validation)
+                    validation = None
+                if isinstance(event, FunctionToolCallEvent):
+                    tools[event.call_id] = tracer.start_span(
+                        f"tool:{event.part.tool_name}", tool_call_id=event.call_id
+                    )
+                elif isinstance(event, FunctionToolResultEvent):
+                    span = tools.pop(event.tool_call_id, None)
+                    if span is not None:
+                        if isinstance(event.result, RetryPromptPart):
+                            span.status = "error"
+                            span.set(error="retry requested")
+                        tracer.end_span(span)
+        next_node = await run.next(node)
+        if validation is not None and Agent.is_model_request_node(next_node) and any(
+            isinstance(p, RetryPromptPart) for p in next_node.request.parts
+        ):
+            validation.status = "error"
+            validation.set(error="validation failed, retry requested")
+        return next_node
+    except BaseException:
+        for span in [validation, *tools.values()]:
+            if span is not None:
+                span.status = "error"
+        raise
+    finally:
+        for span in [validation, *tools.values()]:
+            if span is not None:
+                tracer.end_span(span)
+
+
+async def step(run, node, tracer: Optional[Tracer] = None):
+    """`run.next(node)` with a span for the phase the node represents."""
+    tracer = tracer or _default_tracer
+    if not tracer.enabled:
+        return await run.next(node)
+
+    if Agent.is_user_prompt_node(node):
+        with tracer.span("system prompt"):
+            return await run.next(node)
+    if Agent.is_model_request_node(node):
+        before = run.usage()
+        request_tokens, response_tokens = before.request_tokens or 0, before.response_tokens or 0
+        with tracer.span("model request", model=getattr(run.ctx.deps.model, "model_name", "")) as span:
+            next_node = await run.next(node)
+            after = run.usage()
+            span.set(
+                request_tokens=(after.request_tokens or 0) - request_tokens,
+                response_tokens=(after.response_tokens or 0) - response_tokens,
+            )
+        return next_node
+    if Agent.is_call_tools_node(node):
+        with tracer.span("handle response"):
+            return await _step_call_tools(tracer, run, node)
+    return await run.next(node)
+
+
+async def traced_run(agent: Agent, user_prompt: str, *, tracer: Optional[Tracer] = None,
+                     span_name: str = "agent run", attributes: Optional[Dict[str, Any]] = None, **kwargs):
+    """Run `agent` like `agent.run`, with a span per phase when tracing is enabled."""
+    tracer = tracer or _default_tracer
+    if not tracer.enabled:
+        return await agent.run(user_prompt, **kwargs)
+    with tracer.span(span_name, **(attributes or {})):
+        async with agent.iter(user_prompt, **kwargs) as run:
+            node = run.next_node
+            while not Agent.is_end_node(node):
+                node = await step(run, node, tracer)
+        return run.result
+
+
+def traced_run_sync(agent: Agent, user_prompt: str, **kwargs):
+    """Synchronous `traced_run`; exactly `agent.run_sync` when tracing is disabled."""
+    if not _default_tracer.enabled:
+        return agent.run_sync(user_prompt, **kwargs)
+    return asyncio.get_event_loop().run_until_complete(traced_run(agent, user_prompt, **kwargs))
+
+
+# Process-wide tracer used by the examples and batch mode (disabled by default)
+tracer = _default_tracer = Tracer()